@@ -2,16 +2,31 @@
 
 import sys
 
-from .retriever import retrieve_context
-from .indexer import ensure_catalog_index, invalidate_catalog_index, clear_catalog_cache
+from .retriever import rank_context, retrieve_context
+from .indexer import (
+    CatalogItems,
+    catalog_cache_stats,
+    catalog_version,
+    ensure_catalog_index,
+    invalidate_catalog_index,
+    clear_catalog_cache,
+    prebuild_catalog_index,
+)
 from .io import write_catalog_csv
+from .querycache import query_cache_stats
 
 __all__ = [
+    "rank_context",
     "retrieve_context",
+    "CatalogItems",
+    "catalog_version",
+    "catalog_cache_stats",
     "ensure_catalog_index",
     "invalidate_catalog_index",
     "clear_catalog_cache",
+    "prebuild_catalog_index",
     "write_catalog_csv",
+    "query_cache_stats",
 ]
 
 # NOTE: register short alias so legacy imports (`import catalog`) keep working
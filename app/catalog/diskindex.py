@@ -0,0 +1,254 @@
+"""Prebuilt catalog search index stored next to the tenant catalog.
+
+The file is written once per catalog version (on upload / CSV save) and
+memory-mapped read-only by every process that serves search, so gunicorn
+workers and the worker container share one page-cache copy instead of each
+building and holding its own TF-IDF matrix.
+
+Layout (little-endian, sections 8-byte aligned)::
+
+    b"AVCIDX01" | uint32 header length | JSON header | sections...
+
+Sections: sorted vocabulary (uint32 offsets + UTF-8 blob), float64 idf,
+CSR rows and CSC postings (int32 indptr/indices + float32 data), item texts
+(uint32 offsets + UTF-8 blob). The JSON header maps section names to
+``[offset, byte length, typecode]``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import mmap
+import os
+import pathlib
+import struct
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.sklearn._sparse import CSRMatrix
+from app.sklearn.feature_extraction.text import TfidfVectorizer as _ShimVectorizer
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+INDEX_SUFFIX = ".idx"
+INDEX_PREFIX = "search_"
+_MAGIC = b"AVCIDX01"
+_NGRAM_RANGE = (1, 2)
+
+
+def index_filename(version: str) -> str:
+    return f"{INDEX_PREFIX}{version}{INDEX_SUFFIX}"
+
+
+def _pack_strings(values: Sequence[str]) -> Tuple[array, bytes]:
+    offsets = array("I", [0])
+    blob = bytearray()
+    for value in values:
+        blob.extend(value.encode("utf-8"))
+        offsets.append(len(blob))
+    return offsets, bytes(blob)
+
+
+def write_search_index(path: pathlib.Path, texts: Sequence[str]) -> pathlib.Path:
+    """Fit the shim vectorizer on ``texts`` and write the index atomically."""
+
+    vectorizer = _ShimVectorizer(analyzer="word", ngram_range=_NGRAM_RANGE, min_df=1, compact=True)
+    matrix = vectorizer.fit_transform(texts)
+    csc = matrix.postings
+    terms = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.__getitem__)
+    term_offsets, term_blob = _pack_strings(terms)
+    text_offsets, text_blob = _pack_strings(texts)
+
+    sections: List[Tuple[str, Any, str]] = [
+        ("term_offsets", term_offsets, "I"),
+        ("term_blob", term_blob, "B"),
+        ("idf", vectorizer._idf_by_id, "d"),
+        ("csr_indptr", matrix.indptr, "i"),
+        ("csr_indices", matrix.indices, "i"),
+        ("csr_data", matrix.data, "f"),
+        ("csc_indptr", csc.indptr, "i"),
+        ("csc_indices", csc.indices, "i"),
+        ("csc_data", csc.data, "f"),
+        ("text_offsets", text_offsets, "I"),
+        ("text_blob", text_blob, "B"),
+    ]
+    payloads = [(name, bytes(buf) if isinstance(buf, bytes) else buf.tobytes(), code) for name, buf, code in sections]
+
+    header: Dict[str, Any] = {
+        "format": FORMAT_VERSION,
+        "ngram_range": list(_NGRAM_RANGE),
+        "rows": matrix.shape[0],
+        "terms": matrix.shape[1],
+        "nnz": matrix.nnz,
+        "sections": {},
+    }
+    # Offsets depend on the header length, so reserve room and fill them in.
+    placeholder = json.dumps({**header, "sections": {name: [0, len(data), code] for name, data, code in payloads}})
+    header_room = len(placeholder.encode("utf-8")) + 32 * len(payloads) + 64
+    offset = _align(len(_MAGIC) + 4 + header_room)
+    for name, data, code in payloads:
+        header["sections"][name] = [offset, len(data), code]
+        offset = _align(offset + len(data))
+    header_bytes = json.dumps(header).encode("utf-8").ljust(header_room, b" ")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(_MAGIC)
+        handle.write(struct.pack("<I", header_room))
+        handle.write(header_bytes)
+        for name, data, _code in payloads:
+            handle.seek(header["sections"][name][0])
+            handle.write(data)
+        handle.truncate(max(offset, handle.tell()))
+    os.replace(tmp_path, path)
+    return path
+
+
+def _align(value: int, to: int = 8) -> int:
+    return (value + to - 1) // to * to
+
+
+class _MappedStrings(Sequence[str]):
+    """Read-only string table decoded on access."""
+
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets: memoryview, blob: memoryview) -> None:
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        return bytes(self._blob[self._offsets[idx] : self._offsets[idx + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+class MappedVectorizer:
+    """Query-side TF-IDF transform over a memory-mapped vocabulary."""
+
+    def __init__(self, terms: _MappedStrings, idf: memoryview, ngram_range: Tuple[int, int]) -> None:
+        self._terms = terms
+        self._idf = idf
+        self._tokenizer = _ShimVectorizer(analyzer="word", ngram_range=ngram_range, min_df=1)
+        self.ngram_range = ngram_range
+
+    def term_id(self, term: str) -> Optional[int]:
+        lo, hi = 0, len(self._terms)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            current = self._terms[mid]
+            if current < term:
+                lo = mid + 1
+            elif current > term:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def transform(self, raw_documents: Sequence[str]) -> CSRMatrix:
+        rows = []
+        for doc in raw_documents:
+            ids: Dict[str, Optional[int]] = {}
+            counts: Counter[int] = Counter()
+            for token in self._tokenizer._tokenize(doc):
+                if token not in ids:
+                    ids[token] = self.term_id(token)
+                term_id = ids[token]
+                if term_id is not None:
+                    counts[term_id] += 1
+            total = sum(counts.values())
+            row = [(term_id, (freq / total) * self._idf[term_id]) for term_id, freq in counts.items()]
+            norm = math.sqrt(sum(value * value for _, value in row))
+            if norm > 0:
+                row = [(term_id, value / norm) for term_id, value in row]
+            rows.append(sorted(row))
+        return CSRMatrix.from_rows(rows, len(self._terms))
+
+
+class MappedSearchIndex:
+    """Vectorizer, matrix and texts backed by one read-only mapping."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        with path.open("rb") as handle:
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+        if bytes(view[: len(_MAGIC)]) != _MAGIC:
+            raise ValueError(f"not a catalog search index: {path}")
+        (header_room,) = struct.unpack_from("<I", self._mm, len(_MAGIC))
+        start = len(_MAGIC) + 4
+        header = json.loads(bytes(view[start : start + header_room]).decode("utf-8"))
+        if int(header.get("format", 0)) != FORMAT_VERSION:
+            raise ValueError(f"unsupported catalog search index format: {header.get('format')}")
+
+        def section(name: str) -> memoryview:
+            offset, length, code = header["sections"][name]
+            raw = view[offset : offset + length]
+            return raw if code == "B" else raw.cast(code)
+
+        rows, terms = int(header["rows"]), int(header["terms"])
+        self.path = path
+        self.header = header
+        self.texts = _MappedStrings(section("text_offsets"), section("text_blob"))
+        self.vectorizer = MappedVectorizer(
+            _MappedStrings(section("term_offsets"), section("term_blob")),
+            section("idf"),
+            tuple(header.get("ngram_range") or _NGRAM_RANGE),  # type: ignore[arg-type]
+        )
+        self.matrix = CSRMatrix(section("csr_indptr"), section("csr_indices"), section("csr_data"), (rows, terms))
+        self.matrix._csc = CSRMatrix(section("csc_indptr"), section("csc_indices"), section("csc_data"), (terms, rows))
+
+    @property
+    def file_size(self) -> int:
+        return len(self._mm)
+
+
+def load_search_index(path: pathlib.Path) -> Optional[MappedSearchIndex]:
+    try:
+        return MappedSearchIndex(path)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("catalog search index unreadable path=%s", path, exc_info=True)
+        return None
+
+
+def prune_search_indexes(directory: pathlib.Path, keep: pathlib.Path) -> int:
+    """Remove index files of other catalog versions; mapped readers keep their pages."""
+
+    removed = 0
+    if not directory.exists():
+        return removed
+    for candidate in directory.glob(f"{INDEX_PREFIX}*{INDEX_SUFFIX}"):
+        if candidate.name == keep.name:
+            continue
+        try:
+            candidate.unlink()
+            removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+__all__ = [
+    "FORMAT_VERSION",
+    "MappedSearchIndex",
+    "MappedVectorizer",
+    "index_filename",
+    "load_search_index",
+    "prune_search_indexes",
+    "write_search_index",
+]
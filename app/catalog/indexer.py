@@ -2,10 +2,16 @@ from __future__ import annotations
 
 import hashlib
 import json
+import logging
+import os
+import pathlib
 import re
+import sys
 import threading
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 try:
     from sklearn.feature_extraction.text import TfidfVectorizer  # type: ignore
@@ -15,6 +21,69 @@ except ImportError:  # pragma: no cover - optional dependency
     except ImportError:
         TfidfVectorizer = None  # type: ignore[assignment]
 
+from . import diskindex, querycache
+from app.metrics import (
+    CATALOG_INDEX_CACHE_BYTES,
+    CATALOG_INDEX_CACHE_ENTRIES,
+    CATALOG_INDEX_EVICTIONS_COUNTER,
+)
+
+# The shim can keep vectors as a compact CSR matrix instead of per-row dicts.
+_COMPACT_VECTORS = (os.getenv("CATALOG_COMPACT_VECTORS", "1") or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# Index cache bounds: total estimated bytes, indexes kept per tenant and idle
+# time after which a tenant's index is dropped (rebuilt on next access).
+CACHE_MAX_BYTES = int(_env_number("CATALOG_INDEX_CACHE_MB", 256) * 1024 * 1024)
+CACHE_MAX_PER_TENANT = max(1, int(_env_number("CATALOG_INDEX_PER_TENANT", 2)))
+CACHE_IDLE_SECONDS = _env_number("CATALOG_INDEX_IDLE_SECONDS", 3600)
+# Serve versioned catalogs from the shared memory-mapped index file written
+# at upload/save time. Opt-in: the mapped index always ranks with the shim's
+# TF-IDF weighting, even where sklearn is installed.
+DISK_INDEX_ENABLED = (os.getenv("CATALOG_DISK_INDEX", "0") or "").strip().lower() in {"1", "true", "yes", "on"}
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogItems(list):
+    """Catalog rows tagged with the version of the files they were read from.
+
+    ``version`` is computed once per catalog load, so index lookups can be
+    keyed by it instead of hashing every item on each query. ``index_path``
+    points at the prebuilt search index file for that version, if any;
+    ``rank_index`` holds lookups the caller precomputed for the same version.
+    """
+
+    __slots__ = ("tenant", "version", "index_path", "rank_index")
+
+    def __init__(
+        self,
+        items: Iterable[Dict[str, Any]] = (),
+        *,
+        tenant: Optional[int] = None,
+        version: str = "",
+        index_path: Optional[pathlib.Path] = None,
+    ) -> None:
+        super().__init__(items)
+        self.tenant = tenant
+        self.version = version
+        self.index_path = index_path
+        self.rank_index: Any = None
+
+
+def catalog_version(items: Sequence[Dict[str, Any]]) -> Optional[str]:
+    version = getattr(items, "version", None)
+    if isinstance(version, str) and version:
+        return version
+    return None
+
 
 @dataclass
 class CatalogIndex:
@@ -25,11 +94,17 @@ class CatalogIndex:
     vectorizer: Any | None
     matrix: Any
     items: List[Dict[str, Any]]
-    texts: List[str]
+    texts: Sequence[str]
     tokens: List[set[str]]
+    size_bytes: int = 0
+    # set when vectorizer/matrix/texts live in a shared read-only mapping
+    mapped_path: Optional[str] = None
+    last_used: float = field(default_factory=time.monotonic)
 
 
-_INDEX_CACHE: Dict[Tuple[Optional[int], str], CatalogIndex] = {}
+# LRU order: least recently used first
+_INDEX_CACHE: "OrderedDict[Tuple[Optional[int], str], CatalogIndex]" = OrderedDict()
+_CACHE_BYTES = 0
 _INDEX_LATEST: Dict[Optional[int], CatalogIndex] = {}
 _LOCK = threading.Lock()
 
@@ -46,6 +121,102 @@ def _catalog_signature(items: Sequence[Dict[str, Any]]) -> str:
     return digest.hexdigest()
 
 
+def _sparse_nbytes(matrix: Any) -> int:
+    total = 0
+    for attr in ("data", "indices", "indptr"):
+        buf = getattr(matrix, attr, None)
+        if buf is None:
+            continue
+        nbytes = getattr(buf, "nbytes", None)
+        if nbytes is None:
+            nbytes = getattr(buf, "itemsize", 8) * len(buf)
+        total += int(nbytes)
+    return total
+
+
+def _estimate_index_bytes(index: CatalogIndex) -> int:
+    """Rough resident size of the parts owned by the index (items are shared)."""
+
+    if index.mapped_path:
+        # page cache is shared between processes; only count the token sets
+        return sum(sys.getsizeof(token_set) for token_set in index.tokens) + 4096
+
+    total = sum(sys.getsizeof(text) for text in index.texts)
+    for token_set in index.tokens:
+        total += sys.getsizeof(token_set) + sum(sys.getsizeof(token) for token in token_set)
+
+    vocabulary = getattr(index.vectorizer, "vocabulary_", None) or {}
+    # key string + int value + dict slot; idf weights roughly match the slots
+    total += sum(sys.getsizeof(term) + 64 for term in vocabulary)
+
+    matrix = index.matrix
+    if matrix is not None:
+        vectors = getattr(matrix, "vectors", None)
+        if vectors is not None:
+            # dict-based shim rows hold references to vocabulary strings
+            total += sum(sys.getsizeof(vector) + 32 * len(vector) for vector in vectors)
+            postings = getattr(matrix, "postings", None) or {}
+            total += sum(sys.getsizeof(entries) + 64 * len(entries) for entries in postings.values())
+        else:
+            total += _sparse_nbytes(matrix)
+            if hasattr(matrix, "_csc"):
+                # Compact shim: the column-major postings are built on the
+                # first query, after this estimate; count them up front
+                # (same nnz, one indptr slot per term).
+                csc = matrix._csc
+                if csc is not None:
+                    total += _sparse_nbytes(csc)
+                else:
+                    nnz = len(getattr(matrix, "data", ()) or ())
+                    total += 8 * nnz + 4 * (int(matrix.shape[1]) + 1)
+    return total
+
+
+def _drop_locked(key: Tuple[Optional[int], str], reason: str) -> None:
+    global _CACHE_BYTES
+    index = _INDEX_CACHE.pop(key, None)
+    if index is None:
+        return
+    _CACHE_BYTES -= index.size_bytes
+    if _INDEX_LATEST.get(key[0]) is index:
+        _INDEX_LATEST.pop(key[0], None)
+    if reason:
+        CATALOG_INDEX_EVICTIONS_COUNTER.labels(reason).inc()
+
+
+def _publish_locked() -> None:
+    CATALOG_INDEX_CACHE_BYTES.set(_CACHE_BYTES)
+    CATALOG_INDEX_CACHE_ENTRIES.set(len(_INDEX_CACHE))
+
+
+def _evict_idle_locked(now: float) -> None:
+    if CACHE_IDLE_SECONDS <= 0:
+        return
+    while _INDEX_CACHE:
+        key, index = next(iter(_INDEX_CACHE.items()))
+        if now - index.last_used < CACHE_IDLE_SECONDS:
+            break
+        _drop_locked(key, "idle")
+
+
+def _store_locked(key: Tuple[Optional[int], str], index: CatalogIndex) -> None:
+    global _CACHE_BYTES
+    _drop_locked(key, "")
+    _INDEX_CACHE[key] = index
+    _CACHE_BYTES += index.size_bytes
+
+    tenant_keys = [other for other in _INDEX_CACHE if other[0] == key[0]]
+    for other in tenant_keys[: max(0, len(tenant_keys) - CACHE_MAX_PER_TENANT)]:
+        _drop_locked(other, "tenant_cap")
+
+    # Never evict the index that was just built, even if it alone is over budget.
+    while _CACHE_BYTES > CACHE_MAX_BYTES and len(_INDEX_CACHE) > 1:
+        oldest = next(iter(_INDEX_CACHE))
+        if oldest == key:
+            break
+        _drop_locked(oldest, "budget")
+
+
 def _collect_text(item: Dict[str, Any]) -> str:
     parts: List[str] = []
     for key in (
@@ -80,19 +251,83 @@ def _tokenize(text: str) -> set[str]:
     return {token for token in tokens if len(token) >= 3}
 
 
+def _mapped_index_path(items: Sequence[Dict[str, Any]]) -> Optional[pathlib.Path]:
+    if not DISK_INDEX_ENABLED or not catalog_version(items):
+        return None
+    path = getattr(items, "index_path", None)
+    return pathlib.Path(path) if path else None
+
+
+def prebuild_catalog_index(items: Sequence[Dict[str, Any]]) -> Optional[pathlib.Path]:
+    """Write the search index file for a versioned catalog and drop stale ones."""
+
+    path = _mapped_index_path(items)
+    if path is None or not items:
+        return None
+    texts = _build_texts(items)
+    if not any(texts):
+        return None
+    if not path.exists():
+        diskindex.write_search_index(path, texts)
+    diskindex.prune_search_indexes(path.parent, keep=path)
+    return path
+
+
+def _load_mapped_index(
+    tenant: Optional[int], signature: str, items: Sequence[Dict[str, Any]]
+) -> Optional[CatalogIndex]:
+    path = _mapped_index_path(items)
+    if path is None:
+        return None
+    if not path.exists():
+        # Written by uploads and the catalog runner, never on a query: until
+        # then the caller builds the usual in-memory index.
+        return None
+    mapped = diskindex.load_search_index(path)
+    if mapped is None or mapped.matrix.shape[0] != len(items):
+        return None
+    return CatalogIndex(
+        tenant=tenant,
+        signature=signature,
+        vectorizer=mapped.vectorizer,
+        matrix=mapped.matrix,
+        items=list(items),
+        texts=mapped.texts,
+        tokens=[],
+        mapped_path=str(path),
+    )
+
+
 def ensure_catalog_index(tenant: Optional[int], items: Sequence[Dict[str, Any]]) -> Optional[CatalogIndex]:
     if not items:
         return None
 
-    signature = _catalog_signature(items)
+    # Versioned catalogs are keyed by their load version; plain sequences
+    # still fall back to hashing the full content.
+    version = catalog_version(items)
+    signature = f"v:{version}" if version else _catalog_signature(items)
     cache_key = (tenant, signature)
 
     with _LOCK:
+        now = time.monotonic()
+        _evict_idle_locked(now)
         cached = _INDEX_CACHE.get(cache_key)
         if cached:
+            cached.last_used = now
+            _INDEX_CACHE.move_to_end(cache_key)
             _INDEX_LATEST[tenant] = cached
+            _publish_locked()
             return cached
 
+    index = _load_mapped_index(tenant, signature, items)
+    if index is not None:
+        index.size_bytes = _estimate_index_bytes(index)
+        with _LOCK:
+            _store_locked(cache_key, index)
+            _INDEX_LATEST[tenant] = index
+            _publish_locked()
+        return index
+
     texts = _build_texts(items)
     if not any(texts):
         return None
@@ -100,7 +335,10 @@ def ensure_catalog_index(tenant: Optional[int], items: Sequence[Dict[str, Any]])
     tokens = [_tokenize(text) for text in texts]
 
     if TfidfVectorizer is not None:
-        vectorizer = TfidfVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1)
+        options: Dict[str, Any] = {}
+        if _COMPACT_VECTORS and getattr(TfidfVectorizer, "supports_compact", False):
+            options["compact"] = True
+        vectorizer = TfidfVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1, **options)
         matrix = vectorizer.fit_transform(texts)
     else:
         vectorizer = None
@@ -115,10 +353,12 @@ def ensure_catalog_index(tenant: Optional[int], items: Sequence[Dict[str, Any]])
         texts=texts,
         tokens=tokens,
     )
+    index.size_bytes = _estimate_index_bytes(index)
 
     with _LOCK:
-        _INDEX_CACHE[cache_key] = index
+        _store_locked(cache_key, index)
         _INDEX_LATEST[tenant] = index
+        _publish_locked()
 
     return index
 
@@ -127,10 +367,27 @@ def invalidate_catalog_index(tenant: Optional[int]) -> None:
     with _LOCK:
         latest = _INDEX_LATEST.pop(tenant, None)
         if latest:
-            _INDEX_CACHE.pop((tenant, latest.signature), None)
+            _drop_locked((tenant, latest.signature), "invalidated")
+        _publish_locked()
+    querycache.drop_tenant(tenant)
 
 
 def clear_catalog_cache() -> None:
+    global _CACHE_BYTES
     with _LOCK:
         _INDEX_CACHE.clear()
         _INDEX_LATEST.clear()
+        _CACHE_BYTES = 0
+        _publish_locked()
+    querycache.clear_query_cache()
+
+
+def catalog_cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        tenants = {key[0] for key in _INDEX_CACHE}
+        return {
+            "entries": len(_INDEX_CACHE),
+            "tenants": len(tenants),
+            "bytes": _CACHE_BYTES,
+            "max_bytes": CACHE_MAX_BYTES,
+        }
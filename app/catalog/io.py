@@ -5,9 +5,10 @@ from __future__ import annotations
 import csv
 import pathlib
 import re
-from typing import Mapping, Sequence
+from typing import Iterable, Mapping, Optional
 
 from .pipeline import finalize_catalog_rows
+from .profiling import StageProfile
 
 # Import core in a way resilient to test import order and aliasing
 try:  # Prefer package-qualified core
@@ -35,17 +36,22 @@ def _sanitize_base_name(base_name: str) -> str:
 
 def write_catalog_csv(
     tenant: int,
-    normalized_rows: Sequence[Mapping[str, object]],
+    normalized_rows: Iterable[Mapping[str, object]],
     base_name: str,
     meta: Mapping[str, object] | None = None,
+    *,
+    profile: Optional[StageProfile] = None,
 ) -> tuple[str, list[str]]:
     """Persist normalized catalog rows as a CSV file.
 
     The function creates `<tenant>/catalogs/` directory if it does not exist,
     writes the CSV file using UTF-8 encoding and returns the relative path to
-    the stored CSV along with the ordered list of columns.
+    the stored CSV along with the ordered list of columns. Reading,
+    finalizing and writing the rows are recorded on ``profile`` if given.
     """
 
+    profile = profile if profile is not None else StageProfile()
+
     core_module.ensure_tenant_files(int(tenant))
     tenant_root = pathlib.Path(core_module.tenant_dir(int(tenant)))
     catalogs_dir = tenant_root / "catalogs"
@@ -54,8 +60,12 @@ def write_catalog_csv(
     safe_base = _sanitize_base_name(base_name or "catalog")
     csv_path = catalogs_dir / f"{safe_base}.csv"
 
-    rows = list(normalized_rows or [])
-    finalized_rows, header, report = finalize_catalog_rows(rows)
+    # Lazy readers do their parsing while the rows are collected here.
+    with profile.stage("read_rows") as reading:
+        rows = list(normalized_rows or [])
+        reading["items"] += len(rows)
+    with profile.stage("finalize_catalog", items=len(rows)):
+        finalized_rows, header, report = finalize_catalog_rows(rows)
 
     source_type = ""
     if isinstance(meta, Mapping):
@@ -84,29 +94,30 @@ def write_catalog_csv(
         meta.setdefault("delimiter", ";")
 
     # Excel-friendly: UTF-8 with BOM and semicolon delimiter
-    with csv_path.open("w", encoding="utf-8-sig", newline="") as handle:
-        writer = csv.DictWriter(
-            handle,
-            fieldnames=header,
-            extrasaction="ignore",
-            delimiter=";",
-            quoting=csv.QUOTE_MINIMAL,
-            lineterminator="\n",
-        )
-        writer.writeheader()
-        for row in finalized_rows:
-            # Flatten newlines/tabs to spaces to avoid broken rows in CSV viewers
-            def _cell(val: object) -> str:
-                text = _stringify(val)
-                if not text:
-                    return ""
-                text = text.replace("\r\n", " ").replace("\r", " ").replace("\n", " ").replace("\t", " ")
-                # collapse runs of spaces
-                text = re.sub(r"\s+", " ", text).strip()
-                return text
-
-            payload = {column: _cell(row.get(column, "")) for column in header}
-            writer.writerow(payload)
+    with profile.stage("write_catalog_csv", items=len(finalized_rows)):
+        with csv_path.open("w", encoding="utf-8-sig", newline="") as handle:
+            writer = csv.DictWriter(
+                handle,
+                fieldnames=header,
+                extrasaction="ignore",
+                delimiter=";",
+                quoting=csv.QUOTE_MINIMAL,
+                lineterminator="\n",
+            )
+            writer.writeheader()
+            for row in finalized_rows:
+                # Flatten newlines/tabs to spaces to avoid broken rows in CSV viewers
+                def _cell(val: object) -> str:
+                    text = _stringify(val)
+                    if not text:
+                        return ""
+                    text = text.replace("\r\n", " ").replace("\r", " ").replace("\n", " ").replace("\t", " ")
+                    # collapse runs of spaces
+                    text = re.sub(r"\s+", " ", text).strip()
+                    return text
+
+                payload = {column: _cell(row.get(column, "")) for column in header}
+                writer.writerow(payload)
 
     try:
         relative = str(csv_path.relative_to(tenant_root))
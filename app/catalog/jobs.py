@@ -0,0 +1,89 @@
+"""Catalog upload jobs: status file and the Redis ingestion queue.
+
+Every upload gets ``catalog_jobs/<job_id>/status.json`` under the tenant
+directory; ``/pub/catalog/upload/status/{job_id}`` serves that file no
+matter which process runs the job. With ``CATALOG_INGEST_MODE=queue`` the
+web handler only pushes the job spec to Redis and ``app.catalog_worker``
+parses the file; any other value keeps running it as a background task of
+the web worker.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import pathlib
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from redis import exceptions as redis_ex
+
+logger = logging.getLogger(__name__)
+
+INGEST_MODE = (os.getenv("CATALOG_INGEST_MODE") or "background").strip().lower()
+INGEST_QUEUE_KEY = (os.getenv("CATALOG_INGEST_QUEUE") or "catalog:ingest").strip()
+# Jobs popped by a runner stay here until they finish, so a killed runner
+# puts them back on start.
+INGEST_PROCESSING_KEY = f"{INGEST_QUEUE_KEY}:processing"
+
+
+class CatalogJobStatus:
+    """In-memory copy of a job's status.json, rewritten on every update."""
+
+    def __init__(self, path: pathlib.Path, state: Optional[Dict[str, Any]] = None) -> None:
+        self.path = path
+        self.state: Dict[str, Any] = state if state is not None else {}
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "CatalogJobStatus":
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = None
+        return cls(path, state if isinstance(state, dict) else None)
+
+    def write(self, status: Optional[str] = None, **fields: Any) -> None:
+        if status is not None:
+            self.state["state"] = status
+        self.state["updated_at"] = int(time.time())
+        self.state.update(fields)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(self.state, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+    def log(self, level: str, message: str, **extra: Any) -> None:
+        entry = {"ts": int(time.time()), "level": level, "message": message}
+        if extra:
+            entry.update({k: v for k, v in extra.items() if v is not None})
+        self.state.setdefault("log", []).append(entry)
+        self.write(None, log=self.state["log"])
+
+    def fail(self, error_key: str, **details: Any) -> None:
+        self.log("error", error_key, **details)
+        self.write("failed", error=error_key, message=error_key, **details)
+
+
+def queue_enabled() -> bool:
+    return INGEST_MODE == "queue"
+
+
+def enqueue_catalog_job(client: Any, job: Mapping[str, Any]) -> bool:
+    """Push ``job`` for the ingestion runner; ``False`` if Redis is unavailable."""
+
+    try:
+        client.lpush(INGEST_QUEUE_KEY, json.dumps(dict(job), ensure_ascii=False))
+    except redis_ex.RedisError:
+        logger.warning("catalog ingest enqueue failed job=%s", job.get("job_id"), exc_info=True)
+        return False
+    return True
+
+
+__all__ = [
+    "CatalogJobStatus",
+    "INGEST_MODE",
+    "INGEST_PROCESSING_KEY",
+    "INGEST_QUEUE_KEY",
+    "enqueue_catalog_job",
+    "queue_enabled",
+]
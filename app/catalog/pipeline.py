@@ -158,41 +158,42 @@ def normalize_price_value(raw: str) -> str:
     return digits_only
 
 
-def _normalize_key_name(name: str) -> str:
-    def _latin_to_cyrillic_lookalikes(s: str) -> str:
-        # Map common Latin lookalikes to Cyrillic to unify keys like "BEC" -> "ВЕС"
-        mapping = str.maketrans({
-            "A": "А", "a": "а",
-            "B": "В", "b": "в",
-            "C": "С", "c": "с",
-            "E": "Е", "e": "е",
-            "H": "Н", "h": "н",
-            "K": "К", "k": "к",
-            "M": "М", "m": "м",
-            "O": "О", "o": "о",
-            "P": "Р", "p": "р",
-            "T": "Т", "t": "т",
-            "X": "Х", "x": "х",
-            "Y": "У", "y": "у",
-        })
-        return s.translate(mapping)
+# Map common Latin lookalikes to Cyrillic to unify keys like "BEC" -> "ВЕС"
+_KEY_LOOKALIKES = str.maketrans({
+    "A": "А", "a": "а",
+    "B": "В", "b": "в",
+    "C": "С", "c": "с",
+    "E": "Е", "e": "е",
+    "H": "Н", "h": "н",
+    "K": "К", "k": "к",
+    "M": "М", "m": "м",
+    "O": "О", "o": "о",
+    "P": "Р", "p": "р",
+    "T": "Т", "t": "т",
+    "X": "Х", "x": "х",
+    "Y": "У", "y": "у",
+})
+_KEY_PUNCT_RE = re.compile(r"[^a-z0-9а-я\s]")
+# Heuristic suffix trimming for Russian noun forms
+_KEY_SUFFIXES = (
+    "ыми", "ими", "ыми", "ями", "ами",
+    "ого", "его", "ому", "ему",
+    "ов", "ев", "ей", "ам", "ям", "ах", "ях",
+    "ой", "ом", "ую", "ую", "ая", "яя",
+    "а", "я", "у", "е", "ю", "ы", "и", "ь",
+)
+
 
+def _normalize_key_name(name: str) -> str:
     text = name.strip()
     # First normalize Unicode variants
     text = text.replace("ё", "е")
     # Unify Latin lookalikes to Cyrillic to help clustering
-    text = _latin_to_cyrillic_lookalikes(text)
+    text = text.translate(_KEY_LOOKALIKES)
     text = text.lower()
-    text = re.sub(r"[^a-z0-9а-я\s]", " ", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    # Heuristic suffix trimming for Russian noun forms
-    for suffix in (
-        "ыми", "ими", "ыми", "ями", "ами",
-        "ого", "его", "ому", "ему",
-        "ов", "ев", "ей", "ам", "ям", "ах", "ях",
-        "ой", "ом", "ую", "ую", "ая", "яя",
-        "а", "я", "у", "е", "ю", "ы", "и", "ь",
-    ):
+    text = _KEY_PUNCT_RE.sub(" ", text)
+    text = _MULTI_SPACE_RE.sub(" ", text).strip()
+    for suffix in _KEY_SUFFIXES:
         if text.endswith(suffix) and len(text) > len(suffix) + 2:
             text = text[: -len(suffix)]
             break
@@ -225,6 +226,58 @@ def _value_type(values: Iterable[str]) -> str:
     return "unknown"
 
 
+_COLUMN_SIMILARITY = 0.86
+# SequenceMatcher.ratio() >= 0.86 is 2*M/(la+lb) with M matched characters.
+# If two names share no q-gram every matching block is shorter than q, and
+# counting blocks against unmatched characters bounds M below that ratio
+# once la+lb reaches 14 (q=3) or 4 (q=2). Shorter pairs are compared by
+# length bucket, so candidate generation never drops a qualifying pair.
+_TRIGRAM_MIN_PAIR_LEN = 14
+_BIGRAM_MIN_PAIR_LEN = 4
+
+
+def _qgrams(text: str, size: int) -> Set[str]:
+    return {text[pos : pos + size] for pos in range(len(text) - size + 1)}
+
+
+def _column_candidates(norms: Sequence[str]) -> List[List[int]]:
+    """Positions (ascending) that may reach the similarity threshold per name."""
+
+    trigrams: Dict[str, List[int]] = defaultdict(list)
+    bigrams: Dict[str, List[int]] = defaultdict(list)
+    tiny: List[int] = []
+    for pos, norm in enumerate(norms):
+        for gram in _qgrams(norm, 3):
+            trigrams[gram].append(pos)
+        if len(norm) < _TRIGRAM_MIN_PAIR_LEN - 1:
+            for gram in _qgrams(norm, 2):
+                bigrams[gram].append(pos)
+        if 0 < len(norm) < _BIGRAM_MIN_PAIR_LEN - 1:
+            tiny.append(pos)
+
+    candidates: List[List[int]] = []
+    for pos, norm in enumerate(norms):
+        found: Set[int] = set()
+        if norm:
+            for gram in _qgrams(norm, 3):
+                found.update(trigrams[gram])
+            if len(norm) < _TRIGRAM_MIN_PAIR_LEN - 1:
+                for gram in _qgrams(norm, 2):
+                    found.update(bigrams[gram])
+            if len(norm) < _BIGRAM_MIN_PAIR_LEN - 1:
+                found.update(tiny)
+        found.discard(pos)
+        length = len(norm)
+        candidates.append(
+            sorted(
+                other
+                for other in found
+                if 2.0 * min(length, len(norms[other])) / (length + len(norms[other])) >= _COLUMN_SIMILARITY
+            )
+        )
+    return candidates
+
+
 def _cluster_columns(items: Sequence[MutableMapping[str, str]]) -> Dict[str, str]:
     value_lists: Dict[str, List[str]] = defaultdict(list)
     counts: Counter[str] = Counter()
@@ -236,30 +289,38 @@ def _cluster_columns(items: Sequence[MutableMapping[str, str]]) -> Dict[str, str
                 value_lists[key].append(value)
                 counts[key] += 1
     keys = list(value_lists.keys())
+    norms = [_normalize_key_name(key) for key in keys]
+    types: Dict[int, str] = {}
+
+    def _type_of(pos: int) -> str:
+        if pos not in types:
+            types[pos] = _value_type(value_lists[keys[pos]])
+        return types[pos]
+
     mapping: Dict[str, str] = {}
-    used: Set[str] = set()
-    for key in keys:
-        if key in used:
+    used: Set[int] = set()
+    # Names are only compared with their q-gram/length candidates, in the
+    # original key order, so groups match the all-pairs greedy pass.
+    for pos, candidates in enumerate(_column_candidates(norms)):
+        if pos in used:
             continue
-        norm_key = _normalize_key_name(key)
-        group = [key]
-        group_types = {_value_type(value_lists[key])}
-        used.add(key)
-        for other in keys:
+        norm_key = norms[pos]
+        group = [keys[pos]]
+        group_types = {_type_of(pos)}
+        used.add(pos)
+        matcher = SequenceMatcher(None, norm_key)
+        for other in candidates:
             if other in used:
                 continue
-            other_norm = _normalize_key_name(other)
-            if not norm_key or not other_norm:
-                continue
-            similarity = SequenceMatcher(None, norm_key, other_norm).ratio()
-            if similarity < 0.86:
+            matcher.set_seq2(norms[other])
+            if matcher.quick_ratio() < _COLUMN_SIMILARITY or matcher.ratio() < _COLUMN_SIMILARITY:
                 continue
-            other_type = _value_type(value_lists[other])
+            other_type = _type_of(other)
             if ("numeric" in group_types and other_type in {"text", "mixed"}) or (
                 other_type == "numeric" and group_types & {"text", "mixed"}
             ):
                 continue
-            group.append(other)
+            group.append(keys[other])
             group_types.add(other_type)
             used.add(other)
         if len(group) <= 1:
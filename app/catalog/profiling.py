@@ -0,0 +1,115 @@
+"""Per-stage cost accounting for catalog ingestion.
+
+A :class:`StageProfile` travels through one upload (PDF indexing, block
+parsing, row finalization, CSV writing) and records wall time, CPU time,
+peak RSS growth and item counts per stage. Streamed stages are entered once
+per page/block and their costs add up. The result lands in the index
+manifest and the job status, and :func:`observe_stage_profile` exports it
+as Prometheus histograms.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+from app.metrics import (
+    CATALOG_INGEST_STAGE_CPU_SECONDS,
+    CATALOG_INGEST_STAGE_RSS_BYTES,
+    CATALOG_INGEST_STAGE_SECONDS,
+)
+
+T = TypeVar("T")
+
+# ru_maxrss is kilobytes on Linux and bytes on macOS.
+_MAXRSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss) * _MAXRSS_UNIT
+
+
+class StageProfile:
+    """Accumulated cost of each ingestion stage of one upload.
+
+    CPU time and peak RSS are those of the calling process; PDF pages
+    extracted by pool workers show up as wall time of ``extract_pages``.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def _entry(self, name: str) -> Dict[str, float]:
+        entry = self.stages.get(name)
+        if entry is None:
+            entry = self.stages[name] = {"wall_s": 0.0, "cpu_s": 0.0, "rss_delta_bytes": 0, "items": 0, "calls": 0}
+        return entry
+
+    @contextlib.contextmanager
+    def stage(self, name: str, *, items: int = 0) -> Iterator[Dict[str, float]]:
+        """Time the body as one entry of ``name``; the entry dict is yielded
+        so the body can add to ``items``."""
+
+        entry = self._entry(name)
+        rss_start = _peak_rss_bytes()
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry["wall_s"] += time.perf_counter() - wall_start
+            entry["cpu_s"] += time.process_time() - cpu_start
+            rss_end = _peak_rss_bytes()
+            if rss_start is not None and rss_end is not None:
+                entry["rss_delta_bytes"] += max(0, rss_end - rss_start)
+            entry["items"] += items
+            entry["calls"] += 1
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterator[T]:
+        """Yield from ``iterable``, charging the time spent producing each
+        item (not the caller's work on it) to ``name``."""
+
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name) as entry:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                entry["items"] += 1
+            yield item
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "wall_s": round(entry["wall_s"], 4),
+                "cpu_s": round(entry["cpu_s"], 4),
+                "rss_delta_bytes": int(entry["rss_delta_bytes"]),
+                "items": int(entry["items"]),
+                "calls": int(entry["calls"]),
+            }
+            for name, entry in self.stages.items()
+        }
+
+
+def observe_stage_profile(stages: Mapping[str, Mapping[str, Any]], file_type: str) -> None:
+    """Export a finished upload's ``StageProfile.to_dict()`` to Prometheus."""
+
+    for name, entry in stages.items():
+        CATALOG_INGEST_STAGE_SECONDS.labels(stage=name, file_type=file_type).observe(float(entry.get("wall_s") or 0.0))
+        CATALOG_INGEST_STAGE_CPU_SECONDS.labels(stage=name, file_type=file_type).observe(float(entry.get("cpu_s") or 0.0))
+        CATALOG_INGEST_STAGE_RSS_BYTES.labels(stage=name, file_type=file_type).observe(
+            float(entry.get("rss_delta_bytes") or 0)
+        )
+
+
+__all__ = ["StageProfile", "observe_stage_profile"]
@@ -0,0 +1,137 @@
+"""Per-tenant cache of catalog search results.
+
+Entries hold only ``(item index, score, excerpt)`` hits, keyed by catalog
+version plus the normalized query, needs and limit. A tenant's entries are
+dropped as soon as a lookup arrives with a different catalog version.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from app.metrics import CATALOG_QUERY_CACHE_COUNTER, CATALOG_QUERY_CACHE_ENTRIES
+
+# Entries kept per tenant and seconds an entry stays valid; 0 disables.
+QUERY_CACHE_SIZE = max(0, int(os.getenv("CATALOG_QUERY_CACHE_SIZE", "256")))
+QUERY_CACHE_TTL = max(0.0, float(os.getenv("CATALOG_QUERY_CACHE_TTL", "600")))
+
+QueryKey = Tuple[str, str, int]
+Hits = Tuple[Any, ...]
+
+
+class _TenantBucket:
+    __slots__ = ("version", "entries")
+
+    def __init__(self, version: str) -> None:
+        self.version = version
+        # LRU order: least recently used first; value is (stored_at, hits)
+        self.entries: "OrderedDict[QueryKey, Tuple[float, Hits]]" = OrderedDict()
+
+
+_BUCKETS: Dict[Optional[int], _TenantBucket] = {}
+_ENTRIES = 0
+_LOCK = threading.Lock()
+
+
+def _normalize_needs(needs: Optional[Dict[str, Any]]) -> str:
+    cleaned = {str(key): value for key, value in (needs or {}).items() if value not in (None, "", [], {})}
+    try:
+        return json.dumps(cleaned, sort_keys=True, ensure_ascii=False, default=str)
+    except Exception:
+        return repr(sorted(cleaned.items(), key=lambda pair: pair[0]))
+
+
+def query_cache_key(query: Optional[str], needs: Optional[Dict[str, Any]], limit: int) -> QueryKey:
+    """Cache key for one search; case and whitespace do not affect ranking."""
+
+    text = " ".join(str(query or "").lower().split())
+    return (text, _normalize_needs(needs), int(limit))
+
+
+def _bucket_locked(tenant: Optional[int], version: str) -> _TenantBucket:
+    global _ENTRIES
+    bucket = _BUCKETS.get(tenant)
+    if bucket is None or bucket.version != version:
+        if bucket is not None:
+            _ENTRIES -= len(bucket.entries)
+        bucket = _TenantBucket(version)
+        _BUCKETS[tenant] = bucket
+    return bucket
+
+
+def get_cached_hits(tenant: Optional[int], version: str, key: QueryKey) -> Optional[Hits]:
+    if QUERY_CACHE_SIZE <= 0 or not version:
+        return None
+    global _ENTRIES
+    with _LOCK:
+        bucket = _bucket_locked(tenant, version)
+        entry = bucket.entries.get(key)
+        if entry is not None and QUERY_CACHE_TTL and time.monotonic() - entry[0] > QUERY_CACHE_TTL:
+            del bucket.entries[key]
+            _ENTRIES -= 1
+            entry = None
+        if entry is None:
+            CATALOG_QUERY_CACHE_COUNTER.labels("miss").inc()
+            CATALOG_QUERY_CACHE_ENTRIES.set(_ENTRIES)
+            return None
+        bucket.entries.move_to_end(key)
+        CATALOG_QUERY_CACHE_COUNTER.labels("hit").inc()
+        return entry[1]
+
+
+def store_hits(tenant: Optional[int], version: str, key: QueryKey, hits: Hits) -> None:
+    if QUERY_CACHE_SIZE <= 0 or not version:
+        return
+    global _ENTRIES
+    with _LOCK:
+        bucket = _bucket_locked(tenant, version)
+        if key not in bucket.entries:
+            _ENTRIES += 1
+        bucket.entries[key] = (time.monotonic(), tuple(hits))
+        bucket.entries.move_to_end(key)
+        while len(bucket.entries) > QUERY_CACHE_SIZE:
+            bucket.entries.popitem(last=False)
+            _ENTRIES -= 1
+        CATALOG_QUERY_CACHE_ENTRIES.set(_ENTRIES)
+
+
+def drop_tenant(tenant: Optional[int]) -> None:
+    global _ENTRIES
+    with _LOCK:
+        bucket = _BUCKETS.pop(tenant, None)
+        if bucket is not None:
+            _ENTRIES -= len(bucket.entries)
+        CATALOG_QUERY_CACHE_ENTRIES.set(_ENTRIES)
+
+
+def clear_query_cache() -> None:
+    global _ENTRIES
+    with _LOCK:
+        _BUCKETS.clear()
+        _ENTRIES = 0
+        CATALOG_QUERY_CACHE_ENTRIES.set(0)
+
+
+def query_cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        return {
+            "entries": _ENTRIES,
+            "tenants": len(_BUCKETS),
+            "max_per_tenant": QUERY_CACHE_SIZE,
+            "ttl_seconds": QUERY_CACHE_TTL,
+        }
+
+
+__all__ = [
+    "clear_query_cache",
+    "drop_tenant",
+    "get_cached_hits",
+    "query_cache_key",
+    "query_cache_stats",
+    "store_hits",
+]
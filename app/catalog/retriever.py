@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import heapq
 import math
 import re
-from typing import Any, Dict, List, Optional, Sequence, Set
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
 
 try:
     from sklearn.metrics.pairwise import linear_kernel  # type: ignore
@@ -12,6 +13,11 @@ except ImportError:  # pragma: no cover - optional dependency missing
     except ImportError:
         linear_kernel = None  # type: ignore[assignment]
 
+try:
+    from app.sklearn.metrics.pairwise import top_k_linear_kernel  # type: ignore
+except ImportError:  # pragma: no cover - shim unavailable
+    top_k_linear_kernel = None  # type: ignore[assignment]
+
 from .indexer import ensure_catalog_index
 
 _WORD_RE = re.compile(r"[\wёЁ]+", re.UNICODE)
@@ -93,14 +99,16 @@ def _token_overlap_score(query_tokens: Set[str], item_tokens: Set[str]) -> float
     return (precision * 0.7) + (recall * 0.3)
 
 
-def retrieve_context(
+def rank_context(
     *,
     items: Sequence[Dict[str, Any]],
     needs: Optional[Dict[str, Any]] = None,
     query: str | None = None,
     tenant: Optional[int] = None,
     limit: int = 5,
-) -> List[Dict[str, Any]]:
+) -> List[Tuple[int, float, str]]:
+    """Like :func:`retrieve_context` but returns ``(item index, score, excerpt)``."""
+
     if not items:
         return []
 
@@ -121,46 +129,75 @@ def retrieve_context(
     tokens = _extract_tokens(search_text)
     query_token_set = set(tokens)
 
-    if linear_kernel is not None and getattr(index, "vectorizer", None) is not None and matrix is not None:
-        query_vec = index.vectorizer.transform([search_text])
-        scores_row = linear_kernel(query_vec, matrix)[0]
-        if hasattr(scores_row, "tolist"):
-            scores_list = list(scores_row.tolist())
-        elif isinstance(scores_row, list):
-            scores_list = scores_row
-        else:
-            scores_list = list(scores_row)
+    # Only the best ``limit`` rows are ever returned, so rank with a bounded
+    # heap instead of sorting every score.
+    top_k = limit if limit > 0 else len(index.items)
+    ranked: List[Tuple[int, float]]
+    vectorizer = getattr(index, "vectorizer", None)
+    if (
+        top_k_linear_kernel is not None
+        and vectorizer is not None
+        and getattr(matrix, "postings", None) is not None
+    ):
+        # Shim index: walk the postings lists of the query terms only.
+        query_vec = vectorizer.transform([search_text])
+        ranked = top_k_linear_kernel(query_vec, matrix, top_k)[0]
     else:
-        token_sets = getattr(index, "tokens", [])
-        scores_list = [
-            _token_overlap_score(query_token_set, token_sets[idx] if idx < len(token_sets) else set())
-            for idx in range(len(index.items))
-        ]
+        if linear_kernel is not None and vectorizer is not None and matrix is not None:
+            query_vec = vectorizer.transform([search_text])
+            scores_row = linear_kernel(query_vec, matrix)[0]
+            if hasattr(scores_row, "tolist"):
+                scores_list = list(scores_row.tolist())
+            elif isinstance(scores_row, list):
+                scores_list = scores_row
+            else:
+                scores_list = list(scores_row)
+        else:
+            token_sets = getattr(index, "tokens", [])
+            scores_list = [
+                _token_overlap_score(query_token_set, token_sets[idx] if idx < len(token_sets) else set())
+                for idx in range(len(index.items))
+            ]
 
-    if not scores_list:
-        return []
+        if not scores_list:
+            return []
 
-    scored_indices = sorted(
-        range(len(scores_list)), key=lambda idx: scores_list[idx], reverse=True
-    )
+        ranked = [
+            (idx, scores_list[idx])
+            for idx in heapq.nlargest(top_k, range(len(scores_list)), key=scores_list.__getitem__)
+        ]
 
     threshold = _score_threshold(len(index.items))
-    results: List[Dict[str, Any]] = []
-    for idx in scored_indices:
-        score = float(scores_list[idx])
+    hits: List[Tuple[int, float, str]] = []
+    for idx, raw_score in ranked:
+        score = float(raw_score)
         if math.isclose(score, 0.0) or score < threshold:
-            if results:
+            if hits:
                 break
             continue
-        excerpt = _highlight_excerpt(index.texts[idx], tokens)
-        results.append(_attach_metadata(index.items[idx], score, excerpt))
-        if 0 < limit <= len(results):
+        hits.append((idx, score, _highlight_excerpt(index.texts[idx], tokens)))
+        if 0 < limit <= len(hits):
             break
 
-    if results:
-        return results
+    if hits:
+        return hits
 
     # If nothing crosses the threshold, surface top item to avoid empty context
-    best_idx = scored_indices[0]
-    best_excerpt = _highlight_excerpt(index.texts[best_idx], tokens)
-    return [_attach_metadata(index.items[best_idx], float(scores_list[best_idx]), best_excerpt)]
+    best_idx, best_score = ranked[0] if ranked else (0, 0.0)
+    return [(best_idx, float(best_score), _highlight_excerpt(index.texts[best_idx], tokens))]
+
+
+def materialize_hits(items: Sequence[Dict[str, Any]], hits: Sequence[Tuple[int, float, str]]) -> List[Dict[str, Any]]:
+    return [_attach_metadata(items[idx], score, excerpt) for idx, score, excerpt in hits]
+
+
+def retrieve_context(
+    *,
+    items: Sequence[Dict[str, Any]],
+    needs: Optional[Dict[str, Any]] = None,
+    query: str | None = None,
+    tenant: Optional[int] = None,
+    limit: int = 5,
+) -> List[Dict[str, Any]]:
+    hits = rank_context(items=items, needs=needs, query=query, tenant=tenant, limit=limit)
+    return materialize_hits(items, hits)
@@ -7,21 +7,24 @@ metadata colocated.
 """
 from __future__ import annotations
 
+import concurrent.futures
 import csv
 import hashlib
 import json
 import logging
 import math
+import multiprocessing
+import os
 import re
 import json as _json
 import sys
 import time
 import uuid
-from collections import Counter, defaultdict
-from dataclasses import dataclass
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass, replace
 from difflib import SequenceMatcher
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 try:
     from catalog.pipeline import (
@@ -32,6 +35,7 @@ try:
         sanitize_value as _sanitize_value,
         title_contains_forbidden as _title_contains_forbidden,
     )
+    from catalog.profiling import StageProfile
 except ImportError:  # pragma: no cover - fallback for tooling imports
     import sys
 
@@ -48,6 +52,7 @@ except ImportError:  # pragma: no cover - fallback for tooling imports
         sanitize_value as _sanitize_value,
         title_contains_forbidden as _title_contains_forbidden,
     )
+    from app.catalog.profiling import StageProfile
 
 try:
     from pypdf import PdfReader
@@ -86,17 +91,95 @@ def _decode_pdf_text(raw: bytes) -> str:
         idx += 1
     return "".join(result_chars)
 
-def _extract_pdf_pages(source: Path) -> list[tuple[int, str]]:
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except ValueError:
+        return default
+
+
+# Page text extraction is CPU-bound; large PDFs are split across processes.
+# CATALOG_PDF_WORKERS=0 splits the cores between the catalog worker's
+# concurrent jobs (CATALOG_WORKER_CONCURRENCY), 1 keeps extraction sequential.
+PDF_WORKERS = _env_int("CATALOG_PDF_WORKERS", 0)
+JOB_CONCURRENCY = max(1, _env_int("CATALOG_WORKER_CONCURRENCY", 2))
+# Each worker gets at least this many pages, so small files stay sequential.
+PDF_PAGES_PER_WORKER = max(1, _env_int("CATALOG_PDF_PAGES_PER_WORKER", 16))
+
+
+def _extract_page_range(source: str, start: int, stop: int) -> list[tuple[int, str]]:
+    """Extract pages ``start..stop-1`` (0-based) in a pool worker."""
+
+    return list(_iter_page_range(PdfReader(source), start, stop))
+
+
+def _iter_page_range(reader: Any, start: int, stop: int) -> Iterator[tuple[int, str]]:
+    for offset in range(start, stop):
+        try:
+            extracted = reader.pages[offset].extract_text() or ""
+        except Exception as exc:  # pragma: no cover - parity with real parser
+            raise CatalogIndexError(f"failed to extract text from page {offset + 1}: {exc}")
+        yield offset + 1, extracted
+
+
+def _pdf_worker_count(page_count: int, workers: int | None = None) -> int:
+    configured = PDF_WORKERS if workers is None else workers
+    if configured <= 0:
+        configured = (os.cpu_count() or 1) // JOB_CONCURRENCY
+    return max(1, min(configured, page_count // PDF_PAGES_PER_WORKER))
+
+
+def _pdf_pool_context() -> Any:
+    # The upload job runs on a web server thread, where plain fork is unsafe.
+    # A forkserver imports this module once and forks cheap workers from it.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def _iter_pages_parallel(source: Path, start: int, page_count: int, workers: int) -> Iterator[tuple[int, str]]:
+    # Small ranges, at most two per worker in flight: pages are yielded in
+    # order while only a bounded window of extracted text is held.
+    step = max(1, min(math.ceil((page_count - start) / (workers * 2)), PDF_PAGES_PER_WORKER))
+    ranges = iter(range(start, page_count, step))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=_pdf_pool_context()) as pool:
+        pending: Deque[concurrent.futures.Future] = deque()
+        for range_start in ranges:
+            pending.append(pool.submit(_extract_page_range, str(source), range_start, min(range_start + step, page_count)))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _iter_pdf_pages(source: Path, *, workers: int | None = None) -> Iterator[tuple[int, str]]:
+    """Yield ``(page number, text)`` in page order without holding the whole document."""
+
     if PdfReader is not None:
         reader = PdfReader(str(source))
-        pages = []
-        for idx, page in enumerate(reader.pages, start=1):
+        page_count = len(reader.pages)
+        next_offset = 0
+        worker_count = _pdf_worker_count(page_count, workers)
+        if worker_count > 1:
             try:
-                extracted = page.extract_text() or ""
-            except Exception as exc:  # pragma: no cover - parity with real parser
-                raise CatalogIndexError(f"failed to extract text from page {idx}: {exc}")
-            pages.append((idx, extracted))
-        return pages
+                for page in _iter_pages_parallel(source, 0, page_count, worker_count):
+                    yield page
+                    next_offset = page[0]
+            except CatalogIndexError:
+                raise
+            except Exception as exc:
+                logger.warning(
+                    "parallel pdf extraction failed, falling back to sequential: source=%s page=%s error=%s",
+                    source,
+                    next_offset + 1,
+                    exc,
+                )
+            else:
+                return
+        yield from _iter_page_range(reader, next_offset, page_count)
+        return
 
     import re
 
@@ -106,7 +189,6 @@ def _extract_pdf_pages(source: Path) -> list[tuple[int, str]]:
         raise CatalogIndexError(f"failed to read PDF: {exc}")
 
     streams = re.findall(rb"stream\s*(.*?)\s*endstream", data, re.DOTALL)
-    pages: list[tuple[int, str]] = []
     for idx, stream in enumerate(streams, start=1):
         fragments: list[str] = []
         for match in re.finditer(rb"\((.*?)(?<!\\)\)", stream, re.DOTALL):
@@ -114,8 +196,11 @@ def _extract_pdf_pages(source: Path) -> list[tuple[int, str]]:
             if text_piece:
                 fragments.append(text_piece)
         if fragments:
-            pages.append((idx, "\n".join(fragments)))
-    return pages
+            yield idx, "\n".join(fragments)
+
+
+def _extract_pdf_pages(source: Path, *, workers: int | None = None) -> list[tuple[int, str]]:
+    return list(_iter_pdf_pages(source, workers=workers))
 
 
 @dataclass(frozen=True)
@@ -135,6 +220,9 @@ class CatalogChunk:
             "identifiers": list(self.identifiers),
         }
 
+    def to_row(self) -> List[Any]:
+        return [self.chunk_id, self.page, self.title, self.text, list(self.identifiers)]
+
 
 def _normalize_whitespace(value: str) -> str:
     collapsed = re.sub(r"[\u00a0\t]+", " ", value)
@@ -1147,6 +1235,181 @@ def _hash_file(path: Path) -> str:
     return digest.hexdigest()
 
 
+# Formats 2 and 3 are still one JSON document, laid out as a header line
+# ending in ``"chunks": [``, one chunk per line and a closing ``]}`` line, so
+# the header is read without touching the chunks and chunks are written and
+# read back one at a time. Format 2 stores chunks as objects; format 3 stores
+# compact positional rows whose fields the header lists in ``chunk_fields``.
+# Format 1 (a single indented document) is only read.
+INDEX_FORMAT = 3
+_LINE_FORMATS = (2, 3)
+_CHUNK_FIELDS = ("id", "page", "title", "text", "identifiers")
+_CHUNKS_OPEN = ', "chunks": [\n'
+_CHUNKS_CLOSE = "]}\n"
+
+
+# Bump when chunking or block parsing changes: indexes and cached items built
+# by another parser version are rebuilt instead of reused.
+PARSER_VERSION = 1
+_ITEMS_SUFFIX = ".items.json"
+# Spool/tmp files younger than this may belong to an upload still in progress.
+_STALE_SPOOL_SECONDS = 3600
+_SHA1_RE = re.compile(r'"sha1"\s*:\s*"([0-9a-f]{40})"')
+
+
+def index_filename(sha1: str) -> str:
+    """Content-addressed index name: the same source file maps to one index."""
+
+    return f"catalog_{sha1}.json"
+
+
+def _chunk_from_dict(chunk: Dict[str, Any]) -> CatalogChunk:
+    return CatalogChunk(
+        chunk_id=chunk.get("id", uuid.uuid4().hex),
+        page=int(chunk.get("page", 0) or 0),
+        title=str(chunk.get("title") or ""),
+        text=str(chunk.get("text") or ""),
+        identifiers=tuple(chunk.get("identifiers") or ()),
+    )
+
+
+def _chunk_from_line(line: str) -> CatalogChunk:
+    data = json.loads(line.rstrip(","))
+    if isinstance(data, list):
+        data = dict(zip(_CHUNK_FIELDS, data))
+    return _chunk_from_dict(data)
+
+
+class _IndexChunks(Sequence[CatalogChunk]):
+    """Chunks of a format 2/3 index file, read lazily on each iteration."""
+
+    def __init__(self, path: Path, count: int) -> None:
+        self._path = path
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[CatalogChunk]:
+        with self._path.open("r", encoding="utf-8") as handle:
+            handle.readline()
+            for line in handle:
+                line = line.strip()
+                if not line or line == _CHUNKS_CLOSE.strip():
+                    break
+                yield _chunk_from_line(line)
+
+    def __getitem__(self, idx):  # type: ignore[override]
+        if isinstance(idx, slice):
+            return list(self)[idx]
+        if idx < 0:
+            idx += self._count
+        for pos, chunk in enumerate(self):
+            if pos == idx:
+                return chunk
+        raise IndexError(idx)
+
+
+def _read_index_header(path: Path) -> Optional[Dict[str, Any]]:
+    with path.open("r", encoding="utf-8") as handle:
+        first = handle.readline()
+    if not first.endswith(_CHUNKS_OPEN):
+        return None
+    try:
+        header = json.loads(first[: -len(_CHUNKS_OPEN)] + "}")
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("format") not in _LINE_FORMATS:
+        return None
+    return header
+
+
+def _write_index_file(index_path: Path, header: Dict[str, Any], chunk_lines: Path) -> None:
+    tmp_path = index_path.with_name(f".{index_path.name}.{header['catalog_id']}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as out, chunk_lines.open("r", encoding="utf-8") as lines:
+        out.write(json.dumps(header, ensure_ascii=False, separators=(",", ":"))[:-1] + _CHUNKS_OPEN)
+        separator = ""
+        for line in lines:
+            out.write(separator)
+            out.write(line.rstrip("\n"))
+            separator = ",\n"
+        out.write("\n" + _CHUNKS_CLOSE)
+    os.replace(tmp_path, index_path)
+
+
+def _index_sha1(path: Path) -> Optional[str]:
+    header = _read_index_header(path)
+    if header is not None:
+        return str(header.get("sha1") or "") or None
+    # Format 1 files are one JSON document with the header keys first.
+    with path.open("r", encoding="utf-8", errors="ignore") as handle:
+        match = _SHA1_RE.search(handle.read(64 * 1024))
+    return match.group(1) if match else None
+
+
+def _index_artifacts(index_path: Path) -> List[Path]:
+    return [
+        index_path,
+        index_path.with_suffix(".csv"),
+        index_path.with_suffix(".manifest.json"),
+        index_path.with_suffix(_ITEMS_SUFFIX),
+    ]
+
+
+def _reusable_index(index_path: Path, sha1: str, *, chunk_chars: int, overlap: int) -> Optional[CatalogIndex]:
+    try:
+        header = _read_index_header(index_path)
+    except OSError:
+        return None
+    if (
+        header is None
+        or header.get("format") != INDEX_FORMAT
+        or header.get("sha1") != sha1
+        or header.get("parser_version") != PARSER_VERSION
+        or header.get("chunk_chars") != chunk_chars
+        or header.get("overlap") != overlap
+        or not header.get("chunk_count")
+    ):
+        return None
+    return load_index(index_path)
+
+
+def prune_index_artifacts(output_dir: Path, sha1: str, keep: Path) -> int:
+    """Remove other indexes of the same source file plus abandoned spool files.
+
+    Catalog entries that still point at a removed index are re-resolved by
+    hash on the next read, which lands on ``keep``.
+    """
+
+    removed = 0
+    now = time.time()
+    for candidate in output_dir.glob("catalog_*.json"):
+        if candidate.name == keep.name or candidate.name.endswith((".manifest.json", _ITEMS_SUFFIX)):
+            continue
+        try:
+            if _index_sha1(candidate) != sha1:
+                continue
+        except OSError:
+            continue
+        for artifact in _index_artifacts(candidate):
+            try:
+                artifact.unlink()
+                removed += 1
+            except FileNotFoundError:
+                continue
+            except OSError:
+                logger.warning("catalog index artifact not removed path=%s", artifact, exc_info=True)
+    for pattern in (".catalog_*.chunks", ".catalog_*.tmp"):
+        for leftover in output_dir.glob(pattern):
+            try:
+                if now - leftover.stat().st_mtime > _STALE_SPOOL_SECONDS:
+                    leftover.unlink()
+                    removed += 1
+            except OSError:
+                continue
+    return removed
+
+
 def build_pdf_index(
     source: Path,
     *,
@@ -1155,56 +1418,72 @@ def build_pdf_index(
     original_name: str | None = None,
     chunk_chars: int = 700,
     overlap: int = 120,
+    profile: Optional[StageProfile] = None,
 ) -> CatalogIndex:
     source = source.resolve()
     if not source.exists():
         raise CatalogIndexError(f"source file not found: {source}")
 
-    pages = _extract_pdf_pages(source)
-    page_count = max((idx for idx, _ in pages), default=0)
-
-    chunks: List[CatalogChunk] = []
-    for idx, extracted in pages:
-        text = _normalize_whitespace(extracted)
-        if not text:
-            continue
-        for part in _chunk_text(text, max_chars=chunk_chars, overlap=overlap):
-            chunk_id = uuid.uuid4().hex
-            identifiers = _extract_identifiers(part)
-            title = _guess_title(part, page=idx)
-            chunks.append(
-                CatalogChunk(
-                    chunk_id=chunk_id,
-                    page=idx,
-                    title=title,
-                    text=part,
-                    identifiers=identifiers,
-                )
-            )
-
-    if not chunks:
-        raise CatalogIndexError("catalog did not produce any text chunks")
-
     sha1 = _hash_file(source)
-    generated_at = int(time.time())
-    catalog_id = uuid.uuid4().hex
-
     output_dir.mkdir(parents=True, exist_ok=True)
-    index_path = output_dir / f"catalog_{catalog_id}.json"
+    index_path = output_dir / index_filename(sha1)
+    existing = _reusable_index(index_path, sha1, chunk_chars=chunk_chars, overlap=overlap)
+    if existing is not None:
+        logger.info("catalog index reused path=%s sha1=%s", index_path, sha1)
+        prune_index_artifacts(output_dir, sha1, index_path)
+        return replace(existing, source_path=source_relpath, original_name=original_name)
 
-    payload = {
-        "format": 1,
-        "catalog_id": catalog_id,
-        "source_path": source_relpath,
-        "original_name": original_name,
-        "generated_at": generated_at,
-        "sha1": sha1,
-        "page_count": page_count,
-        "chunk_count": len(chunks),
-        "chunks": [chunk.to_dict() for chunk in chunks],
-    }
+    generated_at = int(time.time())
+    catalog_id = uuid.uuid4().hex
+    # Chunks are spooled as they are produced; the header needs their count.
+    spool_path = output_dir / f".catalog_{catalog_id}.chunks"
 
-    index_path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+    page_count = 0
+    chunk_count = 0
+    try:
+        profile = profile if profile is not None else StageProfile()
+        with spool_path.open("w", encoding="utf-8") as spool:
+            for idx, extracted in profile.iterate("extract_pages", _iter_pdf_pages(source)):
+                page_count = max(page_count, idx)
+                with profile.stage("chunk_text") as chunking:
+                    text = _normalize_whitespace(extracted)
+                    if not text:
+                        continue
+                    for part in _chunk_text(text, max_chars=chunk_chars, overlap=overlap):
+                        chunk = CatalogChunk(
+                            chunk_id=uuid.uuid4().hex,
+                            page=idx,
+                            title=_guess_title(part, page=idx),
+                            text=part,
+                            identifiers=_extract_identifiers(part),
+                        )
+                        spool.write(json.dumps(chunk.to_row(), ensure_ascii=False, separators=(",", ":")) + "\n")
+                        chunk_count += 1
+                        chunking["items"] += 1
+
+        if not chunk_count:
+            raise CatalogIndexError("catalog did not produce any text chunks")
+
+        header = {
+            "format": INDEX_FORMAT,
+            "chunk_fields": list(_CHUNK_FIELDS),
+            "catalog_id": catalog_id,
+            "source_path": source_relpath,
+            "original_name": original_name,
+            "generated_at": generated_at,
+            "sha1": sha1,
+            "page_count": page_count,
+            "chunk_count": chunk_count,
+            "parser_version": PARSER_VERSION,
+            "chunk_chars": chunk_chars,
+            "overlap": overlap,
+        }
+        _write_index_file(index_path, header, spool_path)
+    finally:
+        spool_path.unlink(missing_ok=True)
+    # Cached items of a previous build under the same name are stale now.
+    index_path.with_suffix(_ITEMS_SUFFIX).unlink(missing_ok=True)
+    prune_index_artifacts(output_dir, sha1, index_path)
 
     return CatalogIndex(
         catalog_id=catalog_id,
@@ -1213,25 +1492,25 @@ def build_pdf_index(
         generated_at=generated_at,
         sha1=sha1,
         page_count=page_count,
-        chunk_count=len(chunks),
-        chunks=chunks,
+        chunk_count=chunk_count,
+        chunks=_IndexChunks(index_path, chunk_count),
         index_path=index_path,
     )
 
 
 def load_index(path: Path) -> CatalogIndex:
-    data = json.loads(path.read_text(encoding="utf-8"))
-    chunks = [
-        CatalogChunk(
-            chunk_id=chunk.get("id", uuid.uuid4().hex),
-            page=int(chunk.get("page", 0) or 0),
-            title=str(chunk.get("title") or ""),
-            text=str(chunk.get("text") or ""),
-            identifiers=tuple(chunk.get("identifiers") or ()),
-        )
-        for chunk in data.get("chunks", [])
-    ]
-    if not chunks:
+    """Open an index; line-format chunks are only read when iterated."""
+
+    header = _read_index_header(path)
+    if header is not None:
+        chunk_count = int(header.get("chunk_count", 0) or 0)
+        chunks: Sequence[CatalogChunk] = _IndexChunks(path, chunk_count)
+        data = header
+    else:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        chunks = [_chunk_from_dict(chunk) for chunk in data.get("chunks", [])]
+        chunk_count = len(chunks)
+    if not chunk_count:
         raise CatalogIndexError(f"index {path} does not contain chunks")
     return CatalogIndex(
         catalog_id=data.get("catalog_id") or "",
@@ -1240,71 +1519,137 @@ def load_index(path: Path) -> CatalogIndex:
         generated_at=int(data.get("generated_at", 0) or 0),
         sha1=data.get("sha1") or "",
         page_count=int(data.get("page_count", 0) or 0),
-        chunk_count=len(chunks),
+        chunk_count=chunk_count,
         chunks=chunks,
         index_path=path,
     )
 
 
-def index_to_catalog_items(index: CatalogIndex) -> List[Dict[str, Any]]:
-    blocks: List[ProductBlock] = []
-    for chunk in index.chunks:
+def _iter_product_blocks(chunks: Iterable[CatalogChunk]) -> Iterator[ProductBlock]:
+    for chunk in chunks:
         if not chunk.text:
             continue
         lines = _build_block_lines(chunk.text)
         for idx, block_lines in enumerate(_split_blocks(lines)):
             if not block_lines:
                 continue
-            block = _build_product_block(chunk, block_lines, idx)
-            blocks.append(block)
+            yield _build_product_block(chunk, block_lines, idx)
 
-    total_blocks = len(blocks)
-    def _has_inblock_title(block: ProductBlock) -> bool:
-        return any(idx >= 0 for idx, _ in block.title_candidates)
 
-    kept_blocks: List[ProductBlock] = []
-    for block in blocks:
+def _load_cached_items(index: CatalogIndex) -> Optional[List[Dict[str, Any]]]:
+    items_path = index.index_path.with_suffix(_ITEMS_SUFFIX)
+    if not (
+        index.index_path.with_suffix(".csv").exists() and index.index_path.with_suffix(".manifest.json").exists()
+    ):
+        return None
+    try:
+        data = json.loads(items_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(data, dict)
+        or data.get("parser_version") != PARSER_VERSION
+        or data.get("catalog_id") != index.catalog_id
+        or data.get("sha1") != index.sha1
+        or not isinstance(data.get("items"), list)
+    ):
+        return None
+    return data["items"]
+
+
+def _store_cached_items(index: CatalogIndex, items: List[Dict[str, Any]]) -> None:
+    items_path = index.index_path.with_suffix(_ITEMS_SUFFIX)
+    payload = {
+        "parser_version": PARSER_VERSION,
+        "catalog_id": index.catalog_id,
+        "sha1": index.sha1,
+        "items": items,
+    }
+    tmp_path = items_path.with_name(f".{items_path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, items_path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        logger.warning("catalog items cache not written path=%s", items_path, exc_info=True)
+
+
+def index_to_catalog_items(index: CatalogIndex, *, profile: Optional[StageProfile] = None) -> List[Dict[str, Any]]:
+    # The CSV, manifest and items of an index are derived from its chunks
+    # only, so a later call for the same index reuses them.
+    cached = _load_cached_items(index)
+    if cached is not None:
+        return cached
+    # Stages recorded by build_pdf_index on the same profile land in the
+    # manifest too.
+    profile = profile if profile is not None else StageProfile()
+
+    # Blocks are consumed one at a time; only the item rows, the manifest
+    # log entries and a single fallback candidate outlive their chunk.
+    total_blocks = 0
+    kept_count = 0
+    raw_items: List[Dict[str, Any]] = []
+    log_entries: List[Dict[str, Any]] = []
+    missing_price_count = 0
+    missing_price_examples: List[Dict[str, Any]] = []
+    fallback: Optional[ProductBlock] = None
+    fallback_key: Optional[Tuple[int, int]] = None
+
+    def _note_kept(block: ProductBlock) -> None:
+        nonlocal kept_count, missing_price_count
+        kept_count += 1
+        raw_items.append(_block_to_item(block))
+        if not (block.price and block.price.weight > 0):
+            missing_price_count += 1
+            if len(missing_price_examples) < 5:
+                missing_price_examples.append({"block_id": f"{block.chunk_id}:{block.index}", "text": block.text})
+
+    for block in profile.iterate("parse_blocks", _iter_product_blocks(index.chunks)):
+        total_blocks += 1
+        if block.score < 2:
+            log_entries.append(
+                {
+                    "block_id": f"{block.chunk_id}:{block.index}",
+                    "chunk_id": block.chunk_id,
+                    "page": block.chunk_page,
+                    "score": block.score,
+                    "reason": "non_product",
+                    "text": block.text,
+                }
+            )
         has_price = bool(block.price and block.price.weight > 0)
+        is_stop: Optional[bool] = None
         # Drop obvious non-product sections without price
-        if not has_price and _STOP_KEYWORDS_RE.search(block.text):
-            continue
+        if not has_price:
+            is_stop = bool(_STOP_KEYWORDS_RE.search(block.text))
         # Keep any reasonably product-like block (score>=2) or any with price
-        if has_price or block.score >= 2:
-            kept_blocks.append(block)
-    if not kept_blocks and blocks:
-        # Fallback: pick the most attribute-rich non-stop block to avoid
-        # returning an empty catalog for slim PDFs without explicit prices.
-        candidates = [b for b in blocks if not _STOP_KEYWORDS_RE.search(b.text)]
-        if candidates:
-            best = max(candidates, key=lambda b: (len(b.pairs), int(bool(b.title_candidates))))
-            if len(best.pairs) >= 1:
-                kept_blocks = [best]
-    dropped_blocks = [block for block in blocks if block.score < 2]
-
-    log_entries = [
-        {
-            "block_id": f"{block.chunk_id}:{block.index}",
-            "chunk_id": block.chunk_id,
-            "page": block.chunk_page,
-            "score": block.score,
-            "reason": "non_product",
-            "text": block.text,
-        }
-        for block in dropped_blocks
-    ]
-
-    raw_items = [_block_to_item(block) for block in kept_blocks]
+        if not is_stop and (has_price or block.score >= 2):
+            _note_kept(block)
+            fallback = None
+        elif not kept_count:
+            # Fallback for slim PDFs without explicit prices: remember the
+            # most attribute-rich non-stop block in case nothing is kept.
+            if is_stop is None:
+                is_stop = bool(_STOP_KEYWORDS_RE.search(block.text))
+            key = (len(block.pairs), int(bool(block.title_candidates)))
+            if not is_stop and (fallback_key is None or key > fallback_key):
+                fallback, fallback_key = block, key
+    if not kept_count and fallback is not None and len(fallback.pairs) >= 1:
+        _note_kept(fallback)
+    dropped_count = len(log_entries)
 
     items: List[Dict[str, Any]] = []
+    # Entered even with no rows, so every manifest lists the same stages.
+    with profile.stage("finalize_rows", items=len(raw_items)):
+        if raw_items:
+            # 1) Run normalization to get unique titles and merged column map
+            try:
+                finalized_rows, pipeline_header, report = _finalize_catalog_rows(raw_items, keep_existing_ids=False)
+            except Exception:
+                pipeline_header = ["id", "title", "price"]
+                report = PipelineReport(items=len(raw_items), columns=pipeline_header)
+                finalized_rows = [{"title": r.get("title", "")} for r in raw_items]
     if raw_items:
-        # 1) Run normalization to get unique titles and merged column map
-        try:
-            finalized_rows, pipeline_header, report = _finalize_catalog_rows(raw_items, keep_existing_ids=False)
-        except Exception:
-            pipeline_header = ["id", "title", "price"]
-            report = PipelineReport(items=len(raw_items), columns=pipeline_header)
-            finalized_rows = [{"title": r.get("title", "")} for r in raw_items]
-
         # 2) Build rich items preserving parsed characteristics and page
         items = []
         merged_map = getattr(report, "merged_columns_map", {}) or {}
@@ -1331,24 +1676,19 @@ def index_to_catalog_items(index: CatalogIndex) -> List[Dict[str, Any]]:
                 if k not in {"id", "title", "price", "page"}:
                     attr_keys.add(k)
         header_rich = ["id", "title", "price", *sorted(attr_keys)]
-        _write_csv(index.index_path, header_rich, items)
+        with profile.stage("write_csv", items=len(items)):
+            _write_csv(index.index_path, header_rich, items)
     else:
         header_rich = ["id", "title", "price"]
         report = PipelineReport(items=0, columns=header_rich)
-        _write_csv(index.index_path, header_rich, [])
+        with profile.stage("write_csv"):
+            _write_csv(index.index_path, header_rich, [])
 
-    missing_price_blocks = [block for block in kept_blocks if not (block.price and block.price.weight > 0)]
     price_examples: List[Dict[str, Any]] = []
-    if kept_blocks:
-        missing_ratio = len(missing_price_blocks) / max(len(kept_blocks), 1)
+    if kept_count:
+        missing_ratio = missing_price_count / max(kept_count, 1)
         if missing_ratio > 0.2:
-            for block in missing_price_blocks[:5]:
-                price_examples.append(
-                    {
-                        "block_id": f"{block.chunk_id}:{block.index}",
-                        "text": block.text,
-                    }
-                )
+            price_examples = missing_price_examples
 
     # Present merged_columns_map with display-friendly keys (capitalize if needed)
     merged_map_display = {}
@@ -1360,12 +1700,14 @@ def index_to_catalog_items(index: CatalogIndex) -> List[Dict[str, Any]]:
         merged_map_display = report.merged_columns_map
 
     manifest: Dict[str, Any] = {
+        "parser_version": PARSER_VERSION,
         "items_total": total_blocks,
-        "kept": len(kept_blocks),
-        "dropped_non_product": len(dropped_blocks),
+        "kept": kept_count,
+        "dropped_non_product": dropped_count,
         "columns": header_rich,
         "pipeline": report.to_dict(),
         "merged_columns_map": merged_map_display,
+        "stages": profile.to_dict(),
         "logs": log_entries,
     }
     if report.duplicate_titles_fixed:
@@ -1377,5 +1719,6 @@ def index_to_catalog_items(index: CatalogIndex) -> List[Dict[str, Any]]:
         manifest["price_missing_examples"] = price_examples
 
     _write_manifest(index.index_path, manifest)
+    _store_cached_items(index, items)
 
     return items
@@ -0,0 +1,193 @@
+"""Out-of-process runner for catalog upload jobs.
+
+Pops job specs pushed by ``/pub/catalog/upload`` (``CATALOG_INGEST_MODE=queue``)
+and runs ``app.web.public.run_catalog_job`` in a process pool of
+``CATALOG_WORKER_CONCURRENCY`` workers. Jobs of one tenant run one at a
+time and in upload order, because each of them rewrites the tenant's
+catalog config. Popped jobs are parked in ``<queue>:processing`` until they
+finish, and a restarted runner requeues whatever it left there; run a
+single replica. Per-stage ingestion histograms of finished jobs are served
+on ``CATALOG_WORKER_METRICS_PORT`` when it is set.
+
+    python -m app.catalog_worker
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import json
+import logging
+import os
+import signal
+import time
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Optional, Set
+
+import redis
+from prometheus_client import start_http_server
+from redis import exceptions as redis_ex
+
+from app.catalog.jobs import INGEST_PROCESSING_KEY, INGEST_QUEUE_KEY, CatalogJobStatus
+from app.catalog.profiling import observe_stage_profile
+
+logger = logging.getLogger("app.catalog_worker")
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+CONCURRENCY = max(1, int(os.getenv("CATALOG_WORKER_CONCURRENCY", "2")))
+# Jobs held back behind a busy tenant before the runner stops popping.
+MAX_PENDING = max(1, int(os.getenv("CATALOG_WORKER_MAX_PENDING", str(CONCURRENCY * 4))))
+METRICS_PORT = int(os.getenv("CATALOG_WORKER_METRICS_PORT", "0") or 0)
+_POP_TIMEOUT = 1.0
+
+
+def _run_job(raw: str) -> Optional[Dict[str, Any]]:
+    from app.web.public import run_catalog_job
+
+    # Pool processes are not scraped; the runner exports the profile.
+    return run_catalog_job(json.loads(raw), export_metrics=False)
+
+
+def _job_file_type(raw: str) -> str:
+    try:
+        ext = str(json.loads(raw).get("ext") or "").lower()
+    except (ValueError, AttributeError):
+        return "unknown"
+    return "pdf" if ext == ".pdf" else ("excel" if ext in {".xlsx", ".xls"} else "csv")
+
+
+def _job_tenant(raw: str) -> Optional[int]:
+    try:
+        job = json.loads(raw)
+        return int(job["tenant_id"])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _mark_crashed(raw: str, detail: str) -> None:
+    """Record a job whose worker process died; run_catalog_job never got to."""
+
+    try:
+        job = json.loads(raw)
+        from app.core import tenant_dir
+
+        status_path = tenant_dir(int(job["tenant_id"])) / "catalog_jobs" / str(job["job_id"]) / "status.json"
+        CatalogJobStatus.load(status_path).fail("job_crashed", detail=detail)
+    except Exception:
+        logger.warning("event=catalog_job_status_failed", exc_info=True)
+
+
+class CatalogJobRunner:
+    """Redis consumer that serializes jobs per tenant over a process pool."""
+
+    def __init__(self, client: redis.Redis, *, concurrency: int = CONCURRENCY, max_pending: int = MAX_PENDING) -> None:
+        self.client = client
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.running: Dict[concurrent.futures.Future, tuple[int, str, concurrent.futures.Executor]] = {}
+        self.busy: Set[int] = set()
+        self.pending: Dict[int, Deque[str]] = defaultdict(deque)
+        self.stopping = False
+        self._pool = self._new_pool()
+
+    def _new_pool(self) -> concurrent.futures.Executor:
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.concurrency)
+
+    def _replace_pool(self, broken: concurrent.futures.Executor) -> None:
+        # Every job of a broken pool fails at once; replace it only once.
+        if broken is self._pool:
+            broken.shutdown(wait=False)
+            self._pool = self._new_pool()
+
+    def requeue_inflight(self) -> int:
+        """Move jobs a previous runner left unfinished back to the queue head."""
+
+        moved = 0
+        while self.client.lmove(INGEST_PROCESSING_KEY, INGEST_QUEUE_KEY, "LEFT", "RIGHT") is not None:
+            moved += 1
+        if moved:
+            logger.info("event=catalog_jobs_requeued count=%s", moved)
+        return moved
+
+    def _submit(self, tenant: int, raw: str) -> None:
+        self.busy.add(tenant)
+        try:
+            future = self._pool.submit(_run_job, raw)
+        except concurrent.futures.BrokenExecutor:
+            self._replace_pool(self._pool)
+            future = self._pool.submit(_run_job, raw)
+        self.running[future] = (tenant, raw, self._pool)
+
+    def _finish(self, future: concurrent.futures.Future) -> None:
+        tenant, raw, pool = self.running.pop(future)
+        exc = future.exception()
+        if exc is not None:
+            # run_catalog_job records its own failures; this is a dead worker.
+            logger.error("event=catalog_job_crashed tenant=%s error=%s", tenant, exc)
+            _mark_crashed(raw, str(exc) or exc.__class__.__name__)
+            if isinstance(exc, concurrent.futures.BrokenExecutor):
+                self._replace_pool(pool)
+        elif future.result():
+            observe_stage_profile(future.result(), _job_file_type(raw))
+        self.client.lrem(INGEST_PROCESSING_KEY, 1, raw)
+        self.busy.discard(tenant)
+        queued = self.pending.get(tenant)
+        if queued and not self.stopping:
+            self._submit(tenant, queued.popleft())
+            if not queued:
+                del self.pending[tenant]
+
+    def _accept(self, raw: str) -> None:
+        tenant = _job_tenant(raw)
+        if tenant is None:
+            logger.warning("event=catalog_job_invalid preview=%s", raw[:160])
+            self.client.lrem(INGEST_PROCESSING_KEY, 1, raw)
+        elif tenant in self.busy:
+            self.pending[tenant].append(raw)
+        else:
+            self._submit(tenant, raw)
+
+    def step(self) -> None:
+        for future in [f for f in self.running if f.done()]:
+            self._finish(future)
+        pending_total = sum(len(queue) for queue in self.pending.values())
+        if self.stopping or len(self.running) >= self.concurrency or pending_total >= self.max_pending:
+            if self.running:
+                concurrent.futures.wait(
+                    list(self.running), timeout=_POP_TIMEOUT, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+            return
+        raw = self.client.blmove(INGEST_QUEUE_KEY, INGEST_PROCESSING_KEY, _POP_TIMEOUT, "RIGHT", "LEFT")
+        if raw is not None:
+            self._accept(raw)
+
+    def run(self) -> None:
+        logger.info(
+            "event=catalog_worker_start queue=%s concurrency=%s", INGEST_QUEUE_KEY, self.concurrency
+        )
+        self.requeue_inflight()
+        while not (self.stopping and not self.running):
+            try:
+                self.step()
+            except redis_ex.RedisError as exc:
+                logger.warning("event=catalog_worker_redis_error error=%s", exc)
+                time.sleep(1.0)
+        # Jobs still held for busy tenants stay in the processing list.
+        self._pool.shutdown(wait=True)
+        logger.info("event=catalog_worker_stop")
+
+    def stop(self, *_args: Any) -> None:
+        self.stopping = True
+
+
+def main() -> None:
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+    runner = CatalogJobRunner(redis.from_url(REDIS_URL, decode_responses=True))
+    signal.signal(signal.SIGTERM, runner.stop)
+    signal.signal(signal.SIGINT, runner.stop)
+    runner.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from __future__ import annotations
-import os, json, re, csv, asyncio, pathlib, time, random, hashlib, logging
-from typing import List, Dict, Any, Optional, Tuple, Mapping
+import os, json, re, csv, asyncio, pathlib, time, random, hashlib, logging, bisect, itertools
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple, Mapping
 from dataclasses import dataclass, field
 import urllib.request, urllib.error
 import yaml
@@ -36,6 +36,10 @@ try:
     from ..catalog import retriever as catalog_retriever  # type: ignore
 except Exception:  # pragma: no cover
     catalog_retriever = None
+from ..catalog import querycache as catalog_query_cache
+from ..catalog.diskindex import index_filename as catalog_index_filename
+from ..catalog import indexer as catalog_indexer
+from ..catalog.indexer import CatalogItems, prebuild_catalog_index
 try:
     from ..training import retriever as training_retriever  # type: ignore
 except Exception:  # pragma: no cover
@@ -96,8 +100,9 @@ TENANT_CONFIG_DIR = ROOT_DIR / "config" / "tenants"
 # Lightweight in-memory caches (mtime-based invalidation)
 _TENANT_CONFIG_CACHE: Dict[int, Tuple[float, float, dict]] = {}
 _TENANT_PERSONA_CACHE: Dict[int, Tuple[float, str]] = {}
-# Key: (tenant or None, tuple of (path, mtime, size)) -> parsed, normalized items
-_CATALOG_CACHE: Dict[Tuple[Optional[int], Tuple[Tuple[str, float, int], ...]], List[Dict[str, Any]]] = {}
+# Key: (tenant or None, tuple of (path, mtime, size)) -> parsed, normalized items;
+# only the latest version per tenant is kept
+_CATALOG_CACHE: Dict[Tuple[Optional[int], Tuple[Tuple[str, float, int], ...]], CatalogItems] = {}
 _TENANTS_CONFIG_CACHE: Dict[int, Dict[str, Any]] = {}
 
 CTA_COOLDOWN_SECONDS = float(os.getenv("CTA_COOLDOWN_SECONDS", "180"))
@@ -1520,6 +1525,10 @@ _FIELD_TOKEN_MAP: Dict[str, List[str]] = {
 }
 
 
+# Rows the field mapping looks at; streamed catalogs buffer only these.
+_FIELD_MAPPING_SAMPLE_ROWS = 5
+
+
 def _prepare_field_mapping(meta: Dict[str, Any], items: List[Dict[str, Any]]) -> Dict[str, str]:
     mapping: Dict[str, str] = {}
     if not items:
@@ -1575,7 +1584,7 @@ def _prepare_field_mapping(meta: Dict[str, Any], items: List[Dict[str, Any]]) ->
                 used_sources.add(col)
                 break
             # Look at data if no obvious hints
-            values = [str((row.get(col) or "")).strip() for row in items[:5]]
+            values = [str((row.get(col) or "")).strip() for row in items[:_FIELD_MAPPING_SAMPLE_ROWS]]
             digits = [re.sub(r"\D", "", val) for val in values if val]
             if any(len(d) >= 4 for d in digits):
                 numeric_candidates.append(col)
@@ -1682,15 +1691,32 @@ def _normalize_catalog_item(record: Dict[str, Any], mapping: Dict[str, str]) ->
 def _normalize_catalog_items(items: List[Dict[str, Any]], meta: Dict[str, Any] | Any) -> List[Dict[str, Any]]:
     if not items:
         return items
+    return list(_iter_normalized_catalog_items(items, meta))
+
+
+def _iter_normalized_catalog_items(
+    items: Iterable[Dict[str, Any]], meta: Dict[str, Any] | Any
+) -> Iterator[Dict[str, Any]]:
+    """Streaming ``_normalize_catalog_items`` for row-by-row readers."""
+
+    rows = iter(items)
+    head = list(itertools.islice(rows, _FIELD_MAPPING_SAMPLE_ROWS))
+    if not head:
+        return
     meta_dict = meta if isinstance(meta, dict) else {}
-    mapping = _prepare_field_mapping(meta_dict, items)
-    if not mapping:
-        # Even without explicit mapping try to enrich titles and prices
-        return [_normalize_catalog_item(record, {}) for record in items]
-    return [_normalize_catalog_item(record, mapping) for record in items]
+    # Even without explicit mapping try to enrich titles and prices
+    mapping = _prepare_field_mapping(meta_dict, head)
+    for record in itertools.chain(head, rows):
+        yield _normalize_catalog_item(record, mapping)
+
+
+def _catalog_version(cache_key: Tuple[Optional[int], Tuple[Tuple[str, float, int], ...]]) -> str:
+    """Stable catalog version derived from the source files fingerprint."""
 
+    return hashlib.sha1(repr(cache_key).encode("utf-8")).hexdigest()[:16]
 
-def _read_catalog(tenant: int | None = None) -> List[Dict[str, Any]]:
+
+def _read_catalog(tenant: int | None = None) -> CatalogItems:
     items: List[Dict[str, Any]] = []
     candidates: List[tuple[pathlib.Path, Dict[str, Any]]] = []
     has_custom_catalogs = False
@@ -1938,7 +1964,7 @@ def _read_catalog(tenant: int | None = None) -> List[Dict[str, Any]]:
 
     if not items:
         if has_custom_catalogs:
-            return []
+            return CatalogItems(tenant=cache_key[0])
         items = [
             {
                 "sku": "SKU-101",
@@ -1991,13 +2017,34 @@ def _read_catalog(tenant: int | None = None) -> List[Dict[str, Any]]:
     except Exception:
         pass
 
-    # Store in cache
+    version = _catalog_version(cache_key)
+    index_path: pathlib.Path | None = None
+    if tenant is not None:
+        index_path = tenant_dir(int(tenant)) / "catalogs" / catalog_index_filename(version)
+    catalog = CatalogItems(items, tenant=cache_key[0], version=version, index_path=index_path)
+
+    # Store in cache; older versions of the tenant's catalog (and the rank
+    # index built on them) are not read again.
     try:
-        _CATALOG_CACHE[cache_key] = items
+        for stale_key in [key for key in _CATALOG_CACHE if key[0] == cache_key[0] and key != cache_key]:
+            _CATALOG_CACHE.pop(stale_key, None)
+        _CATALOG_CACHE[cache_key] = catalog
     except Exception:
         pass
 
-    return items
+    return catalog
+
+
+def prebuild_catalog_search_index(tenant: int) -> Optional[pathlib.Path]:
+    """Write the shared search index for the tenant's current catalog version."""
+
+    if not catalog_indexer.DISK_INDEX_ENABLED:
+        return None
+    try:
+        return prebuild_catalog_index(_read_catalog(int(tenant)))
+    except Exception:
+        logger.warning("catalog search index prebuild failed tenant=%s", tenant, exc_info=True)
+        return None
 
 
 def read_all_catalog(cfg: Optional[Dict[str, Any]] = None, tenant: int | None = None) -> List[Dict[str, Any]]:
@@ -2217,9 +2264,16 @@ def infer_user_needs(text: str) -> Dict[str, Any]:
     return needs
 
 
+# item fields ``_score`` matches the type, size and color needs against
+_TYPE_FIELDS = ("type", "category", "segment", "group")
+_SIZE_FIELDS = ("size", "width", "dimensions", "length", "height", "depth")
+_COLOR_FIELDS = ("color", "finish", "shade", "title", "name", "tags")
+_NEED_FIELD_GROUPS = (_TYPE_FIELDS, _SIZE_FIELDS, _COLOR_FIELDS)
+
+
 def _value_matches(item: Dict[str, Any], fields: Tuple[str, ...], needle: str) -> bool:
-    for field in fields:
-        val = item.get(field)
+    for field_name in fields:
+        val = item.get(field_name)
         if not val:
             continue
         if isinstance(val, (list, tuple, set)):
@@ -2232,15 +2286,16 @@ def _value_matches(item: Dict[str, Any], fields: Tuple[str, ...], needle: str) -
     return False
 
 
-def _score(item: Dict[str, Any], needs: Dict[str, Any]) -> float:
+def _score(item: Dict[str, Any], needs: Dict[str, Any], haystack_text: str | None = None) -> float:
     s = 0.0
-    haystack_text = _normalize_text(_collect_item_text(item))
+    if haystack_text is None:
+        haystack_text = _normalize_text(_collect_item_text(item))
 
     primary = needs.get("type")
     if primary:
         needle = _normalize_text(primary)
         if needle and (
-            _value_matches(item, ("type", "category", "segment", "group"), needle)
+            _value_matches(item, _TYPE_FIELDS, needle)
             or needle in haystack_text
         ):
             s += 3.0
@@ -2255,19 +2310,19 @@ def _score(item: Dict[str, Any], needs: Dict[str, Any]) -> float:
     size = needs.get("size") or needs.get("width")
     if size:
         size_str = _normalize_text(str(size))
-        if _value_matches(item, ("size", "width", "dimensions", "length", "height", "depth"), size_str):
+        if _value_matches(item, _SIZE_FIELDS, size_str):
             s += 1.5
 
     color = needs.get("color")
     if color:
         color_token = _normalize_text(color)
-        if _value_matches(item, ("color", "finish", "shade", "title", "name", "tags"), color_token):
+        if _value_matches(item, _COLOR_FIELDS, color_token):
             s += 0.8
 
     budget = needs.get("budget_max")
     if budget:
         try:
-            price = int(re.sub(r"\D", "", str(item.get("price") or "0")))
+            price = _item_price(item)
             if price and price <= int(budget):
                 s += 1.5
         except Exception:
@@ -2275,6 +2330,13 @@ def _score(item: Dict[str, Any], needs: Dict[str, Any]) -> float:
 
     return s
 
+
+def _item_price(item: Dict[str, Any]) -> int:
+    try:
+        return int(re.sub(r"\D", "", str(item.get("price") or "0")))
+    except ValueError:
+        return 0
+
 _WORD_TOKEN_RE = re.compile(r"[0-9a-zа-яё]+", re.IGNORECASE)
 
 
@@ -2379,24 +2441,224 @@ def _text_match_score(item: Dict[str, Any], tokens: List[str]) -> float:
     return score
 
 
-def _legacy_rank_catalog(
+class _TermIndex:
+    """Word tokens -> item ids, plus 4-character substrings -> tokens.
+
+    Any occurrence of a word fragment inside normalized text lies within a
+    single token, so the tokens containing a fragment give every item whose
+    text can contain it.
+    """
+
+    __slots__ = ("postings", "grams", "digit_terms")
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, List[int]] = {}
+        self.grams: Dict[str, List[str]] = {}
+        self.digit_terms: List[str] = []
+
+    def add(self, idx: int, text: str) -> None:
+        for token in set(_WORD_TOKEN_RE.findall(text)):
+            self.postings.setdefault(token, []).append(idx)
+
+    def finish(self) -> None:
+        for term in self.postings:
+            for gram in {term[pos : pos + 4] for pos in range(len(term) - 3)}:
+                self.grams.setdefault(gram, []).append(term)
+        self.digit_terms = [term for term in self.postings if any(ch.isdigit() for ch in term)]
+
+    def items_with_fragment(self, fragment: str) -> set[int]:
+        if len(fragment) >= 4:
+            terms: Iterable[str] = (term for term in self.grams.get(fragment[:4], ()) if fragment in term)
+        elif fragment.isdigit():
+            terms = (term for term in self.digit_terms if fragment in term)
+        else:
+            terms = (term for term in self.postings if fragment in term)
+        found: set[int] = set()
+        for term in terms:
+            found.update(self.postings[term])
+        return found
+
+    def candidates(self, needle: str) -> Optional[set[int]]:
+        """Superset of the items whose text contains ``needle``; ``None`` if it has no word characters."""
+
+        fragments = _WORD_TOKEN_RE.findall(needle)
+        if not fragments:
+            return None
+        return self.items_with_fragment(max(fragments, key=len))
+
+
+class _LegacyRankIndex:
+    """Per-version lookups for the legacy ranker.
+
+    Holds each item's normalized text, tag bonus and parsed price, a term
+    index over the text and over each group of fields ``_score`` matches
+    needs against, and the prices sorted for budget lookups. Scoring then
+    only visits items that share a term with the query or satisfy a need.
+    """
+
+    __slots__ = ("haystacks", "tag_bonus", "by_tag_bonus", "text", "fields", "price_values", "price_ids")
+
+    def __init__(self, items: Sequence[Dict[str, Any]]) -> None:
+        self.haystacks: List[str] = []
+        self.tag_bonus: List[float] = []
+        self.text = _TermIndex()
+        self.fields: Dict[Tuple[str, ...], _TermIndex] = {group: _TermIndex() for group in _NEED_FIELD_GROUPS}
+        prices: List[Tuple[int, int]] = []
+        for idx, item in enumerate(items):
+            haystack = _normalize_text(_collect_item_text(item))
+            self.haystacks.append(haystack)
+            self.tag_bonus.append(_tag_boost(item))
+            self.text.add(idx, haystack)
+            for group, field_index in self.fields.items():
+                for field_name in group:
+                    val = item.get(field_name)
+                    if not val:
+                        continue
+                    values = [v for v in val if v] if isinstance(val, (list, tuple, set)) else [val]
+                    for value in values:
+                        field_index.add(idx, _normalize_text(str(value)))
+            price = _item_price(item)
+            if price:
+                prices.append((price, idx))
+        self.text.finish()
+        for field_index in self.fields.values():
+            field_index.finish()
+        prices.sort()
+        self.price_values = [price for price, _ in prices]
+        self.price_ids = [idx for _, idx in prices]
+        self.by_tag_bonus = sorted(range(len(self.tag_bonus)), key=lambda idx: (-self.tag_bonus[idx], idx))
+
+    def match_scores(self, tokens: List[str]) -> Dict[int, float]:
+        """Sparse ``_text_match_score`` for every item that scores above zero."""
+
+        scores: Dict[int, float] = {}
+        for token in tokens:
+            if not token:
+                continue
+            matched = set(self.text.postings.get(token, ()))
+            for idx in matched:
+                scores[idx] = scores.get(idx, 0.0) + 2.5
+            if token.isdigit():
+                digits = self.text.items_with_fragment(token) - matched
+                for idx in digits:
+                    scores[idx] = scores.get(idx, 0.0) + 1.5
+                matched |= digits
+            if len(token) >= 4:
+                for idx in self.text.items_with_fragment(token[:4]) - matched:
+                    scores[idx] = scores.get(idx, 0.0) + 0.75
+        return scores
+
+    def _text_contains(self, needle: str, count: int) -> set[int]:
+        candidates = self.text.candidates(needle)
+        pool = range(count) if candidates is None else candidates
+        return {idx for idx in pool if needle in self.haystacks[idx]}
+
+    def _fields_match(self, items: Sequence[Dict[str, Any]], group: Tuple[str, ...], needle: str) -> set[int]:
+        candidates = self.fields[group].candidates(needle)
+        pool = range(len(items)) if candidates is None else candidates
+        return {idx for idx in pool if _value_matches(items[idx], group, needle)}
+
+    def need_matches(self, items: Sequence[Dict[str, Any]], needs: Dict[str, Any]) -> List[Tuple[float, set[int]]]:
+        """``_score`` as (weight, matching item ids) pairs, in the order it adds them."""
+
+        parts: List[Tuple[float, set[int]]] = []
+        count = len(items)
+
+        primary = needs.get("type")
+        if primary:
+            needle = _normalize_text(primary)
+            if needle:
+                matched = self._fields_match(items, _TYPE_FIELDS, needle) | self._text_contains(needle, count)
+                parts.append((3.0, matched))
+
+        keywords = needs.get("keywords") or []
+        if keywords:
+            for kw in keywords[:3]:
+                needle = _normalize_text(kw)
+                if needle:
+                    parts.append((1.0, self._text_contains(needle, count)))
+
+        size = needs.get("size") or needs.get("width")
+        if size:
+            parts.append((1.5, self._fields_match(items, _SIZE_FIELDS, _normalize_text(str(size)))))
+
+        color = needs.get("color")
+        if color:
+            parts.append((0.8, self._fields_match(items, _COLOR_FIELDS, _normalize_text(color))))
+
+        budget = needs.get("budget_max")
+        if budget:
+            try:
+                ceiling = int(budget)
+            except Exception:
+                ceiling = None
+            if ceiling is not None:
+                parts.append((1.5, set(self.price_ids[: bisect.bisect_right(self.price_values, ceiling)])))
+
+        return parts
+
+
+def _legacy_rank_index(items: Sequence[Dict[str, Any]]) -> Optional[_LegacyRankIndex]:
+    """Rank index cached on the catalog, built on first use for its version."""
+
+    index = getattr(items, "rank_index", None)
+    if index is None and isinstance(items, CatalogItems) and items.version:
+        index = items.rank_index = _LegacyRankIndex(items)
+    return index
+
+
+def _legacy_rank_indices(
     items: List[Dict[str, Any]],
     needs: Dict[str, Any],
     limit: int,
     query: str | None,
-) -> List[Dict[str, Any]]:
+) -> List[int]:
     query_tokens = _tokenize_query(query)
+    index = _legacy_rank_index(items)
+    if index is None or limit <= 0:
+
+        def _total_score(idx: int, item: Dict[str, Any]) -> float:
+            if index is None:
+                return _score(item, needs) + _text_match_score(item, query_tokens) + _tag_boost(item)
+            return _score(item, needs, index.haystacks[idx]) + matched.get(idx, 0.0) + index.tag_bonus[idx]
+
+        matched = index.match_scores(query_tokens) if index is not None else {}
+        scores = [_total_score(idx, item) for idx, item in enumerate(items)]
+        ranked = sorted(range(len(items)), key=scores.__getitem__, reverse=True)
+        return ranked if limit <= 0 else ranked[:limit]
+
+    # Items that neither match the query nor satisfy a need score their tag
+    # bonus alone, so only the best-tagged few of them can make the cut.
+    matched = index.match_scores(query_tokens)
+    need_parts = index.need_matches(items, needs)
+    candidates: Dict[int, None] = dict.fromkeys(matched)
+    for _, ids in need_parts:
+        candidates.update(dict.fromkeys(ids))
+    extra = 0
+    for idx in index.by_tag_bonus:
+        if extra >= limit:
+            break
+        if idx not in candidates:
+            candidates[idx] = None
+            extra += 1
 
-    def _total_score(item: Dict[str, Any]) -> float:
-        base = _score(item, needs)
-        matched = _text_match_score(item, query_tokens)
-        tag_bonus = _tag_boost(item)
-        return base + matched + tag_bonus
+    scores: Dict[int, float] = {}
+    for idx in candidates:
+        base = 0.0
+        for weight, ids in need_parts:
+            if idx in ids:
+                base += weight
+        scores[idx] = base + matched.get(idx, 0.0) + index.tag_bonus[idx]
+    return sorted(scores, key=lambda idx: (-scores[idx], idx))[:limit]
 
-    scored = sorted(items, key=_total_score, reverse=True)
-    if limit <= 0:
-        return scored
-    return scored[:limit]
+
+def _legacy_rank_catalog(
+    items: List[Dict[str, Any]],
+    needs: Dict[str, Any],
+    limit: int,
+    query: str | None,
+) -> List[Dict[str, Any]]:
+    return [items[idx] for idx in _legacy_rank_indices(items, needs, limit, query)]
 
 
 def search_catalog(
@@ -2410,10 +2672,31 @@ def search_catalog(
     if not items:
         items = _read_catalog(None)
 
-    advanced: List[Dict[str, Any]] = []
+    # Cached hits are (index, score, excerpt) for retriever results and
+    # (index, None, "") for the legacy ranking.
+    version = getattr(items, "version", "")
+    cache_key = catalog_query_cache.query_cache_key(query, needs, limit)
+    hits = catalog_query_cache.get_cached_hits(tenant, version, cache_key)
+    if hits is None:
+        hits = _rank_catalog_hits(items, needs, limit, tenant, query)
+        catalog_query_cache.store_hits(tenant, version, cache_key, hits)
+
+    if not hits or hits[0][1] is None:
+        return [items[idx] for idx, _, _ in hits]
+    return catalog_retriever.materialize_hits(items, hits)
+
+
+def _rank_catalog_hits(
+    items: List[Dict[str, Any]],
+    needs: Dict[str, Any],
+    limit: int,
+    tenant: int | None,
+    query: str | None,
+) -> Tuple[Tuple[int, Optional[float], str], ...]:
+    advanced: List[Tuple[int, float, str]] = []
     if catalog_retriever and items:
         try:
-            advanced = catalog_retriever.retrieve_context(
+            advanced = catalog_retriever.rank_context(
                 items=items,
                 needs=needs,
                 query=query or "",
@@ -2424,11 +2707,11 @@ def search_catalog(
             logger.exception("catalog retriever failed", exc_info=exc)
 
     if advanced:
-        if limit <= 0:
-            return advanced
-        return advanced[:limit]
+        if limit > 0:
+            advanced = advanced[:limit]
+        return tuple(advanced)
 
-    return _legacy_rank_catalog(items, needs, limit, query)
+    return tuple((idx, None, "") for idx in _legacy_rank_indices(items, needs, limit, query))
 
 def format_items_for_prompt(items: List[Dict[str, Any]], currency: str = "₽") -> str:
     if not items:
@@ -3582,5 +3865,5 @@ __all__ = [
     "format_items_for_prompt", "pick_cta",
     "load_sales_state", "save_sales_state", "observe_user_message",
     "record_bot_reply", "summarize_sales_state",
-    "read_all_catalog", "paginate_catalog_text",
+    "read_all_catalog", "paginate_catalog_text", "prebuild_catalog_search_index",
 ]
@@ -1,6 +1,6 @@
 import os, hashlib, json, time, logging, pathlib, threading, re
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Mapping
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Callable, Mapping
 
 try:
     import asyncpg  # type: ignore
@@ -793,15 +793,17 @@ async def ensure_outbox_queued(
     )
     return dedup
 
-async def bump_attempt(lead_id: int, d: str, error: Optional[str] = None):
+async def bump_attempt(lead_id: int, d: str, error: Optional[str] = None, *, delay_seconds: float = 0.0):
+    """Schedule the next attempt ``delay_seconds`` from now."""
     await _exec("""
         UPDATE outbox
         SET attempts = attempts + 1,
             last_error = left($3, 2000),
             status = 'retry',
+            scheduled_at = now() + make_interval(secs => $4),
             updated_at = now()
         WHERE lead_id = $1 AND dedup_hash = $2;
-    """, lead_id, d, error or "")
+    """, lead_id, d, error or "", float(max(0.0, delay_seconds)))
 
 async def mark_sent(lead_id: int, d: str):
     await _exec("""
@@ -823,6 +825,75 @@ async def mark_failed(lead_id: int, d: str, error: str):
     """, lead_id, d, error)
 
 
+OUTBOX_NOTIFY_CHANNEL = "outbox_ready"
+
+
+async def ensure_outbox_schema() -> None:
+    """NOTIFY trigger on outbox inserts and the due-retry index
+    (db/migrations/20261016_outbox_*.sql).
+
+    Only creates what is missing, so a routine start takes no lock on
+    ``outbox``; a replica racing us to create the trigger is tolerated.
+    """
+
+    pool = await _ensure_pool()
+    if not pool:
+        _log.info("outbox_migration_skip reason=no_pool")
+        return
+    statements = (
+        f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1
+                FROM pg_trigger
+                WHERE tgrelid = 'outbox'::regclass
+                  AND tgname = 'trg_outbox_notify'
+            ) THEN
+                EXECUTE $fn$
+                    CREATE OR REPLACE FUNCTION outbox_notify() RETURNS trigger AS $body$
+                    BEGIN
+                        PERFORM pg_notify('{OUTBOX_NOTIFY_CHANNEL}', NEW.lead_id::text);
+                        RETURN NEW;
+                    END $body$ LANGUAGE plpgsql
+                $fn$;
+                EXECUTE 'CREATE TRIGGER trg_outbox_notify AFTER INSERT ON outbox FOR EACH ROW EXECUTE FUNCTION outbox_notify()';
+            END IF;
+        EXCEPTION WHEN duplicate_object THEN
+            NULL;
+        END $$
+        """,
+        """
+        DO $$
+        BEGIN
+            IF to_regclass('idx_outbox_status_scheduled') IS NULL THEN
+                EXECUTE 'CREATE INDEX IF NOT EXISTS idx_outbox_status_scheduled ON outbox(status, scheduled_at)';
+            END IF;
+        END $$
+        """,
+    )
+    async with pool.acquire() as con:
+        for statement in statements:
+            await con.execute(statement)
+
+
+async def listen_outbox(callback: Callable[[str], None]) -> Any:
+    """Dedicated connection LISTENing for outbox inserts; ``callback`` gets
+    the lead id. Returns the connection (close it to stop) or None."""
+
+    if asyncpg is None or not DATABASE_URL:
+        return None
+    try:
+        con = await asyncpg.connect(DATABASE_URL, timeout=3.0)
+        await con.add_listener(
+            OUTBOX_NOTIFY_CHANNEL, lambda _con, _pid, _channel, payload: callback(payload)
+        )
+    except Exception as exc:
+        _log.warning("outbox_listen_failed error=%s", exc)
+        return None
+    return con
+
+
 async def take_outbox_batch(limit: int = 10) -> list[Dict[str, Any]]:
     pool = await _ensure_pool()
     if not pool:
@@ -835,7 +906,8 @@ async def take_outbox_batch(limit: int = 10) -> list[Dict[str, Any]]:
                     SELECT o.id
                     FROM outbox o
                     WHERE o.status IN ('queued', 'retry')
-                    ORDER BY COALESCE(o.updated_at, o.created_at) DESC
+                      AND (o.scheduled_at IS NULL OR o.scheduled_at <= now())
+                    ORDER BY o.created_at, o.id
                     LIMIT $1
                     FOR UPDATE SKIP LOCKED
                 ),
@@ -844,18 +916,21 @@ async def take_outbox_batch(limit: int = 10) -> list[Dict[str, Any]]:
                     SET status = 'processing',
                         updated_at = now()
                     WHERE o.id IN (SELECT id FROM next)
-                    RETURNING o.id, o.lead_id, o.text, o.dedup_hash, o.attempts
+                    RETURNING o.id, o.lead_id, o.text, o.dedup_hash, o.attempts, o.created_at, o.scheduled_at
                 )
                 SELECT u.id,
                        u.lead_id,
                        u.text,
                        u.dedup_hash,
                        u.attempts,
+                       u.created_at,
+                       u.scheduled_at,
                        l.tenant_id,
                        l.telegram_user_id,
                        l.channel
                 FROM updated u
-                JOIN leads l ON l.id = u.lead_id;
+                JOIN leads l ON l.id = u.lead_id
+                ORDER BY u.created_at, u.id;
                 """,
                 limit,
             )
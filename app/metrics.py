@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge, Histogram
 
 MESSAGE_IN_COUNTER = Counter(
     "message_in_total",
@@ -46,6 +46,120 @@ WEBHOOK_PROVIDER_COUNTER = Counter(
     labelnames=("status", "channel"),
 )
 
+CATALOG_INDEX_CACHE_BYTES = Gauge(
+    "catalog_index_cache_bytes",
+    "Estimated bytes held by cached catalog search indexes",
+)
+CATALOG_INDEX_CACHE_ENTRIES = Gauge(
+    "catalog_index_cache_entries",
+    "Catalog search indexes currently cached",
+)
+CATALOG_INDEX_EVICTIONS_COUNTER = Counter(
+    "catalog_index_evictions_total",
+    "Catalog search indexes dropped from the cache grouped by reason",
+    labelnames=("reason",),
+)
+CATALOG_QUERY_CACHE_COUNTER = Counter(
+    "catalog_query_cache_total",
+    "Catalog search result cache lookups grouped by result (hit/miss)",
+    labelnames=("result",),
+)
+CATALOG_QUERY_CACHE_ENTRIES = Gauge(
+    "catalog_query_cache_entries",
+    "Catalog search results currently cached",
+)
+
+_STAGE_SECONDS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+CATALOG_INGEST_STAGE_SECONDS = Histogram(
+    "catalog_ingest_stage_seconds",
+    "Wall time of catalog upload ingestion stages",
+    labelnames=("stage", "file_type"),
+    buckets=_STAGE_SECONDS_BUCKETS,
+)
+CATALOG_INGEST_STAGE_CPU_SECONDS = Histogram(
+    "catalog_ingest_stage_cpu_seconds",
+    "CPU time of catalog upload ingestion stages in the ingesting process",
+    labelnames=("stage", "file_type"),
+    buckets=_STAGE_SECONDS_BUCKETS,
+)
+CATALOG_INGEST_STAGE_RSS_BYTES = Histogram(
+    "catalog_ingest_stage_rss_delta_bytes",
+    "Peak RSS growth during catalog upload ingestion stages",
+    labelnames=("stage", "file_type"),
+    buckets=(0, 1 << 20, 8 << 20, 32 << 20, 128 << 20, 512 << 20, 2 << 30),
+)
+
+WAWEB_HTTP_POOLS = Gauge(
+    "waweb_http_pools",
+    "Pooled HTTP clients the worker keeps open towards waweb base URLs",
+)
+WAWEB_HTTP_POOL_CONNECTIONS = Gauge(
+    "waweb_http_pool_connections",
+    "Connections held by the worker's waweb HTTP pools grouped by state",
+    labelnames=("base_url", "state"),
+)
+WAWEB_HTTP_IN_FLIGHT = Gauge(
+    "waweb_http_in_flight",
+    "Worker requests to waweb currently awaiting a response",
+)
+WAWEB_HTTP_REQUEST_SECONDS = Histogram(
+    "waweb_http_request_seconds",
+    "Latency of worker requests to waweb grouped by outcome",
+    labelnames=("outcome",),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 12.0),
+)
+
+WA_ATTACHMENT_CACHE_COUNTER = Counter(
+    "wa_attachment_cache_total",
+    "Worker lookups of prepared WhatsApp attachments grouped by result (hit/miss/revalidated/stale)",
+    labelnames=("result",),
+)
+WA_ATTACHMENT_CACHE_BYTES = Gauge(
+    "wa_attachment_cache_bytes",
+    "Base64 bytes of prepared WhatsApp attachments cached by the worker",
+)
+WA_ATTACHMENT_CACHE_ENTRIES = Gauge(
+    "wa_attachment_cache_entries",
+    "Prepared WhatsApp attachments cached by the worker",
+)
+
+WORKER_DISPATCH_IN_FLIGHT = Gauge(
+    "worker_dispatch_in_flight",
+    "Worker jobs currently running grouped by source queue",
+    labelnames=("queue",),
+)
+WORKER_DISPATCH_PENDING = Gauge(
+    "worker_dispatch_pending",
+    "Worker jobs popped from Redis and not yet finished grouped by source queue",
+    labelnames=("queue",),
+)
+WORKER_QUEUE_DEPTH = Gauge(
+    "worker_queue_depth",
+    "Items waiting in the worker's Redis queues",
+    labelnames=("queue",),
+)
+
+OUTBOX_PICKUP_LAG_SECONDS = Histogram(
+    "outbox_pickup_lag_seconds",
+    "Delay between a DB outbox row becoming due and the worker taking it, grouped by kind (new/retry)",
+    labelnames=("kind",),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 15.0, 60.0, 300.0),
+)
+
+OUTBOX_RETRY_DELAY_SECONDS = Histogram(
+    "outbox_retry_delay_seconds",
+    "Delay before the next attempt of a failed DB outbox send, grouped by reason (backoff/retry_after)",
+    labelnames=("reason",),
+    buckets=(1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 900.0, 3600.0),
+)
+
+OUTBOUND_RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "outbound_rate_limit_wait_seconds",
+    "Time an outbound send waited for its token bucket, grouped by channel and scope (tenant/recipient)",
+    labelnames=("channel", "scope"),
+    buckets=(0.0, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
 __all__ = [
     "MESSAGE_IN_COUNTER",
     "MESSAGE_OUT_COUNTER",
@@ -55,4 +169,25 @@ __all__ = [
     "WA_QR_RECEIVED_COUNTER",
     "WA_QR_CALLBACK_ERRORS_COUNTER",
     "WEBHOOK_PROVIDER_COUNTER",
+    "CATALOG_INDEX_CACHE_BYTES",
+    "CATALOG_INDEX_CACHE_ENTRIES",
+    "CATALOG_INDEX_EVICTIONS_COUNTER",
+    "CATALOG_QUERY_CACHE_COUNTER",
+    "CATALOG_QUERY_CACHE_ENTRIES",
+    "CATALOG_INGEST_STAGE_SECONDS",
+    "CATALOG_INGEST_STAGE_CPU_SECONDS",
+    "CATALOG_INGEST_STAGE_RSS_BYTES",
+    "WAWEB_HTTP_POOLS",
+    "WAWEB_HTTP_POOL_CONNECTIONS",
+    "WAWEB_HTTP_IN_FLIGHT",
+    "WAWEB_HTTP_REQUEST_SECONDS",
+    "WA_ATTACHMENT_CACHE_COUNTER",
+    "WA_ATTACHMENT_CACHE_BYTES",
+    "WA_ATTACHMENT_CACHE_ENTRIES",
+    "WORKER_DISPATCH_IN_FLIGHT",
+    "WORKER_DISPATCH_PENDING",
+    "WORKER_QUEUE_DEPTH",
+    "OUTBOX_PICKUP_LAG_SECONDS",
+    "OUTBOX_RETRY_DELAY_SECONDS",
+    "OUTBOUND_RATE_LIMIT_WAIT_SECONDS",
 ]
@@ -1,27 +1,76 @@
-"""Background outbox dispatcher."""
+"""Background outbox dispatcher.
+
+Rows are taken oldest-first. The loop wakes on the ``outbox_ready``
+NOTIFY sent by the insert trigger and polls every ``OUTBOX_POLL_INTERVAL``
+seconds as a fallback (no listener connection, missed notifications).
+Entries are sent concurrently, up to ``OUTBOX_CONCURRENCY`` at once and
+``OUTBOX_TENANT_CONCURRENCY`` per tenant, one at a time per lead.
+
+Failed sends are retried no earlier than ``scheduled_at``: a jittered
+exponential backoff from ``OUTBOX_RETRY_BASE_DELAY`` capped at
+``OUTBOX_RETRY_MAX_DELAY``, or the flood-wait reported by Telegram if that
+is longer. Sends share the worker's Redis token buckets
+(:mod:`app.rate_limit`), so they wait for the tenant and chat budget.
+"""
 
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
+import random
+import time
 import os
-from typing import Any, Dict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
 
 from app.db import (
     bump_attempt,
+    ensure_outbox_schema,
+    listen_outbox,
     mark_failed,
     mark_sent,
     take_outbox_batch,
 )
+from app.metrics import OUTBOX_PICKUP_LAG_SECONDS, OUTBOX_RETRY_DELAY_SECONDS
 from app.providers import telegram_bot
+from app.rate_limit import OutboundRateLimiter
+from app.worker_dispatch import KeyedDispatcher
 
 logger = logging.getLogger("app.outbox_worker")
 
 _POLL_INTERVAL = max(0.5, float(os.getenv("OUTBOX_POLL_INTERVAL", "1.5")))
 _BATCH_LIMIT = max(1, int(os.getenv("OUTBOX_BATCH_LIMIT", "10")))
 _MAX_RETRY_ATTEMPTS = max(1, int(os.getenv("OUTBOX_MAX_RETRY_ATTEMPTS", "3")))
+_CONCURRENCY = max(1, int(os.getenv("OUTBOX_CONCURRENCY", "8")))
+_TENANT_CONCURRENCY = max(1, int(os.getenv("OUTBOX_TENANT_CONCURRENCY", "2")))
+_RETRY_BASE_DELAY = max(0.1, float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "2")))
+_RETRY_MAX_DELAY = max(_RETRY_BASE_DELAY, float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "300")))
+_DRAIN_TIMEOUT = 10.0
+_LISTEN_RETRY_INTERVAL = 30.0
 
 _task: asyncio.Task | None = None
+_rate_limiter: OutboundRateLimiter | None = None
+
+
+def _get_rate_limiter() -> OutboundRateLimiter:
+    global _rate_limiter
+    if _rate_limiter is None:
+        from app.core import settings as core_settings
+
+        _rate_limiter = OutboundRateLimiter(core_settings.r)
+    return _rate_limiter
+
+
+def _retry_delay(attempts: int, retry_after: Optional[float] = None) -> Tuple[float, str]:
+    """Seconds until the next attempt and what set it (backoff/retry_after)."""
+
+    ceiling = min(_RETRY_MAX_DELAY, _RETRY_BASE_DELAY * (2 ** min(max(attempts, 0), 16)))
+    # "Equal jitter": keeps at least half the backoff, spreads the rest.
+    delay = ceiling * random.uniform(0.5, 1.0)
+    if retry_after is not None and retry_after >= delay:
+        return float(retry_after), "retry_after"
+    return delay, "backoff"
 
 
 async def _process_entry(entry: Dict[str, Any]) -> None:
@@ -92,7 +141,8 @@ async def _process_entry(entry: Dict[str, Any]) -> None:
         attempts,
     )
 
-    ok, status, error_text = await telegram_bot.send_message(
+    await _get_rate_limiter().acquire(tenant_id, "telegram", chat_id)
+    ok, status, error_text, retry_after = await telegram_bot.send_message(
         tenant_id=tenant_id,
         telegram_user_id=chat_id,
         text=text,
@@ -110,14 +160,18 @@ async def _process_entry(entry: Dict[str, Any]) -> None:
     error_text = error_text or "send_failed"
     retryable = status in {0, 429} or status >= 500
     if attempts + 1 < _MAX_RETRY_ATTEMPTS and retryable:
-        await bump_attempt(lead_id, dedup, error_text)
+        delay, reason = _retry_delay(attempts, retry_after)
+        await bump_attempt(lead_id, dedup, error_text, delay_seconds=delay)
+        OUTBOX_RETRY_DELAY_SECONDS.labels(reason=reason).observe(delay)
         logger.warning(
-            "event=outbox_send_retry tenant=%s lead_id=%s status=%s error=%s attempts=%s",
+            "event=outbox_send_retry tenant=%s lead_id=%s status=%s error=%s attempts=%s delay=%.1f reason=%s",
             tenant_id,
             lead_id,
             status,
             error_text,
             attempts + 1,
+            delay,
+            reason,
         )
         return
 
@@ -132,56 +186,131 @@ async def _process_entry(entry: Dict[str, Any]) -> None:
     )
 
 
+async def _dispatch_entry(entry: Dict[str, Any]) -> None:
+    try:
+        await _process_entry(entry)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception(
+            "event=outbox_entry_unhandled tenant=%s lead_id=%s",
+            entry.get("tenant_id"),
+            entry.get("lead_id"),
+        )
+        dedup = str(entry.get("dedup_hash") or "")
+        try:
+            lead_ref = int(entry.get("lead_id") or 0)
+        except Exception:
+            lead_ref = 0
+        if lead_ref and dedup:
+            try:
+                await mark_failed(lead_ref, dedup, "unhandled_exception")
+            except Exception:
+                logger.exception(
+                    "event=outbox_entry_mark_failed_error lead_id=%s", lead_ref
+                )
+
+
+def _observe_pickup_lag(entry: Dict[str, Any]) -> None:
+    kind = "retry" if int(entry.get("attempts") or 0) > 0 else "new"
+    # A retry is due at scheduled_at, not when the row was first inserted.
+    due_at = entry.get("scheduled_at") if kind == "retry" else None
+    if not isinstance(due_at, datetime):
+        due_at = entry.get("created_at")
+    if not isinstance(due_at, datetime):
+        return
+    if due_at.tzinfo is None:
+        due_at = due_at.replace(tzinfo=timezone.utc)
+    lag = (datetime.now(timezone.utc) - due_at).total_seconds()
+    OUTBOX_PICKUP_LAG_SECONDS.labels(kind=kind).observe(max(0.0, lag))
+
+
+async def _open_listener(wakeup: asyncio.Event) -> Any:
+    connection = await listen_outbox(lambda _payload: wakeup.set())
+    if connection is not None:
+        logger.info("event=outbox_listen status=ok")
+    return connection
+
+
+async def _close_listener(connection: Any) -> None:
+    if connection is None:
+        return
+    try:
+        await connection.close()
+    except Exception:
+        logger.warning("event=outbox_listen_close_failed", exc_info=True)
+
+
 async def _run_loop() -> None:
     logger.info(
-        "event=outbox_worker_start poll_interval=%s batch_limit=%s max_retry=%s",
+        "event=outbox_worker_start poll_interval=%s batch_limit=%s max_retry=%s concurrency=%s per_tenant=%s",
         _POLL_INTERVAL,
         _BATCH_LIMIT,
         _MAX_RETRY_ATTEMPTS,
+        _CONCURRENCY,
+        _TENANT_CONCURRENCY,
     )
+    try:
+        await ensure_outbox_schema()
+    except Exception:
+        logger.exception("event=outbox_migration_failed")
+    wakeup = asyncio.Event()
+    listener = await _open_listener(wakeup)
+    listen_retry_at = time.monotonic() + _LISTEN_RETRY_INTERVAL
+    dispatcher = KeyedDispatcher(
+        "db_outbox",
+        concurrency=_CONCURRENCY,
+        max_pending=max(_BATCH_LIMIT, _CONCURRENCY * 2),
+        max_per_group=_TENANT_CONCURRENCY,
+    )
+    dispatcher.start()
     try:
         while True:
+            if (listener is None or listener.is_closed()) and time.monotonic() >= listen_retry_at:
+                # Polling keeps working meanwhile; only the wakeups are lost.
+                await _close_listener(listener)
+                listener = await _open_listener(wakeup)
+                listen_retry_at = time.monotonic() + _LISTEN_RETRY_INTERVAL
+            await dispatcher.wait_for_capacity()
+            # Cleared before the fetch: an insert committed meanwhile sets it again.
+            wakeup.clear()
+            limit = min(_BATCH_LIMIT, dispatcher.max_pending - dispatcher.pending)
             try:
-                batch = await take_outbox_batch(_BATCH_LIMIT)
+                batch = await take_outbox_batch(limit)
             except Exception:
                 logger.exception("event=outbox_fetch_failed")
                 await asyncio.sleep(_POLL_INTERVAL)
                 continue
 
-            if not batch:
-                await asyncio.sleep(_POLL_INTERVAL)
-                continue
-
             for entry in batch:
+                _observe_pickup_lag(entry)
                 try:
-                    await _process_entry(entry)
-                except asyncio.CancelledError:
-                    raise
+                    lead_key = int(entry.get("lead_id") or 0)
                 except Exception:
-                    logger.exception(
-                        "event=outbox_entry_unhandled tenant=%s lead_id=%s",
-                        entry.get("tenant_id"),
-                        entry.get("lead_id"),
-                    )
-                    dedup = str(entry.get("dedup_hash") or "")
-                    try:
-                        lead_ref = int(entry.get("lead_id") or 0)
-                    except Exception:
-                        lead_ref = 0
-                    if lead_ref and dedup:
-                        try:
-                            await mark_failed(lead_ref, dedup, "unhandled_exception")
-                        except Exception:
-                            logger.exception(
-                                "event=outbox_entry_mark_failed_error lead_id=%s", lead_ref
-                            )
-            await asyncio.sleep(0)
+                    lead_key = 0
+                await dispatcher.submit(
+                    ("lead", lead_key or entry.get("id")),
+                    functools.partial(_dispatch_entry, entry),
+                    group=entry.get("tenant_id"),
+                )
+
+            if len(batch) >= limit:
+                # More may be waiting; fetch again once there is room.
+                await asyncio.sleep(0)
+                continue
+            try:
+                await asyncio.wait_for(wakeup.wait(), _POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
     except asyncio.CancelledError:
         logger.info("event=outbox_worker_stop status=cancelled")
         raise
     except Exception:
         logger.exception("event=outbox_worker_crashed")
         raise
+    finally:
+        await dispatcher.aclose(timeout=_DRAIN_TIMEOUT)
+        await _close_listener(listener)
 
 
 async def start() -> None:
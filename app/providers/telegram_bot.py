@@ -5,7 +5,7 @@ from __future__ import annotations
 import asyncio
 import logging
 import os
-from typing import Any, Tuple
+from typing import Any, Optional, Tuple
 
 import httpx
 
@@ -89,20 +89,21 @@ async def send_message(
     tenant_id: int,
     telegram_user_id: int,
     text: str,
-) -> Tuple[bool, int, str]:
+) -> Tuple[bool, int, str, Optional[float]]:
     """Send message via TG worker service.
 
-    Returns tuple of (success, status_code, error_message).
+    Returns tuple of (success, status_code, error_message, retry_after);
+    ``retry_after`` is the flood-wait in seconds from a 429, else None.
     """
 
     if tenant_id <= 0:
         logger.warning("event=tgworker_send_skip reason=invalid_tenant tenant=%s", tenant_id)
-        return False, 0, "invalid_tenant"
+        return False, 0, "invalid_tenant", None
 
     base_url = _resolve_base_url()
     if not base_url:
         logger.warning("event=tgworker_send_skip reason=missing_base_url")
-        return False, 0, "tgworker_base_url_missing"
+        return False, 0, "tgworker_base_url_missing", None
 
     payload: dict[str, Any] = {
         "tenant": int(tenant_id),
@@ -121,11 +122,11 @@ async def send_message(
         response = await client.post(send_url, json=payload, headers=headers)
     except httpx.HTTPError as exc:
         logger.error("event=tgworker_send_error error=%s", exc)
-        return False, 0, str(exc)
+        return False, 0, str(exc), None
 
     status_code = response.status_code
     if 200 <= status_code < 300:
-        return True, status_code, ""
+        return True, status_code, "", None
 
     error_text = ""
     try:
@@ -145,6 +146,16 @@ async def send_message(
     if not error_text:
         error_text = response.text or "send_failed"
 
+    retry_after: Optional[float] = None
+    if status_code == 429:
+        raw_retry = body.get("retry_after") if isinstance(body, dict) else None
+        if raw_retry is None:
+            raw_retry = response.headers.get("Retry-After")
+        try:
+            retry_after = max(0.0, float(raw_retry)) if raw_retry is not None else None
+        except (TypeError, ValueError):
+            retry_after = None
+
     logger.warning(
         "event=tgworker_send_fail status=%s error=%s tenant=%s chat_id=%s",
         status_code,
@@ -152,7 +163,7 @@ async def send_message(
         tenant_id,
         telegram_user_id,
     )
-    return False, status_code, error_text
+    return False, status_code, error_text, retry_after
 
 
 async def aclose() -> None:
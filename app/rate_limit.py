@@ -0,0 +1,154 @@
+"""Redis token buckets for outbound sends.
+
+Every send takes a token from two buckets: one per (tenant, channel) and one
+per recipient within it. Buckets live in Redis, so the limits hold across
+worker replicas and the app's DB outbox dispatcher.
+
+A send over budget is not rejected: :meth:`OutboundRateLimiter.acquire`
+reserves its tokens (a bucket may go negative) and sleeps until they are
+due, so bursts such as catalog pages are spread out in arrival order instead
+of tripping WhatsApp/Telegram flood limits. The recipient bucket is reserved
+first and the tenant bucket only once the recipient is due, so a throttled
+chat does not use up the budget of the tenant's other chats.
+
+Limits are ``<rate per second>:<burst>`` strings, e.g.
+``OUTBOUND_RATE_WHATSAPP_TENANT=5:10`` or
+``OUTBOUND_RATE_TELEGRAM_RECIPIENT=1:3``. ``OUTBOUND_RATE_LIMIT=0`` turns the
+limiter off. If Redis is unavailable, sends are not held back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.metrics import OUTBOUND_RATE_LIMIT_WAIT_SECONDS
+
+logger = logging.getLogger("app.rate_limit")
+
+ENABLED = (os.getenv("OUTBOUND_RATE_LIMIT") or "1").strip().lower() not in {"0", "false", "no", "off"}
+KEY_PREFIX = "ratelimit:out"
+
+
+@dataclass(frozen=True)
+class Bucket:
+    rate: float  # tokens per second
+    burst: float
+
+    @classmethod
+    def parse(cls, raw: str, default: "Bucket") -> "Bucket":
+        rate_raw, _, burst_raw = (raw or "").partition(":")
+        try:
+            rate = float(rate_raw)
+            burst = float(burst_raw) if burst_raw.strip() else max(1.0, rate)
+        except ValueError:
+            return default
+        if rate <= 0 or burst < 1:
+            return default
+        return cls(rate=rate, burst=burst)
+
+
+# (tenant bucket, recipient bucket) per channel.
+_DEFAULT_LIMITS: Dict[str, Tuple[Bucket, Bucket]] = {
+    "whatsapp": (Bucket(5.0, 10.0), Bucket(1.0, 3.0)),
+    "telegram": (Bucket(20.0, 30.0), Bucket(1.0, 3.0)),
+    "avito": (Bucket(5.0, 10.0), Bucket(1.0, 3.0)),
+}
+_FALLBACK_LIMITS = (Bucket(5.0, 10.0), Bucket(1.0, 3.0))
+
+_limits: Dict[str, Tuple[Bucket, Bucket]] = {}
+
+
+def limits_for(channel: str) -> Tuple[Bucket, Bucket]:
+    """(tenant, recipient) buckets of ``channel``, with env overrides."""
+
+    channel = (channel or "").strip().lower() or "default"
+    limits = _limits.get(channel)
+    if limits is None:
+        tenant_default, recipient_default = _DEFAULT_LIMITS.get(channel, _FALLBACK_LIMITS)
+        env_name = f"OUTBOUND_RATE_{channel.upper()}"
+        limits = _limits[channel] = (
+            Bucket.parse(os.getenv(f"{env_name}_TENANT", ""), tenant_default),
+            Bucket.parse(os.getenv(f"{env_name}_RECIPIENT", ""), recipient_default),
+        )
+    return limits
+
+
+# KEYS[1]: bucket hash; ARGV: cost, rate, burst.
+# Refills from Redis' own clock (one clock for every process), takes ``cost``
+# tokens even if that leaves the bucket negative, and returns the seconds
+# until its balance is back to zero.
+_RESERVE_LUA = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate) - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+local wait = 0
+if tokens < 0 then wait = -tokens / rate end
+return tostring(wait)
+"""
+
+
+class OutboundRateLimiter:
+    """Per-(tenant, channel) and per-recipient token buckets in Redis."""
+
+    def __init__(self, client: Any, *, prefix: str = KEY_PREFIX, enabled: Optional[bool] = None) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.enabled = ENABLED if enabled is None else enabled
+        self._script: Any = None
+
+    def _keys(self, tenant: int, channel: str, recipient: str) -> Tuple[str, str]:
+        tenant_key = f"{self.prefix}:{channel}:{tenant}"
+        return tenant_key, f"{tenant_key}:to:{recipient}"
+
+    async def reserve(self, key: str, bucket: Bucket, cost: int = 1) -> float:
+        """Take ``cost`` tokens from ``key`` now; seconds until they are due."""
+
+        if self._script is None:
+            self._script = self.client.register_script(_RESERVE_LUA)
+        wait = await self._script(keys=[key], args=[max(1, int(cost)), bucket.rate, bucket.burst])
+        return float(wait)
+
+    async def _wait(self, key: str, bucket: Bucket, cost: int, channel: str, tenant: int, scope: str) -> float:
+        try:
+            wait = await self.reserve(key, bucket, cost)
+        except Exception as exc:
+            logger.warning("event=rate_limit_unavailable channel=%s tenant=%s error=%s", channel, tenant, exc)
+            return 0.0
+        OUTBOUND_RATE_LIMIT_WAIT_SECONDS.labels(channel=channel, scope=scope).observe(wait)
+        if wait > 0:
+            logger.info(
+                "event=rate_limit_wait channel=%s tenant=%s wait=%.2f scope=%s", channel, tenant, wait, scope
+            )
+            await asyncio.sleep(wait)
+        return wait
+
+    async def acquire(self, tenant: int, channel: str, recipient: Any, cost: int = 1) -> float:
+        """Wait until the send fits both buckets; returns the seconds waited.
+
+        The tenant's tokens are taken when the recipient is due, i.e. for
+        the moment the send actually goes out.
+        """
+
+        if not self.enabled:
+            return 0.0
+        channel = (channel or "").strip().lower() or "default"
+        tenant_bucket, recipient_bucket = limits_for(channel)
+        tenant_key, recipient_key = self._keys(tenant, channel, str(recipient or "-"))
+        waited = await self._wait(recipient_key, recipient_bucket, cost, channel, tenant, "recipient")
+        waited += await self._wait(tenant_key, tenant_bucket, cost, channel, tenant, "tenant")
+        return waited
+
+
+__all__ = ["Bucket", "OutboundRateLimiter", "limits_for"]
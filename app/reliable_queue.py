@@ -0,0 +1,206 @@
+"""Acknowledged consumption of the worker's Redis list queues.
+
+Producers keep ``LPUSH``-ing to the same lists. A consumer moves each item
+with ``BLMOVE`` into its own ``<queue>:processing:<consumer>`` list and
+removes it from there (:meth:`ReliableQueue.ack`) once it is handled, so an
+item popped by a worker that crashes or is redeployed is not lost.
+
+Live consumers refresh their entry in the ``<queue>:consumers`` sorted set
+(heartbeat). Consumers whose heartbeat is older than the visibility timeout
+are considered dead: :meth:`ReliableQueue.reclaim`, run periodically by every
+replica, moves their processing list back to the head of the queue. Items
+already reclaimed ``max_deliveries`` times go to the dead-letter list.
+Consumer ids repeat across restarts (a container keeps its hostname and
+runs the worker as PID 1), so on start a consumer first requeues its own
+processing list (:meth:`ReliableQueue.recover`).
+Delivery is at-least-once; with several replicas, per-chat ordering holds
+only within one replica.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import asyncio
+import socket
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("app.reliable_queue")
+
+# Deletes the reclaim lock only while it still holds this consumer's id, so
+# a lock that expired and was taken by another replica is left alone.
+_RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def default_consumer_id() -> str:
+    """``WORKER_CONSUMER_ID`` or ``<hostname>-<pid>``; must be unique per process."""
+
+    return (os.getenv("WORKER_CONSUMER_ID") or "").strip() or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _digest(raw: str) -> str:
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ReliableQueue:
+    """One consumer's view of a Redis list queue with acknowledgements."""
+
+    def __init__(
+        self,
+        client: Any,
+        key: str,
+        *,
+        consumer: str,
+        visibility_timeout: float = 60.0,
+        max_deliveries: int = 3,
+        dlq_key: Optional[str] = None,
+    ) -> None:
+        self.client = client
+        self.key = key
+        self.consumer = consumer
+        self.visibility_timeout = max(1.0, float(visibility_timeout))
+        self.max_deliveries = max(1, int(max_deliveries))
+        self.dlq_key = dlq_key
+        self.processing_key = self._processing_key(consumer)
+        self.consumers_key = f"{key}:consumers"
+        self.deliveries_key = f"{key}:deliveries"
+        self._reclaim_lock_key = f"{key}:reclaim_lock"
+        self._release_script: Any = None
+
+    def _processing_key(self, consumer: str) -> str:
+        return f"{self.key}:processing:{consumer}"
+
+    async def heartbeat(self) -> None:
+        await self.client.zadd(self.consumers_key, {self.consumer: time.time()})
+
+    async def pop(self, timeout: float) -> Optional[str]:
+        """Next item, parked in this consumer's processing list; ``timeout``
+        of 0 does not block."""
+
+        if timeout <= 0:
+            return await self.client.lmove(self.key, self.processing_key, "RIGHT", "LEFT")
+        return await self.client.blmove(self.key, self.processing_key, timeout, "RIGHT", "LEFT")
+
+    async def ack(self, raw: str) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.lrem(self.processing_key, 1, raw)
+        pipe.hdel(self.deliveries_key, _digest(raw))
+        await pipe.execute()
+
+    async def _requeue_list(self, processing_key: str) -> Tuple[int, int]:
+        requeued = dead = 0
+        while True:
+            # Newest first, each pushed to the consumer end: oldest pops first.
+            raw = await self.client.lindex(processing_key, 0)
+            if raw is None:
+                return requeued, dead
+            deliveries = await self.client.hincrby(self.deliveries_key, _digest(raw), 1)
+            if self.dlq_key and deliveries >= self.max_deliveries:
+                await self.client.lmove(processing_key, self.dlq_key, "LEFT", "LEFT")
+                await self.client.hdel(self.deliveries_key, _digest(raw))
+                dead += 1
+            else:
+                await self.client.lmove(processing_key, self.key, "LEFT", "RIGHT")
+                requeued += 1
+
+    async def _acquire_reclaim_lock(self, *, wait: bool) -> bool:
+        while True:
+            if await self.client.set(
+                self._reclaim_lock_key, self.consumer, nx=True, ex=int(self.visibility_timeout)
+            ):
+                return True
+            if not wait:
+                return False
+            await asyncio.sleep(0.1)
+
+    async def _release_reclaim_lock(self) -> None:
+        if self._release_script is None:
+            self._release_script = self.client.register_script(_RELEASE_LOCK_LUA)
+        await self._release_script(keys=[self._reclaim_lock_key], args=[self.consumer])
+
+    async def recover(self) -> int:
+        """Requeue what an earlier run under this consumer id left
+        unacknowledged; call before the first pop."""
+
+        await self.heartbeat()
+        # A replica may be reclaiming this id right now as a dead consumer.
+        await self._acquire_reclaim_lock(wait=True)
+        try:
+            requeued, dead = await self._requeue_list(self.processing_key)
+        finally:
+            await self._release_reclaim_lock()
+        if requeued or dead:
+            logger.warning(
+                "event=queue_recover queue=%s consumer=%s requeued=%s dead=%s",
+                self.key,
+                self.consumer,
+                requeued,
+                dead,
+            )
+        return requeued + dead
+
+    async def reclaim(self) -> int:
+        """Requeue items held by consumers whose heartbeat is stale."""
+
+        cutoff = time.time() - self.visibility_timeout
+        stale: List[str] = [
+            name for name in await self.client.zrangebyscore(self.consumers_key, "-inf", cutoff)
+            if name != self.consumer
+        ]
+        if not stale:
+            return 0
+        # One reclaimer at a time, so LINDEX + LMOVE see the same element.
+        if not await self._acquire_reclaim_lock(wait=False):
+            return 0
+        moved = 0
+        try:
+            for name in stale:
+                # Re-read under the lock: the consumer may have heartbeated
+                # since, or another replica may already have reclaimed it.
+                seen = await self.client.zscore(self.consumers_key, name)
+                if seen is None or float(seen) > time.time() - self.visibility_timeout:
+                    continue
+                requeued, dead = await self._requeue_list(self._processing_key(name))
+                await self.client.zrem(self.consumers_key, name)
+                moved += requeued + dead
+                if requeued or dead:
+                    logger.warning(
+                        "event=queue_reclaim queue=%s consumer=%s requeued=%s dead=%s",
+                        self.key,
+                        name,
+                        requeued,
+                        dead,
+                    )
+        finally:
+            await self._release_reclaim_lock()
+        return moved
+
+    async def release(self) -> int:
+        """Hand unacknowledged items back to the queue on shutdown."""
+
+        moved = 0
+        while await self.client.lmove(self.processing_key, self.key, "LEFT", "RIGHT") is not None:
+            moved += 1
+        await self.client.zrem(self.consumers_key, self.consumer)
+        return moved
+
+
+async def pop_any(queues: Sequence[ReliableQueue], timeout: float) -> Tuple[Optional[ReliableQueue], Optional[str]]:
+    """Pop from the first non-empty queue, blocking only on the last one."""
+
+    for queue in queues[:-1]:
+        raw = await queue.pop(0)
+        if raw is not None:
+            return queue, raw
+    last = queues[-1]
+    return last, await last.pop(timeout)
+
+
+__all__ = ["ReliableQueue", "default_consumer_id", "pop_any"]
@@ -0,0 +1,159 @@
+"""Compact CSR matrix used by the TF-IDF shim.
+
+Rows are stored as three flat ``array`` buffers (``indptr``/``indices``/
+``data``) over an interned integer vocabulary instead of one dict per row.
+When NumPy is installed the buffers are viewed zero-copy for dense output
+and postings accumulation.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore[assignment]
+
+
+class CSRMatrix:
+    """Row-compressed sparse matrix with float32 values."""
+
+    __slots__ = ("indptr", "indices", "data", "shape", "_csc")
+
+    def __init__(self, indptr: array, indices: array, data: array, shape: Tuple[int, int]) -> None:
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = (int(shape[0]), int(shape[1]))
+        self._csc: "CSRMatrix | None" = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Tuple[int, float]]], n_cols: int) -> "CSRMatrix":
+        indptr = array("i", [0])
+        indices = array("i")
+        data = array("f")
+        for row in rows:
+            for col, value in row:
+                indices.append(col)
+                data.append(value)
+            indptr.append(len(indices))
+        return cls(indptr, indices, data, (len(indptr) - 1, n_cols))
+
+    def __getstate__(self):
+        return (self.indptr, self.indices, self.data, self.shape)
+
+    def __setstate__(self, state) -> None:
+        self.indptr, self.indices, self.data, self.shape = state
+        self._csc = None
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @property
+    def nbytes(self) -> int:
+        total = 0
+        for buf in (self.indptr, self.indices, self.data):
+            total += buf.itemsize * len(buf)
+        return total
+
+    def row(self, idx: int) -> Iterator[Tuple[int, float]]:
+        start, end = self.indptr[idx], self.indptr[idx + 1]
+        return zip(self.indices[start:end], self.data[start:end])
+
+    @property
+    def postings(self) -> "CSRMatrix":
+        """Column-major copy (term -> rows), built once on first use."""
+
+        if self._csc is None:
+            counts = [0] * (self.shape[1] + 1)
+            for col in self.indices:
+                counts[col + 1] += 1
+            for col in range(self.shape[1]):
+                counts[col + 1] += counts[col]
+            indptr = array("i", counts)
+            cursor = counts[:-1]
+            rows = array("i", bytes(4 * self.nnz))
+            data = array("f", bytes(4 * self.nnz))
+            for row_idx in range(self.shape[0]):
+                for col, value in self.row(row_idx):
+                    pos = cursor[col]
+                    rows[pos] = row_idx
+                    data[pos] = value
+                    cursor[col] = pos + 1
+            self._csc = CSRMatrix(indptr, rows, data, (self.shape[1], self.shape[0]))
+        return self._csc
+
+    @property
+    def T(self) -> "_Transposed":
+        return _Transposed(self)
+
+    def __matmul__(self, other: "_Transposed") -> "CSRMatrix":
+        if not isinstance(other, _Transposed):
+            return NotImplemented
+        base = other.base
+        rows = (sorted(accumulate(self, idx, base).items()) for idx in range(self.shape[0]))
+        return CSRMatrix.from_rows(rows, base.shape[0])
+
+    def toarray(self):
+        if np is not None:
+            dense = np.zeros(self.shape, dtype=np.float64)
+            indptr = np.frombuffer(self.indptr, dtype=np.int32)
+            row_ids = np.repeat(np.arange(self.shape[0]), np.diff(indptr))
+            dense[row_ids, np.frombuffer(self.indices, dtype=np.int32)] = np.frombuffer(self.data, dtype=np.float32)
+            return dense
+        dense_rows: List[List[float]] = []
+        for idx in range(self.shape[0]):
+            values = [0.0] * self.shape[1]
+            for col, value in self.row(idx):
+                values[col] = value
+            dense_rows.append(values)
+        return dense_rows
+
+
+class _Transposed:
+    __slots__ = ("base",)
+
+    def __init__(self, base: CSRMatrix) -> None:
+        self.base = base
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.base.shape[1], self.base.shape[0])
+
+
+def accumulate(query: CSRMatrix, row_idx: int, matrix: CSRMatrix) -> Dict[int, float]:
+    """Dot products of one ``query`` row with the rows of ``matrix`` sharing a term."""
+
+    csc = matrix.postings
+    start, end = query.indptr[row_idx], query.indptr[row_idx + 1]
+    if start == end:
+        return {}
+    if np is not None:
+        csc_indptr = np.frombuffer(csc.indptr, dtype=np.int32)
+        csc_rows = np.frombuffer(csc.indices, dtype=np.int32)
+        csc_data = np.frombuffer(csc.data, dtype=np.float32)
+        row_parts = []
+        weight_parts = []
+        for col, weight in zip(query.indices[start:end], query.data[start:end]):
+            lo, hi = csc_indptr[col], csc_indptr[col + 1]
+            if lo == hi:
+                continue
+            row_parts.append(csc_rows[lo:hi])
+            weight_parts.append(csc_data[lo:hi].astype(np.float64) * float(weight))
+        if not row_parts:
+            return {}
+        matched, inverse = np.unique(np.concatenate(row_parts), return_inverse=True)
+        sums = np.bincount(inverse, weights=np.concatenate(weight_parts))
+        return dict(zip(matched.tolist(), sums.tolist()))
+
+    scores: Dict[int, float] = {}
+    for col, weight in zip(query.indices[start:end], query.data[start:end]):
+        for doc_id, doc_weight in csc.row(col):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * doc_weight
+    return scores
+
+
+__all__ = ["CSRMatrix", "accumulate"]
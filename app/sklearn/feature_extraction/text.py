@@ -4,9 +4,12 @@ from __future__ import annotations
 
 import math
 import re
+from array import array
 from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Sequence
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .._sparse import CSRMatrix
 
 _WORD_RE = re.compile(r"[\w\-]+", re.UNICODE)
 
@@ -15,6 +18,8 @@ _WORD_RE = re.compile(r"[\w\-]+", re.UNICODE)
 class _Matrix:
     vectors: List[Dict[str, float]]
     vocab_size: int
+    # term -> [(doc id, weight), ...]; only set on fitted document matrices
+    postings: Optional[Dict[str, List[Tuple[int, float]]]] = None
 
     @property
     def shape(self) -> tuple[int, int]:
@@ -25,15 +30,19 @@ class TfidfVectorizer:
     """Small subset of sklearn's TF-IDF vectorizer.
 
     It implements just enough for the project's catalog retrieval tests and
-    intentionally skips rarely used advanced options.
+    intentionally skips rarely used advanced options. With ``compact=True``
+    the matrices are returned as :class:`CSRMatrix` over integer term ids.
     """
 
+    supports_compact = True
+
     def __init__(
         self,
         *,
         analyzer: str = "word",
         ngram_range: tuple[int, int] = (1, 1),
         min_df: int = 1,
+        compact: bool = False,
     ) -> None:
         if analyzer != "word":
             raise ValueError("Only analyzer='word' is supported in shim")
@@ -41,20 +50,30 @@ class TfidfVectorizer:
             raise ValueError("Invalid ngram_range")
         self.ngram_range = ngram_range
         self.min_df = max(1, int(min_df))
+        self.compact = bool(compact)
         self.vocabulary_: Dict[str, int] = {}
         self._idf: Dict[str, float] = {}
+        self._idf_by_id = array("d")
         self._doc_count = 0
 
     # Public API ---------------------------------------------------------
-    def fit_transform(self, raw_documents: Sequence[str]) -> _Matrix:
+    def fit_transform(self, raw_documents: Sequence[str]) -> Union[_Matrix, CSRMatrix]:
         tokens_per_doc = [self._tokenize(doc) for doc in raw_documents]
         self._build_vocabulary(tokens_per_doc)
+        if self.compact:
+            return self._compact_matrix(tokens_per_doc)
         vectors = [self._vectorize(tokens) for tokens in tokens_per_doc]
-        return _Matrix(vectors=vectors, vocab_size=len(self.vocabulary_))
+        return _Matrix(
+            vectors=vectors,
+            vocab_size=len(self.vocabulary_),
+            postings=self._build_postings(vectors),
+        )
 
-    def transform(self, raw_documents: Sequence[str]) -> _Matrix:
+    def transform(self, raw_documents: Sequence[str]) -> Union[_Matrix, CSRMatrix]:
         if not self.vocabulary_:
             raise ValueError("Vectorizer has not been fitted")
+        if self.compact:
+            return self._compact_matrix(self._tokenize(doc) for doc in raw_documents)
         vectors = [self._vectorize(self._tokenize(doc)) for doc in raw_documents]
         return _Matrix(vectors=vectors, vocab_size=len(self.vocabulary_))
 
@@ -85,10 +104,41 @@ class TfidfVectorizer:
         vocab_items = [term for term, df in df_counter.items() if df >= self.min_df]
         vocab_items.sort()
         self.vocabulary_ = {term: idx for idx, term in enumerate(vocab_items)}
-        self._idf = {
+        idf = {
             term: math.log((1 + self._doc_count) / (1 + df_counter[term])) + 1.0
             for term in self.vocabulary_
         }
+        if self.compact:
+            # term strings live only in ``vocabulary_``; weights are looked up by id
+            self._idf = {}
+            self._idf_by_id = array("d", (idf[term] for term in vocab_items))
+        else:
+            self._idf = idf
+
+    @staticmethod
+    def _build_postings(vectors: Sequence[Dict[str, float]]) -> Dict[str, List[Tuple[int, float]]]:
+        postings: Dict[str, List[Tuple[int, float]]] = {}
+        for doc_id, vector in enumerate(vectors):
+            for term, weight in vector.items():
+                postings.setdefault(term, []).append((doc_id, weight))
+        return postings
+
+    def _compact_matrix(self, tokens_per_doc: Iterable[List[str]]) -> CSRMatrix:
+        rows = (self._vectorize_ids(tokens) for tokens in tokens_per_doc)
+        return CSRMatrix.from_rows(rows, len(self.vocabulary_))
+
+    def _vectorize_ids(self, tokens: Sequence[str]) -> List[Tuple[int, float]]:
+        vocabulary = self.vocabulary_
+        counts = Counter(vocabulary[token] for token in tokens if token in vocabulary)
+        if not counts:
+            return []
+        total = sum(counts.values())
+        row = [(term_id, (freq / total) * self._idf_by_id[term_id]) for term_id, freq in counts.items()]
+        norm = math.sqrt(sum(value * value for _, value in row))
+        if norm > 0:
+            row = [(term_id, value / norm) for term_id, value in row]
+        row.sort()
+        return row
 
     def _vectorize(self, tokens: Sequence[str]) -> Dict[str, float]:
         if not tokens or not self.vocabulary_:
@@ -1,5 +1,5 @@
 """metrics shims."""
 
-from .pairwise import linear_kernel
+from .pairwise import linear_kernel, top_k_linear_kernel
 
-__all__ = ["linear_kernel"]
+__all__ = ["linear_kernel", "top_k_linear_kernel"]
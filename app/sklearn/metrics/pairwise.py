@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
-from typing import Iterable, List, Mapping
+import heapq
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+from .._sparse import CSRMatrix, accumulate
 
 
 def _dot(lhs: Mapping[str, float], rhs: Mapping[str, float]) -> float:
@@ -19,9 +22,32 @@ def _dot(lhs: Mapping[str, float], rhs: Mapping[str, float]) -> float:
     return total
 
 
+def _accumulate(query: Mapping[str, float], postings: Mapping[str, Iterable[Tuple[int, float]]]) -> Dict[int, float]:
+    """Score only documents sharing at least one term with ``query``."""
+
+    scores: Dict[int, float] = {}
+    for term, weight in query.items():
+        entries = postings.get(term)
+        if not entries:
+            continue
+        for doc_id, doc_weight in entries:
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * doc_weight
+    return scores
+
+
 def linear_kernel(matrix_a, matrix_b) -> List[List[float]]:
     """Compute linear kernel (dot product) between sparse dict vectors."""
 
+    if isinstance(matrix_b, CSRMatrix):
+        rows = matrix_a.shape[0] if isinstance(matrix_a, CSRMatrix) else 0
+        dense: List[List[float]] = []
+        for idx in range(rows):
+            row = [0.0] * matrix_b.shape[0]
+            for doc_id, score in accumulate(matrix_a, idx, matrix_b).items():
+                row[doc_id] = score
+            dense.append(row)
+        return dense
+
     vectors_a: Iterable[Mapping[str, float]] = getattr(matrix_a, "vectors", []) or []
     vectors_b: Iterable[Mapping[str, float]] = getattr(matrix_b, "vectors", []) or []
     vectors_b = list(vectors_b)
@@ -30,11 +56,43 @@ def linear_kernel(matrix_a, matrix_b) -> List[List[float]]:
     if not vectors_a:
         return [[0.0 for _ in vectors_b]]
 
+    postings = getattr(matrix_b, "postings", None)
     result: List[List[float]] = []
     for vec_a in vectors_a:
-        row = [_dot(vec_a, vec_b) for vec_b in vectors_b]
+        if postings is not None:
+            row = [0.0] * len(vectors_b)
+            for doc_id, score in _accumulate(vec_a, postings).items():
+                row[doc_id] = score
+        else:
+            row = [_dot(vec_a, vec_b) for vec_b in vectors_b]
         result.append(row)
     return result
 
 
-__all__ = ["linear_kernel"]
+def top_k_linear_kernel(matrix_a, matrix_b, k: int) -> List[List[Tuple[int, float]]]:
+    """Return the ``k`` best ``(doc id, score)`` pairs per row of ``matrix_a``.
+
+    Uses the postings of ``matrix_b`` when available so the cost depends on
+    the number of matching postings instead of the number of documents.
+    Documents without any shared term are omitted. Ties keep document order.
+    """
+
+    vectors_a: Iterable[Mapping[str, float]] = getattr(matrix_a, "vectors", []) or []
+    postings = getattr(matrix_b, "postings", None)
+    if isinstance(matrix_b, CSRMatrix):
+        rows = matrix_a.shape[0] if isinstance(matrix_a, CSRMatrix) else 0
+        candidates = [accumulate(matrix_a, idx, matrix_b) for idx in range(rows)]
+    elif postings is None:
+        dense = linear_kernel(matrix_a, matrix_b)
+        candidates = [{idx: score for idx, score in enumerate(row) if score} for row in dense]
+    else:
+        candidates = [_accumulate(vec_a, postings) for vec_a in vectors_a]
+
+    result: List[List[Tuple[int, float]]] = []
+    for scores in candidates:
+        size = len(scores) if k <= 0 else min(k, len(scores))
+        result.append(heapq.nlargest(size, scores.items(), key=lambda pair: (pair[1], -pair[0])))
+    return result
+
+
+__all__ = ["linear_kernel", "top_k_linear_kernel"]
@@ -104,3 +104,154 @@ def test_index_to_catalog_items_extracts_products(tmp_path):
     assert manifest["logs"][0]["reason"] == "non_product"
     assert manifest["duplicate_titles_fixed"]
     assert "price_missing_examples" not in manifest
+
+
+def _write_pages_pdf(path: Path, pages: list[str]) -> None:
+    count = len(pages)
+    font_id = 3 + 2 * count
+    objects: list[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (" ".join(f"{3 + 2 * idx} 0 R" for idx in range(count)).encode("ascii"), count),
+    ]
+    for idx, text in enumerate(pages):
+        stream = f"BT /F1 12 Tf 36 770 Td ({text}) Tj ET".encode("ascii")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents %d 0 R"
+            b" /Resources << /Font << /F1 %d 0 R >> >> >>" % (4 + 2 * idx, font_id)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets: list[int] = []
+    for idx, obj in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output.extend(f"{idx} 0 obj\n".encode("ascii") + obj + b"\nendobj\n")
+    xref_pos = len(output)
+    output.extend(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("ascii"))
+    for offset in offsets:
+        output.extend(f"{offset:010d} 00000 n \n".encode("ascii"))
+    output.extend(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n".encode("ascii"))
+    output.extend(f"startxref\n{xref_pos}\n%%EOF\n".encode("ascii"))
+    path.write_bytes(bytes(output))
+
+
+def test_extract_pdf_pages_parallel_keeps_page_order(tmp_path, monkeypatch):
+    import app.catalog_index as catalog_index
+
+    pdf_path = tmp_path / "multi.pdf"
+    _write_pages_pdf(pdf_path, [f"Product {idx:02d} price {idx * 100}" for idx in range(1, 10)])
+
+    sequential = catalog_index._extract_pdf_pages(pdf_path, workers=1)
+    assert [page for page, _ in sequential] == list(range(1, 10))
+    assert "Product 07" in sequential[6][1]
+
+    monkeypatch.setattr(catalog_index, "PDF_PAGES_PER_WORKER", 2)
+    assert catalog_index._pdf_worker_count(9, workers=3) == 3
+    assert catalog_index._pdf_worker_count(3, workers=3) == 1
+    # The default shares the cores between the catalog worker's jobs.
+    monkeypatch.setattr(catalog_index.os, "cpu_count", lambda: 8)
+    monkeypatch.setattr(catalog_index, "JOB_CONCURRENCY", 2)
+    assert catalog_index._pdf_worker_count(100, workers=0) == 4
+    monkeypatch.setattr(catalog_index, "JOB_CONCURRENCY", 16)
+    assert catalog_index._pdf_worker_count(100, workers=0) == 1
+    assert catalog_index._extract_pdf_pages(pdf_path, workers=3) == sequential
+
+
+def test_build_pdf_index_streams_chunks_to_a_valid_index(tmp_path):
+    import dataclasses
+
+    from app.catalog_index import build_pdf_index, load_index
+
+    pdf_path = tmp_path / "stream.pdf"
+    _write_pages_pdf(pdf_path, [f"Product {idx:02d} price {idx * 100}" for idx in range(1, 6)])
+    index = build_pdf_index(pdf_path, output_dir=tmp_path / "indexes", source_relpath="uploads/stream.pdf")
+
+    data = json.loads(index.index_path.read_text(encoding="utf-8"))
+    assert data["page_count"] == index.page_count == 5
+    assert data["chunk_count"] == len(data["chunks"]) == index.chunk_count
+    page_field = data["chunk_fields"].index("page")
+    assert [row[page_field] for row in data["chunks"]] == [1, 2, 3, 4, 5]
+    assert not list(index.index_path.parent.glob(".catalog_*"))
+
+    loaded = load_index(index.index_path)
+    assert list(loaded.chunks) == list(index.chunks)
+    assert loaded.chunks[-1].page == 5
+
+    items = index_to_catalog_items(loaded)
+    manifest_path = index.index_path.with_suffix(".manifest.json")
+    streamed_manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    assert streamed_manifest["stages"]["parse_blocks"]["items"] == streamed_manifest["items_total"]
+    assert {"finalize_rows", "write_csv"} <= set(streamed_manifest["stages"])
+    in_memory = dataclasses.replace(loaded, chunks=list(loaded.chunks))
+    index.index_path.with_suffix(".items.json").unlink()
+    assert index_to_catalog_items(in_memory) == items
+    rebuilt_manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    # Stage timings differ between runs; everything else must match.
+    assert rebuilt_manifest.pop("stages").keys() == streamed_manifest.pop("stages").keys()
+    assert rebuilt_manifest == streamed_manifest
+
+
+def test_load_index_reads_older_formats(tmp_path):
+    from app.catalog_index import load_index
+
+    chunks = [
+        CatalogChunk(chunk_id=f"c{idx}", page=idx, title=f"Title {idx}", text=f"Product {idx}", identifiers=("A-1",))
+        for idx in (1, 2)
+    ]
+    header = {"catalog_id": "cat", "sha1": "a" * 40, "page_count": 2, "chunk_count": 2}
+
+    format_1 = tmp_path / "catalog_v1.json"
+    format_1.write_text(
+        json.dumps({**header, "chunks": [chunk.to_dict() for chunk in chunks]}, ensure_ascii=False, indent=2),
+        encoding="utf-8",
+    )
+    format_2 = tmp_path / "catalog_v2.json"
+    format_2.write_text(
+        json.dumps({"format": 2, **header})[:-1]
+        + ', "chunks": [\n'
+        + ",\n".join(json.dumps(chunk.to_dict()) for chunk in chunks)
+        + "\n]}\n",
+        encoding="utf-8",
+    )
+
+    for path in (format_1, format_2):
+        loaded = load_index(path)
+        assert loaded.sha1 == "a" * 40
+        assert loaded.chunk_count == 2
+        assert list(loaded.chunks) == chunks
+
+
+def test_build_pdf_index_reuses_index_of_identical_upload(tmp_path, monkeypatch):
+    import shutil
+
+    import app.catalog_index as catalog_index
+
+    index_dir = tmp_path / "indexes"
+    pdf_path = tmp_path / "first.pdf"
+    _write_pages_pdf(pdf_path, [f"Product {idx:02d} price {idx * 100}" for idx in range(1, 4)])
+    first = catalog_index.build_pdf_index(pdf_path, output_dir=index_dir, source_relpath="uploads/first.pdf")
+    items = catalog_index.index_to_catalog_items(first)
+    assert first.index_path.name == catalog_index.index_filename(first.sha1)
+
+    # An index of the same file under a pre content-addressing name is superseded.
+    legacy = index_dir / "catalog_legacy.json"
+    shutil.copy(first.index_path, legacy)
+    legacy.with_suffix(".csv").write_text("id,title\n", encoding="utf-8")
+
+    def _no_extraction(*_args, **_kwargs):
+        raise AssertionError("identical upload must not be re-extracted")
+
+    monkeypatch.setattr(catalog_index, "_iter_pdf_pages", _no_extraction)
+    monkeypatch.setattr(catalog_index, "_iter_product_blocks", _no_extraction)
+    again = tmp_path / "again.pdf"
+    shutil.copy(pdf_path, again)
+    second = catalog_index.build_pdf_index(again, output_dir=index_dir, source_relpath="uploads/again.pdf", original_name="again.pdf")
+
+    assert second.index_path == first.index_path
+    assert second.catalog_id == first.catalog_id
+    assert (second.source_path, second.original_name) == ("uploads/again.pdf", "again.pdf")
+    assert catalog_index.index_to_catalog_items(second) == items
+    assert not legacy.exists() and not legacy.with_suffix(".csv").exists()
+    assert first.index_path.exists()
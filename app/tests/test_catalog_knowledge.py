@@ -69,6 +69,68 @@ def test_search_catalog_ranks_by_keywords(catalog_core):
     assert results[0].get("title") == "Milano 10"
 
 
+def test_search_catalog_caches_hits_until_catalog_changes(catalog_core, monkeypatch):
+    tenant_id = catalog_core
+    core_impl = sys.modules[core.search_catalog.__module__]
+    calls = []
+    original = core_impl._rank_catalog_hits
+
+    def _counting(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(core_impl, "_rank_catalog_hits", _counting)
+    core_impl.catalog_query_cache.clear_query_cache()
+
+    first = core.search_catalog({}, limit=2, tenant=tenant_id, query="Sirius Pro")
+    again = core.search_catalog({}, limit=2, tenant=tenant_id, query="  sirius   PRO ")
+    assert len(calls) == 1
+    assert [item.get("title") for item in again] == [item.get("title") for item in first]
+    assert first[0].get("title") == "Sirius Pro"
+
+    catalog_path = core.tenant_dir(tenant_id) / "uploads" / "catalog.csv"
+    catalog_path.write_text(
+        "title,price,brand,color,tags\nSirius Max,31500,Ultra,серый,новинка\n",
+        encoding="utf-8",
+    )
+    updated = core.search_catalog({}, limit=2, tenant=tenant_id, query="Sirius Pro")
+    assert len(calls) == 2
+    assert [item.get("title") for item in updated] == ["Sirius Max"]
+    # only the current version stays cached, with its rank index
+    cached = [key for key in core_impl._CATALOG_CACHE if key[0] == tenant_id]
+    assert len(cached) == 1
+
+
+def test_legacy_rank_index_matches_full_scan():
+    core_impl = sys.modules[core.search_catalog.__module__]
+    rows = [
+        {"title": "Диван Milano 10", "color": "белый", "price": "12500", "tags": ["хит"]},
+        {"title": "Кресло Sirius Pro", "color": "чёрный", "price": "21500", "tags": ["новинка"]},
+        {"title": "Стол Nord 70", "color": "венге", "price": "9900", "tags": ["склад"]},
+        {"title": "Диван-кровать Milanello", "price": "31250"},
+        {"title": "Пуф", "tags": "хит, новинка"},
+        {"title": "Тумба", "category": "Диваны и тумбы", "size": "110 см", "price": "14 990 ₽", "shade": "белый"},
+    ]
+    plain = [dict(row) for row in rows]
+    indexed = core_impl.CatalogItems([dict(row) for row in rows], version="v1")
+
+    cases = [
+        ({}, "диван milano"),
+        ({}, "цена 125 и 21500"),
+        ({}, "миланский"),
+        ({}, ""),
+        ({"type": "кресло", "budget_max": 25000}, "черный"),
+        ({"budget_max": 15000, "color": "Белый"}, "до 15 тысяч"),
+        ({"type": "диван", "keywords": ["диван", "кровать"], "size": "10"}, ""),
+        ({"type": "диван", "color": "Черный"}, ""),
+    ]
+    for needs, query in cases:
+        for limit in (0, 1, 3):
+            expected = core_impl._legacy_rank_indices(plain, needs, limit, query)
+            assert core_impl._legacy_rank_indices(indexed, needs, limit, query) == expected, (needs, query, limit)
+    assert isinstance(indexed.rank_index, core_impl._LegacyRankIndex)
+
+
 @pytest.mark.anyio
 async def test_build_llm_messages_embed_catalog_context(catalog_core):
     tenant_id = catalog_core
@@ -1,3 +1,5 @@
+import sys
+
 import pytest
 
 from catalog import clear_catalog_cache, ensure_catalog_index, invalidate_catalog_index, retrieve_context
@@ -92,3 +94,159 @@ def test_indexer_invalidation_rebuilds_matrix():
     rebuilt = ensure_catalog_index(tenant, extended)
     assert rebuilt is not None
     assert rebuilt.signature == index2.signature
+
+
+def test_versioned_catalog_skips_signature_hashing(monkeypatch):
+    from catalog import CatalogItems
+    indexer = sys.modules[ensure_catalog_index.__module__]
+
+    items = CatalogItems(_sample_items(), tenant=7, version="abc123")
+    index1 = ensure_catalog_index(7, items)
+    assert index1 is not None
+
+    def _fail(_items):
+        raise AssertionError("signature must not be recomputed for versioned catalogs")
+
+    monkeypatch.setattr(indexer, "_catalog_signature", _fail)
+    index2 = ensure_catalog_index(7, items)
+    assert index2 is index1
+
+    results = retrieve_context(items=items, query="смартфон", tenant=7, limit=1)
+    assert results
+
+    bumped = CatalogItems(_sample_items(), tenant=7, version="def456")
+    index3 = ensure_catalog_index(7, bumped)
+    assert index3 is not index1
+
+
+def test_shim_postings_top_k_matches_dense_ranking():
+    from app.sklearn.feature_extraction.text import TfidfVectorizer as ShimVectorizer
+    from app.sklearn.metrics.pairwise import linear_kernel as shim_kernel, top_k_linear_kernel
+
+    texts = [" ".join(str(v) for v in item.values()) for item in _sample_items()]
+    texts.append("Кабель USB-C для зарядки")
+    vectorizer = ShimVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1)
+    matrix = vectorizer.fit_transform(texts)
+    assert matrix.postings
+
+    query = vectorizer.transform(["смартфон камера"])
+    dense = shim_kernel(query, matrix)[0]
+    expected = sorted(
+        ((idx, score) for idx, score in enumerate(dense) if score),
+        key=lambda pair: pair[1],
+        reverse=True,
+    )[:2]
+    top = top_k_linear_kernel(query, matrix, 2)[0]
+    assert [idx for idx, _ in top] == [idx for idx, _ in expected]
+    assert all(abs(a[1] - b[1]) < 1e-9 for a, b in zip(top, expected))
+    # the cable and the watch share no terms with the query and are never scored
+    assert {idx for idx, _ in top_k_linear_kernel(query, matrix, 0)[0]} == {0, 2}
+
+
+def test_retrieve_context_with_shim_backend(monkeypatch):
+    indexer = sys.modules[ensure_catalog_index.__module__]
+    retriever = sys.modules[retrieve_context.__module__]
+    from app.sklearn.feature_extraction.text import TfidfVectorizer as ShimVectorizer
+    from app.sklearn.metrics.pairwise import linear_kernel as shim_kernel
+
+    monkeypatch.setattr(indexer, "TfidfVectorizer", ShimVectorizer)
+    monkeypatch.setattr(retriever, "linear_kernel", shim_kernel)
+
+    results = retrieve_context(
+        items=_sample_items(),
+        needs={"type": "смартфон"},
+        query="нужен смартфон с хорошей камерой",
+        tenant=43,
+        limit=2,
+    )
+    assert [item["title"] for item in results][0].lower().startswith("смартфон")
+    assert len(results) == 2
+
+    fallback = retrieve_context(items=_sample_items(), query="игровой ноутбук", tenant=43, limit=3)
+    assert len(fallback) == 1
+    assert fallback[0]["title"] == "Смартфон Nova X"
+
+
+def test_shim_compact_matrix_matches_dict_vectors():
+    import pickle
+
+    from app.sklearn.feature_extraction.text import TfidfVectorizer as ShimVectorizer
+    from app.sklearn.metrics.pairwise import linear_kernel as shim_kernel, top_k_linear_kernel
+
+    texts = [" ".join(str(v) for v in item.values()) for item in _sample_items()]
+    plain = ShimVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1)
+    compact = ShimVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1, compact=True)
+    plain_matrix = plain.fit_transform(texts)
+    compact_matrix = compact.fit_transform(texts)
+    assert compact_matrix.shape == plain_matrix.shape
+
+    query = "смартфон с камерой"
+    expected = shim_kernel(plain.transform([query]), plain_matrix)[0]
+    got = shim_kernel(compact.transform([query]), compact_matrix)[0]
+    assert got == pytest.approx(expected, abs=1e-6)
+    best_two = sorted(range(len(expected)), key=expected.__getitem__, reverse=True)[:2]
+    assert [idx for idx, _ in top_k_linear_kernel(compact.transform([query]), compact_matrix, 2)[0]] == best_two
+
+    # training retriever style: (q_vec @ matrix.T).toarray().ravel()
+    restored = pickle.loads(pickle.dumps((compact, compact_matrix)))
+    scores = (restored[0].transform([query]) @ restored[1].T).toarray().ravel()
+    assert list(scores) == pytest.approx(expected, abs=1e-6)
+
+    # the cache estimate covers the postings before the first query builds them
+    indexer = sys.modules[ensure_catalog_index.__module__]
+    index = indexer.CatalogIndex(None, "v:1", compact, compact_matrix, [], texts, [])
+    before = indexer._estimate_index_bytes(index)
+    compact_matrix.postings
+    assert indexer._estimate_index_bytes(index) == before
+
+
+def test_index_cache_enforces_tenant_cap_budget_and_idle(monkeypatch):
+    from catalog import CatalogItems, catalog_cache_stats
+    indexer = sys.modules[ensure_catalog_index.__module__]
+
+    monkeypatch.setattr(indexer, "CACHE_MAX_PER_TENANT", 1)
+    first = ensure_catalog_index(1, CatalogItems(_sample_items(), tenant=1, version="v1"))
+    second = ensure_catalog_index(1, CatalogItems(_sample_items(), tenant=1, version="v2"))
+    assert first.size_bytes > 0
+    assert catalog_cache_stats()["entries"] == 1
+    assert ensure_catalog_index(1, CatalogItems(_sample_items(), tenant=1, version="v2")) is second
+
+    # budget: only the most recently built index survives
+    monkeypatch.setattr(indexer, "CACHE_MAX_BYTES", second.size_bytes + 1)
+    other = ensure_catalog_index(2, CatalogItems(_sample_items(), tenant=2, version="v1"))
+    stats = catalog_cache_stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == other.size_bytes
+
+    # idle: tenant dropped after inactivity and transparently rebuilt
+    monkeypatch.setattr(indexer, "CACHE_IDLE_SECONDS", 60)
+    other.last_used -= 120
+    rebuilt = ensure_catalog_index(2, CatalogItems(_sample_items(), tenant=2, version="v1"))
+    assert rebuilt is not other
+    assert rebuilt.matrix.shape[0] == len(_sample_items())
+
+
+def test_mapped_index_is_shared_and_pruned(tmp_path, monkeypatch):
+    from catalog import CatalogItems, prebuild_catalog_index
+
+    monkeypatch.setattr(sys.modules[ensure_catalog_index.__module__], "DISK_INDEX_ENABLED", True)
+    catalogs = tmp_path / "catalogs"
+    old = CatalogItems(_sample_items(), tenant=5, version="old", index_path=catalogs / "search_old.idx")
+    assert prebuild_catalog_index(old) == catalogs / "search_old.idx"
+
+    items = CatalogItems(_sample_items(), tenant=5, version="new", index_path=catalogs / "search_new.idx")
+    # no file yet: queries get the in-memory index, nothing is written for them
+    assert ensure_catalog_index(5, items).mapped_path is None
+    assert not (catalogs / "search_new.idx").exists()
+    clear_catalog_cache()
+
+    assert prebuild_catalog_index(items) == catalogs / "search_new.idx"
+    index = ensure_catalog_index(5, items)
+    assert index.mapped_path == str(catalogs / "search_new.idx")
+    assert [path.name for path in catalogs.iterdir()] == ["search_new.idx"]
+    assert index.texts[1].startswith("Умные часы FitGo")
+
+    results = retrieve_context(items=items, query="нужен смартфон с хорошей камерой", tenant=5, limit=2)
+    assert results[0]["title"].lower().startswith("смартфон")
+    fallback = retrieve_context(items=items, query="игровой ноутбук", tenant=5, limit=3)
+    assert [item["title"] for item in fallback] == ["Смартфон Nova X"]
@@ -239,6 +239,8 @@ def test_public_catalog_upload_csv_and_pdf_with_query_tenant(api_client, tmp_pat
     assert str(csv_status.get("tenant_source")) == "query"
     assert str(csv_status.get("file_field")) == "file"
     assert str(csv_status.get("state")).lower() == "done"
+    assert csv_status["stages"]["read_rows"]["items"] == 1
+    assert {"finalize_catalog", "write_catalog_csv"} <= set(csv_status["stages"])
     csv_rel = csv_status.get("csv_path")
     if isinstance(csv_rel, str) and csv_rel:
         tenant_root = Path(os.getenv("TENANTS_DIR", "")) / "1"
@@ -260,6 +262,7 @@ def test_public_catalog_upload_csv_and_pdf_with_query_tenant(api_client, tmp_pat
     assert str(pdf_status.get("tenant_source")) == "query"
     assert str(pdf_status.get("file_field")) == "catalog"
     assert str(pdf_status.get("state")).lower() == "done"
+    assert {"extract_pages", "chunk_text", "parse_blocks"} <= set(pdf_status["stages"])
     pdf_rel = pdf_status.get("csv_path")
     assert isinstance(pdf_rel, str) and pdf_rel
     tenant_root = Path(os.getenv("TENANTS_DIR", "")) / "1"
@@ -344,3 +347,105 @@ def test_public_catalog_upload_csv_metadata_preserves_delimiter(api_client):
     uploaded_meta = cfg.get("integrations", {}).get("uploaded_catalog", {})
     assert uploaded_meta.get("delimiter") == ","
     assert uploaded_meta.get("encoding") == "utf-8"
+
+
+class _FakeQueueRedis:
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = {}
+
+    def lpush(self, key: str, value: str) -> None:
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def lmove(self, src: str, dst: str, wherefrom: str, whereto: str):
+        source = self.lists.get(src) or []
+        if not source:
+            return None
+        value = source.pop(0 if wherefrom == "LEFT" else -1)
+        target = self.lists.setdefault(dst, [])
+        if whereto == "LEFT":
+            target.insert(0, value)
+        else:
+            target.append(value)
+        return value
+
+    def blmove(self, src: str, dst: str, timeout: float, wherefrom: str, whereto: str):
+        return self.lmove(src, dst, wherefrom, whereto)
+
+    def lrem(self, key: str, count: int, value: str) -> None:
+        self.lists.get(key, []).remove(value)
+
+
+def test_public_catalog_upload_queue_mode_defers_to_runner(api_client, monkeypatch):
+    import concurrent.futures
+
+    import app.catalog_worker as catalog_worker
+    from app.catalog import jobs as catalog_jobs
+    from app.web import public as web_public
+
+    fake = _FakeQueueRedis()
+    monkeypatch.setattr(catalog_jobs, "INGEST_MODE", "queue")
+    monkeypatch.setattr(web_public.common, "redis_client", lambda: fake)
+
+    job_ids = []
+    for name in ("first.csv", "second.csv"):
+        response = api_client.post(
+            "/pub/catalog/upload?k=secret&tenant=1",
+            files={"file": (name, f"title,price\n{name},1000\n", "text/csv")},
+        )
+        assert response.status_code == 200, response.text
+        job_ids.append(response.json()["job_id"])
+    tenant_root = Path(os.getenv("TENANTS_DIR", "")) / "1"
+    first_status = json.loads((tenant_root / "catalog_jobs" / job_ids[0] / "status.json").read_text(encoding="utf-8"))
+    assert first_status["state"] == "queued"
+    assert len(fake.lists[catalog_jobs.INGEST_QUEUE_KEY]) == 2
+
+    order: list[str] = []
+
+    def run_in_thread(raw: str) -> None:
+        order.append(json.loads(raw)["job_id"])
+        web_public.run_catalog_job(json.loads(raw))
+
+    class ThreadRunner(catalog_worker.CatalogJobRunner):
+        def _new_pool(self):
+            return concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency)
+
+    monkeypatch.setattr(catalog_worker, "_run_job", run_in_thread)
+    runner = ThreadRunner(fake, concurrency=2)
+    deadline = time.time() + 5.0
+    while time.time() < deadline:
+        runner.step()
+        # the second job of the tenant waits for the first one
+        assert len(runner.running) <= 1
+        if not (runner.running or runner.pending or fake.lists[catalog_jobs.INGEST_QUEUE_KEY]):
+            break
+        time.sleep(0.01)
+    runner._pool.shutdown(wait=True)
+
+    assert order == job_ids
+    assert fake.lists[catalog_jobs.INGEST_PROCESSING_KEY] == []
+    for job_id in job_ids:
+        _, status = _wait_for_job_status(1, job_id)
+        assert status["state"] == "done"
+
+
+def test_public_catalog_upload_runs_job_when_enqueue_fails(api_client, monkeypatch):
+    from redis import exceptions as redis_ex
+
+    from app.catalog import jobs as catalog_jobs
+    from app.web import public as web_public
+
+    class _DownRedis(_FakeQueueRedis):
+        def lpush(self, key: str, value: str) -> None:
+            raise redis_ex.ConnectionError("redis down")
+
+    monkeypatch.setattr(catalog_jobs, "INGEST_MODE", "queue")
+    monkeypatch.setattr(web_public.common, "redis_client", lambda: _DownRedis())
+
+    response = api_client.post(
+        "/pub/catalog/upload?k=secret&tenant=1",
+        files={"file": ("fallback.csv", "title,price\nfallback,1000\n", "text/csv")},
+    )
+    assert response.status_code == 200, response.text
+    _, status = _wait_for_job_status(1, response.json()["job_id"])
+    assert status["state"] == "done"
+    assert "job_enqueue_failed" in [entry["message"] for entry in status["log"]]
@@ -91,3 +91,20 @@ def test_write_catalog_csv_semicolon_bom_and_sanitization(tmp_path, monkeypatch)
     assert row_map["price"] in {"25000", "25000.0", "25000.00", "25000.000"}  # normalized by pipeline
     assert "\n" not in row_map["desc"] and "\t" not in row_map["desc"]
     assert "  " not in row_map["desc"], "collapsed spaces expected"
+
+
+def test_cluster_columns_merges_noisy_names_of_compatible_type():
+    from app.catalog.pipeline import _cluster_columns
+
+    items = [
+        {"Цвет": "серый", "Материал": "дуб", "Вес": "12", "Размер": "200 см", "Ширина": "90"},
+        {"Цвета": "белый", "Материалы": "бук", "BEC": "14", "Размеры": "180 см", "Ширина ": "серая"},
+        {"Цвет": "синий", "Вес": "10", "Материал": "сосна"},
+    ]
+
+    assert _cluster_columns(items) == {
+        "Цвета": "Цвет",
+        "Материалы": "Материал",
+        "BEC": "Вес",
+        "Размер": "Размеры",
+    }
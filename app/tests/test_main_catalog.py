@@ -245,3 +245,29 @@ def test_read_catalog_auto_maps_russian_headers(sandbox):
     pages = core.paginate_catalog_text(items, cfg, page_size=1)
     assert "Стальная полка" in pages[0]
     assert "25 000" in pages[0]
+
+
+def test_read_catalog_version_tracks_file_changes(sandbox):
+    core, _ = sandbox
+    tenant = 8
+    core.ensure_tenant_files(tenant)
+
+    uploads = core.tenant_dir(tenant) / "uploads"
+    uploads.mkdir(parents=True, exist_ok=True)
+    path = uploads / "catalog.csv"
+    path.write_text("title;price\nПолка;1000\n", encoding="utf-8")
+
+    cfg = core.read_tenant_config(tenant)
+    cfg["catalogs"] = [
+        {"name": "uploaded", "path": "uploads/catalog.csv", "type": "csv", "delimiter": ";"}
+    ]
+    core.write_tenant_config(tenant, cfg)
+
+    first = core._read_catalog(tenant)
+    assert first.version
+    assert core._read_catalog(tenant) is first
+
+    path.write_text("title;price\nПолка;1000\nСтол;25000\n", encoding="utf-8")
+    second = core._read_catalog(tenant)
+    assert second.version != first.version
+    assert len(second) == 2
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Callable
+
+import pytest
+
+from app import outbox_worker
+from app.rate_limit import OutboundRateLimiter
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_outbox_loop_wakes_on_notify_and_limits_each_tenant(monkeypatch: pytest.MonkeyPatch) -> None:
+    table: list[dict[str, Any]] = []
+    listeners: list[Callable[[str], None]] = []
+    started: list[tuple[int, int]] = []
+    running: dict[int, int] = {}
+    peak: dict[int, int] = {}
+    done = asyncio.Event()
+
+    class FakeConnection:
+        def is_closed(self) -> bool:
+            return False
+
+        async def close(self) -> None:
+            return None
+
+    async def fake_listen(callback: Callable[[str], None]) -> FakeConnection:
+        listeners.append(callback)
+        return FakeConnection()
+
+    async def fake_take(limit: int) -> list[dict[str, Any]]:
+        batch, table[:] = table[:limit], table[limit:]
+        return batch
+
+    async def fake_process(entry: dict[str, Any]) -> None:
+        tenant = entry["tenant_id"]
+        started.append((entry["lead_id"], entry["id"]))
+        running[tenant] = running.get(tenant, 0) + 1
+        peak[tenant] = max(peak.get(tenant, 0), running[tenant])
+        await asyncio.sleep(0.01)
+        running[tenant] -= 1
+        if len(started) == 6:
+            done.set()
+
+    async def noop() -> None:
+        return None
+
+    monkeypatch.setattr(outbox_worker, "ensure_outbox_schema", noop)
+    monkeypatch.setattr(outbox_worker, "listen_outbox", fake_listen)
+    monkeypatch.setattr(outbox_worker, "take_outbox_batch", fake_take)
+    monkeypatch.setattr(outbox_worker, "_process_entry", fake_process)
+    monkeypatch.setattr(outbox_worker, "_POLL_INTERVAL", 30.0)
+    monkeypatch.setattr(outbox_worker, "_TENANT_CONCURRENCY", 2)
+
+    task = asyncio.create_task(outbox_worker._run_loop())
+    try:
+        for _ in range(5):
+            await asyncio.sleep(0)
+        assert listeners, "the loop must LISTEN before waiting"
+
+        # Oldest first, as take_outbox_batch returns them.
+        table.extend(
+            {"id": row_id, "lead_id": lead_id, "tenant_id": tenant, "attempts": 0}
+            for row_id, lead_id, tenant in [
+                (1, 10, 1), (2, 11, 1), (3, 12, 1), (4, 13, 1), (5, 10, 1), (6, 20, 2),
+            ]
+        )
+        listeners[0]("10")
+        # Far below the 30s poll interval: only the notification can do this.
+        await asyncio.wait_for(done.wait(), 2.0)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    assert peak[1] == 2 and peak[2] == 1
+    lead_10 = [row_id for lead_id, row_id in started if lead_id == 10]
+    assert lead_10 == [1, 5]
+
+
+@pytest.mark.anyio
+async def test_failed_send_is_rescheduled_with_backoff_or_flood_wait(monkeypatch: pytest.MonkeyPatch) -> None:
+    bumped: list[tuple[int, float]] = []
+    replies: list[tuple[bool, int, str, float | None]] = [
+        (False, 502, "bad_gateway", None),
+        (False, 429, "flood_wait", 120.0),
+    ]
+
+    async def fake_send(**_kwargs: Any) -> tuple[bool, int, str, float | None]:
+        return replies.pop(0)
+
+    async def fake_bump(lead_id: int, _dedup: str, _error: str, *, delay_seconds: float) -> None:
+        bumped.append((lead_id, delay_seconds))
+
+    monkeypatch.setattr(outbox_worker.telegram_bot, "send_message", fake_send)
+    monkeypatch.setattr(outbox_worker, "_rate_limiter", OutboundRateLimiter(None, enabled=False))
+    monkeypatch.setattr(outbox_worker, "bump_attempt", fake_bump)
+    monkeypatch.setattr(outbox_worker, "_RETRY_BASE_DELAY", 2.0)
+    monkeypatch.setattr(outbox_worker, "_RETRY_MAX_DELAY", 300.0)
+    monkeypatch.setattr(outbox_worker, "_MAX_RETRY_ATTEMPTS", 5)
+
+    entry = {"lead_id": 7, "tenant_id": 1, "dedup_hash": "d", "text": "hi", "telegram_user_id": 42}
+    await outbox_worker._process_entry({**entry, "attempts": 2})
+    await outbox_worker._process_entry({**entry, "attempts": 0})
+
+    # attempts=2: jittered within [base * 2**2 / 2, base * 2**2].
+    assert 4.0 <= bumped[0][1] <= 8.0
+    # Telegram's flood wait outranks the short backoff.
+    assert bumped[1] == (7, 120.0)
+    for attempts in range(40):
+        assert outbox_worker._retry_delay(attempts)[0] <= 300.0
@@ -17,6 +17,41 @@ def test_detect_csv_delimiter_tab():
     assert public_module._detect_csv_delimiter("id\tname\tprice") == "\t"
 
 
+def test_read_csv_stream_detects_encoding_and_streams_rows(tmp_path):
+    sample = tmp_path / "upload.csv"
+    body = "Название;Цена\n" + "".join(f"Стул {idx};{idx}00\n" for idx in range(1, 2001))
+    sample.write_bytes(body.encode("cp1251"))
+
+    rows, meta = public_module._read_csv_stream(lambda: sample.open("rb"))
+
+    assert meta["encoding"] == "cp1251"
+    assert meta["delimiter"] == ";"
+    first = next(rows)
+    assert "Стул 1" in first.values()
+    assert sum(1 for _ in rows) == 1999
+    assert meta["columns"][:2] == ["Название", "Цена"]
+
+
+def test_detect_csv_delimiter_skips_title_line():
+    assert public_module._detect_csv_delimiter("Прайс-лист\nid;name;price\n1;Стул;100") == ";"
+
+
+def test_read_csv_stream_falls_back_when_late_bytes_do_not_decode(tmp_path, monkeypatch):
+    monkeypatch.setattr(public_module, "_SNIFF_BYTES", 64)
+    sample = tmp_path / "upload.csv"
+    ascii_rows = "".join(f"Chair {idx};{idx}00\n" for idx in range(1, 21))
+    sample.write_bytes(("name;price\n" + ascii_rows).encode("ascii") + "Стул;900\n".encode("cp1251"))
+
+    rows, meta = public_module._read_csv_stream(lambda: sample.open("rb"))
+    assert meta["encoding"] == "utf-8"
+
+    records = list(rows)
+    assert len(records) == 21
+    assert "Chair 1" in records[0].values()
+    assert "Стул" in records[-1].values()
+    assert meta["encoding"] == "cp1251"
+
+
 def _build_client() -> TestClient:
     app = FastAPI()
     app.include_router(public_module.router)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from app import rate_limit
+from app.rate_limit import Bucket, OutboundRateLimiter
+
+
+class FakeRedis:
+    """Runs the reserve script's bucket arithmetic in Python on a fake clock."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.fail = False
+
+    def register_script(self, _source: str) -> Any:
+        async def script(*, keys: list[str], args: list[Any]) -> str:
+            if self.fail:
+                raise ConnectionError("redis down")
+            cost, rate, burst = args
+            tokens, ts = self.buckets.get(keys[0], (burst, self.now))
+            tokens = min(burst, tokens + max(0.0, self.now - ts) * rate) - cost
+            self.buckets[keys[0]] = (tokens, self.now)
+            return str(-tokens / rate if tokens < 0 else 0)
+
+        return script
+
+
+@pytest.mark.anyio
+async def test_sends_over_budget_wait_for_their_bucket(monkeypatch: pytest.MonkeyPatch) -> None:
+    client = FakeRedis()
+    slept: list[float] = []
+
+    async def fake_sleep(seconds: float) -> None:
+        slept.append(seconds)
+        client.now += seconds
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", fake_sleep)
+    monkeypatch.setitem(rate_limit._limits, "whatsapp", (Bucket(4.0, 4.0), Bucket(1.0, 2.0)))
+    limiter = OutboundRateLimiter(client, enabled=True)
+
+    # The recipient's burst of 2 goes out at once, then one per second.
+    assert [await limiter.acquire(1, "whatsapp", "79990000001") for _ in range(4)] == [0.0, 0.0, 1.0, 1.0]
+    # The tenant was only charged as those sends went out, so it still has
+    # 3 tokens for its other chats; after that they are spread at 4/s.
+    waits = [await limiter.acquire(1, "whatsapp", f"7999000010{idx}") for idx in range(5)]
+    assert waits == [0.0, 0.0, 0.0, 0.25, 0.25]
+    # Other tenants are not affected.
+    assert await limiter.acquire(2, "whatsapp", "79990000001") == 0.0
+    assert slept == [1.0, 1.0, 0.25, 0.25]
+
+    client.now += 10
+    assert await limiter.acquire(1, "whatsapp", "79990000001") == 0.0
+
+    # Redis trouble must not stop sending.
+    client.fail = True
+    assert await limiter.acquire(1, "whatsapp", "79990000001") == 0.0
+
+
+def test_bucket_parse_falls_back_on_bad_values() -> None:
+    default = Bucket(5.0, 10.0)
+    assert Bucket.parse("2:6", default) == Bucket(2.0, 6.0)
+    assert Bucket.parse("3", default) == Bucket(3.0, 3.0)
+    assert Bucket.parse("0:5", default) == default
+    assert Bucket.parse("fast", default) == default
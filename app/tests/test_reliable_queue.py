@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Any
+
+import pytest
+
+from app.reliable_queue import ReliableQueue
+
+
+class FakeRedis:
+    """The list/hash/zset subset ReliableQueue uses, with Redis semantics."""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = defaultdict(list)
+        self.hashes: dict[str, dict[str, int]] = defaultdict(dict)
+        self.zsets: dict[str, dict[str, float]] = defaultdict(dict)
+        self.strings: dict[str, str] = {}
+
+    async def lmove(self, src: str, dst: str, wherefrom: str, whereto: str) -> str | None:
+        items = self.lists[src]
+        if not items:
+            return None
+        value = items.pop(0 if wherefrom == "LEFT" else -1)
+        if whereto == "LEFT":
+            self.lists[dst].insert(0, value)
+        else:
+            self.lists[dst].append(value)
+        return value
+
+    async def blmove(self, src: str, dst: str, timeout: float, wherefrom: str, whereto: str) -> str | None:
+        return await self.lmove(src, dst, wherefrom, whereto)
+
+    async def lrem(self, key: str, count: int, value: str) -> int:
+        if value in self.lists[key]:
+            self.lists[key].remove(value)
+            return 1
+        return 0
+
+    async def lindex(self, key: str, index: int) -> str | None:
+        items = self.lists[key]
+        return items[index] if items else None
+
+    async def lpush(self, key: str, value: str) -> None:
+        self.lists[key].insert(0, value)
+
+    async def hincrby(self, key: str, field: str, amount: int) -> int:
+        self.hashes[key][field] = self.hashes[key].get(field, 0) + amount
+        return self.hashes[key][field]
+
+    async def hdel(self, key: str, field: str) -> None:
+        self.hashes[key].pop(field, None)
+
+    async def zadd(self, key: str, mapping: dict[str, float]) -> None:
+        self.zsets[key].update(mapping)
+
+    async def zrangebyscore(self, key: str, low: Any, high: float) -> list[str]:
+        return [name for name, score in self.zsets[key].items() if score <= high]
+
+    async def zscore(self, key: str, name: str) -> float | None:
+        return self.zsets[key].get(name)
+
+    async def zrem(self, key: str, name: str) -> None:
+        self.zsets[key].pop(name, None)
+
+    async def set(self, key: str, value: str, *, nx: bool = False, ex: int | None = None) -> bool:
+        if nx and key in self.strings:
+            return False
+        self.strings[key] = value
+        return True
+
+    async def delete(self, key: str) -> None:
+        self.strings.pop(key, None)
+
+    def register_script(self, _source: str) -> Any:
+        # The only script is the reclaim lock's compare-and-delete.
+        async def script(*, keys: list[str], args: list[Any]) -> int:
+            if self.strings.get(keys[0]) != args[0]:
+                return 0
+            del self.strings[keys[0]]
+            return 1
+
+        return script
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client: FakeRedis) -> None:
+        self.client = client
+        self.calls: list[Any] = []
+
+    def __getattr__(self, name: str) -> Any:
+        def queue(*args: Any) -> "FakePipeline":
+            self.calls.append(getattr(self.client, name)(*args))
+            return self
+
+        return queue
+
+    async def execute(self) -> list[Any]:
+        return [await call for call in self.calls]
+
+
+@pytest.mark.anyio
+async def test_unacked_items_of_a_dead_consumer_are_redelivered_then_dead_lettered() -> None:
+    client = FakeRedis()
+    await client.lpush("q", "first")
+    await client.lpush("q", "second")
+
+    def consumer(name: str) -> ReliableQueue:
+        return ReliableQueue(client, "q", consumer=name, visibility_timeout=30, max_deliveries=2, dlq_key="q:dlq")
+
+    crashed, survivor = consumer("a"), consumer("b")
+    await crashed.heartbeat()
+    assert await crashed.pop(1) == "first"
+    assert await crashed.pop(1) == "second"
+    await crashed.ack("first")
+    assert client.lists["q:processing:a"] == ["second"]
+
+    client.zsets["q:consumers"]["a"] -= 60  # heartbeat went stale
+    await survivor.heartbeat()
+    assert await survivor.reclaim() == 1
+    assert "a" not in client.zsets["q:consumers"]
+    assert await survivor.pop(1) == "second"
+
+    # survivor dies with it as well: the second reclaim dead-letters it.
+    survivor_again = consumer("c")
+    await survivor_again.heartbeat()
+    client.zsets["q:consumers"]["b"] -= 60
+    assert await survivor_again.reclaim() == 1
+    assert client.lists["q"] == []
+    assert client.lists["q:dlq"] == ["second"]
+    assert client.hashes["q:deliveries"] == {}
+
+    await client.lpush("q", "third")
+    assert await survivor_again.pop(1) == "third"
+    assert await survivor_again.release() == 1
+    assert client.lists["q"] == ["third"]
+
+
+@pytest.mark.anyio
+async def test_restarted_consumer_with_the_same_id_recovers_its_own_items() -> None:
+    client = FakeRedis()
+    await client.lpush("q", "first")
+    await client.lpush("q", "second")
+
+    crashed = ReliableQueue(client, "q", consumer="worker-1", visibility_timeout=30, dlq_key="q:dlq")
+    await crashed.heartbeat()
+    assert await crashed.pop(0) == "first"
+
+    # Same hostname and PID after a container restart: reclaim skips the
+    # id as its own, recover takes the item back before the first pop.
+    restarted = ReliableQueue(client, "q", consumer="worker-1", visibility_timeout=30, dlq_key="q:dlq")
+    assert await restarted.reclaim() == 0
+    assert await restarted.recover() == 1
+    assert client.lists["q:processing:worker-1"] == []
+    assert await restarted.pop(0) == "first"
+    assert await restarted.pop(0) == "second"
+    assert "q:reclaim_lock" not in client.strings
+
+
+@pytest.mark.anyio
+async def test_reclaim_rechecks_heartbeats_and_keeps_a_lock_it_does_not_own() -> None:
+    client = FakeRedis()
+    await client.lpush("q", "first")
+
+    busy = ReliableQueue(client, "q", consumer="a", visibility_timeout=30)
+    reclaimer = ReliableQueue(client, "q", consumer="b", visibility_timeout=30)
+    await busy.heartbeat()
+    assert await busy.pop(0) == "first"
+    client.zsets["q:consumers"]["a"] -= 60
+
+    # The consumer heartbeats between the stale scan and taking the lock.
+    take_lock = client.set
+
+    async def set_after_heartbeat(*args: Any, **kwargs: Any) -> bool:
+        await busy.heartbeat()
+        return await take_lock(*args, **kwargs)
+
+    client.set = set_after_heartbeat  # type: ignore[method-assign]
+    assert await reclaimer.reclaim() == 0
+    assert client.lists["q:processing:a"] == ["first"]
+    assert "a" in client.zsets["q:consumers"]
+    client.set = take_lock  # type: ignore[method-assign]
+
+    # Our lock expired and another replica holds it now: releasing is a no-op.
+    client.strings["q:reclaim_lock"] = "c"
+    await reclaimer._release_reclaim_lock()
+    assert client.strings["q:reclaim_lock"] == "c"
@@ -282,3 +282,88 @@ def test_send_whatsapp_propagates_waweb_error(monkeypatch: pytest.MonkeyPatch) -
     assert call["endpoint"].endswith("/send?tenant=1")
     assert call["json"]["to"] == "79991234567@c.us"
     assert call["headers"] and call["headers"].get("X-Auth-Token") == "test-token"
+
+
+def test_waweb_transport_reuses_one_pool_per_base_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    import asyncio
+
+    import httpx
+
+    from app.transport import waweb as waweb_transport
+
+    seen: list[tuple[str, dict[str, Any]]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append((str(request.url), json.loads(request.content)))
+        if request.url.host == "down":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, content=b'{"ok": true}')
+
+    created: list[str] = []
+
+    def new_client(base_url: str) -> httpx.AsyncClient:
+        created.append(base_url)
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(waweb_transport, "_new_client", new_client)
+    monkeypatch.setattr(waweb_transport, "_clients", {})
+
+    async def scenario() -> list[tuple[int, str]]:
+        try:
+            return [
+                await waweb_transport.request_json("POST", "http://waweb:9001/send?tenant=1", {"text": "a"}),
+                await waweb_transport.request_json("POST", "http://waweb:9001/send?tenant=2", {"text": "b"}),
+                await waweb_transport.request_json("POST", "http://down:9001/send", {"text": "c"}),
+            ]
+        finally:
+            await waweb_transport.aclose()
+
+    results = asyncio.run(scenario())
+
+    assert created == ["http://waweb:9001", "http://down:9001"]
+    assert results[0] == results[1] == (200, '{"ok": true}')
+    assert results[2][0] == 0 and "refused" in results[2][1]
+    assert [body["text"] for _, body in seen] == ["a", "b", "c"]
+    assert waweb_transport.pool_stats() == {}
+
+
+def test_internal_attachment_is_prepared_once_per_file_version(monkeypatch: pytest.MonkeyPatch) -> None:
+    import asyncio
+
+    from app import worker
+    from app.transport import attachments as attachment_cache
+
+    attachment_cache.clear()
+    monkeypatch.setattr(attachment_cache, "CACHE_REVALIDATE_SECONDS", 0.0)
+    versions = {"etag": '"v1"', "body": b"%PDF-1.4 first"}
+    downloads: list[str] = []
+
+    async def fake_download(relative_url: str):
+        downloads.append(relative_url)
+        headers = {
+            "ETag": versions["etag"],
+            "Content-Type": "application/pdf",
+            "Content-Disposition": "attachment; filename=\"catalog.pdf\"",
+        }
+        return versions["body"], headers, f"http://app:8000{relative_url}"
+
+    async def fake_head(relative_url: str):
+        return {"ETag": versions["etag"], "Content-Type": "application/pdf"}
+
+    monkeypatch.setattr(worker, "_download_internal_attachment", fake_download)
+    monkeypatch.setattr(worker, "_head_internal_attachment", fake_head)
+
+    url = "/internal/tenant/1/catalog-file?path=catalog.pdf"
+    first = asyncio.run(worker._prepare_internal_attachment({"type": "document", "url": url}))
+    second = asyncio.run(worker._prepare_internal_attachment({"type": "document", "url": f"{url}&token=x"}))
+    versions.update(etag='"v2"', body=b"%PDF-1.4 second")
+    third = asyncio.run(worker._prepare_internal_attachment({"type": "document", "url": url}))
+    attachment_cache.clear()
+
+    assert len(downloads) == 2
+    assert first["b64"] == second["b64"] and first["media_id"] == second["media_id"]
+    assert second["filename"] == "catalog.pdf" and second["mime"] == "application/pdf"
+    assert third["media_id"] != first["media_id"]
+
+    wa_attachment, document_block = worker._build_wa_document_payload(third)
+    assert wa_attachment["media_id"] == document_block["media_id"] == third["media_id"]
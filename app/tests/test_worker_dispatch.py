@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.worker_dispatch import KeyedDispatcher
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_keyed_dispatcher_orders_per_key_and_runs_keys_in_parallel() -> None:
+    dispatcher = KeyedDispatcher("test", concurrency=2, max_pending=3)
+    dispatcher.start()
+    release = asyncio.Event()
+    log: list[str] = []
+    running: set[str] = set()
+    overlap: list[set[str]] = []
+
+    def job(key: str, label: str, *, block: bool = False):
+        async def run() -> None:
+            running.add(key)
+            overlap.append(set(running))
+            if block:
+                await release.wait()
+            await asyncio.sleep(0)
+            log.append(label)
+            running.discard(key)
+
+        return run
+
+    await dispatcher.submit("chat-a", job("chat-a", "a1", block=True))
+    await dispatcher.submit("chat-a", job("chat-a", "a2"))
+    await dispatcher.submit("chat-b", job("chat-b", "b1"))
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert log == ["b1"], "other chats must not wait behind a slow one"
+    with pytest.raises(asyncio.TimeoutError):
+        # a1 and c1 (running) and a2 (queued behind a1) fill max_pending
+        await dispatcher.submit("chat-c", job("chat-c", "c1", block=True))
+        await asyncio.wait_for(dispatcher.wait_for_capacity(), 0.05)
+
+    release.set()
+    await asyncio.wait_for(dispatcher.drain(), 1.0)
+    await dispatcher.aclose()
+
+    assert log.index("a1") < log.index("a2")
+    assert sorted(log) == ["a1", "a2", "b1", "c1"]
+    assert all(len(keys) <= 2 for keys in overlap)
+    assert dispatcher.pending == dispatcher.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_keyed_dispatcher_shares_lanes_across_groups() -> None:
+    dispatcher = KeyedDispatcher("test", concurrency=2, max_pending=16, max_per_group=1)
+    dispatcher.start()
+    release = asyncio.Event()
+    started: list[str] = []
+
+    def job(label: str):
+        async def run() -> None:
+            started.append(label)
+            await release.wait()
+
+        return run
+
+    for contact in range(4):
+        await dispatcher.submit(("noisy", contact), job(f"noisy-{contact}"), group="noisy")
+    await dispatcher.submit(("quiet", 0), job("quiet-0"), group="quiet")
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+    assert started == ["noisy-0", "quiet-0"], "one tenant may hold at most max_per_group lanes"
+
+    release.set()
+    await asyncio.wait_for(dispatcher.drain(), 1.0)
+    await dispatcher.aclose()
+    assert sorted(started) == ["noisy-0", "noisy-1", "noisy-2", "noisy-3", "quiet-0"]
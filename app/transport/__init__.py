@@ -4,6 +4,7 @@ import re
 from typing import Tuple
 
 from .telegram import send as send_telegram, aclose as close_telegram
+from .waweb import aclose as close_waweb, request_json as waweb_request_json
 
 _WHATSAPP_JID_SUFFIX = "@c.us"
 
@@ -61,4 +62,6 @@ __all__ = [
     "WhatsAppAddressError",
     "send_telegram",
     "close_telegram",
+    "close_waweb",
+    "waweb_request_json",
 ]
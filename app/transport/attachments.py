@@ -0,0 +1,249 @@
+"""Worker-side cache of prepared internal attachments.
+
+Catalog files sent to WhatsApp are fetched from the app's
+``/internal/tenant/<id>/catalog-file`` endpoint and base64-encoded for
+waweb. Prepared payloads are kept in a byte-bounded LRU keyed by the
+token-less internal URL (tenant + path) and tagged with the response
+validator (ETag, else Last-Modified + length), so a file is downloaded and
+encoded once per version rather than once per send. Entries older than
+``WA_ATTACHMENT_CACHE_REVALIDATE`` seconds are confirmed with a ``HEAD``
+before reuse.
+
+Each entry also carries a content-addressed ``media_id``. waweb keeps its
+own cache under that id; once a waweb base URL has accepted a payload with
+the bytes, later sends to it may omit ``b64`` (the tokenized URL stays in the
+payload as a fallback if waweb has dropped the media).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+from app.metrics import WA_ATTACHMENT_CACHE_BYTES, WA_ATTACHMENT_CACHE_COUNTER, WA_ATTACHMENT_CACHE_ENTRIES
+
+# Bytes of base64 payloads kept in memory; 0 disables the cache.
+CACHE_MAX_BYTES = max(0, int(os.getenv("WA_ATTACHMENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))))
+# Seconds an entry is reused without asking the app whether the file changed.
+CACHE_REVALIDATE_SECONDS = max(0.0, float(os.getenv("WA_ATTACHMENT_CACHE_REVALIDATE", "30")))
+# (waweb base URL, media_id) pairs remembered as already delivered.
+_DELIVERED_MAX = 4096
+
+_HEADER_KEYS = ("Content-Type", "Content-Disposition")
+
+
+@dataclass
+class PreparedAttachment:
+    validator: str
+    b64: str
+    media_id: str
+    size: int
+    headers: Dict[str, str]
+    checked_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def from_response(cls, data: bytes, headers: Mapping[str, str] | None, validator: str) -> "PreparedAttachment":
+        return cls(
+            validator=validator,
+            b64=base64.b64encode(data).decode("ascii"),
+            media_id=f"sha256:{hashlib.sha256(data).hexdigest()}",
+            size=len(data),
+            headers=_kept_headers(headers),
+        )
+
+
+def _kept_headers(headers: Mapping[str, str] | None) -> Dict[str, str]:
+    # Filename and mime may change (re-uploaded catalog name) while the bytes
+    # do not, so these are refreshed from every HEAD.
+    if not headers:
+        return {}
+    kept = {key: str(headers.get(key) or "") for key in _HEADER_KEYS}
+    return {key: value for key, value in kept.items() if value}
+
+
+_ENTRIES: "OrderedDict[str, PreparedAttachment]" = OrderedDict()
+_BYTES = 0
+_DELIVERED: "OrderedDict[Tuple[str, str], None]" = OrderedDict()
+_LOCK = threading.Lock()
+
+_client_lock = asyncio.Lock()
+_client: Optional[httpx.AsyncClient] = None
+
+
+def cache_key(relative_url: str) -> str:
+    """Internal URL without the ``token`` query parameter or fragment."""
+
+    parts = urlsplit(relative_url.strip())
+    query = "&".join(
+        chunk
+        for chunk in parts.query.split("&")
+        if chunk and chunk.partition("=")[0].lower() != "token"
+    )
+    return urlunsplit(("", "", parts.path or "/", query, ""))
+
+
+def response_validator(headers: Mapping[str, str] | None) -> str:
+    """ETag if the response has one, else Last-Modified plus length; ``""``
+    means the response cannot be revalidated and is not cached."""
+
+    if not headers:
+        return ""
+    etag = str(headers.get("ETag") or headers.get("etag") or "").strip()
+    if etag:
+        return etag
+    modified = str(headers.get("Last-Modified") or headers.get("last-modified") or "").strip()
+    if not modified:
+        return ""
+    length = str(headers.get("Content-Length") or headers.get("content-length") or "").strip()
+    return f"{modified}|{length}"
+
+
+def _publish_locked() -> None:
+    WA_ATTACHMENT_CACHE_BYTES.set(_BYTES)
+    WA_ATTACHMENT_CACHE_ENTRIES.set(len(_ENTRIES))
+
+
+def lookup(key: str) -> Optional[PreparedAttachment]:
+    if CACHE_MAX_BYTES <= 0:
+        return None
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            WA_ATTACHMENT_CACHE_COUNTER.labels("miss").inc()
+            return None
+        _ENTRIES.move_to_end(key)
+        return entry
+
+
+def needs_revalidation(entry: PreparedAttachment) -> bool:
+    return time.monotonic() - entry.checked_at >= CACHE_REVALIDATE_SECONDS
+
+
+def confirm(key: str, entry: PreparedAttachment, headers: Mapping[str, str] | None) -> bool:
+    """Record the ``HEAD`` answer for ``entry``; a changed validator drops it."""
+
+    validator = response_validator(headers)
+    if validator and validator == entry.validator:
+        entry.checked_at = time.monotonic()
+        # A HEAD may carry only some of the headers; keep the cached rest.
+        entry.headers = {**entry.headers, **_kept_headers(headers)}
+        WA_ATTACHMENT_CACHE_COUNTER.labels("revalidated").inc()
+        return True
+    discard(key)
+    WA_ATTACHMENT_CACHE_COUNTER.labels("stale").inc()
+    return False
+
+
+def mark_hit() -> None:
+    WA_ATTACHMENT_CACHE_COUNTER.labels("hit").inc()
+
+
+def store(key: str, entry: PreparedAttachment) -> PreparedAttachment:
+    global _BYTES
+    if CACHE_MAX_BYTES <= 0 or not entry.validator or len(entry.b64) > CACHE_MAX_BYTES:
+        return entry
+    with _LOCK:
+        previous = _ENTRIES.pop(key, None)
+        if previous is not None:
+            _BYTES -= len(previous.b64)
+        _ENTRIES[key] = entry
+        _BYTES += len(entry.b64)
+        while _BYTES > CACHE_MAX_BYTES and _ENTRIES:
+            _, evicted = _ENTRIES.popitem(last=False)
+            _BYTES -= len(evicted.b64)
+        _publish_locked()
+    return entry
+
+
+def discard(key: str) -> None:
+    global _BYTES
+    with _LOCK:
+        entry = _ENTRIES.pop(key, None)
+        if entry is not None:
+            _BYTES -= len(entry.b64)
+            _publish_locked()
+
+
+def delivered(base_url: str, media_id: str) -> bool:
+    """Whether ``base_url`` has already been sent the bytes of ``media_id``."""
+
+    with _LOCK:
+        return (base_url, media_id) in _DELIVERED
+
+
+def mark_delivered(base_url: str, media_id: str) -> None:
+    with _LOCK:
+        _DELIVERED[(base_url, media_id)] = None
+        _DELIVERED.move_to_end((base_url, media_id))
+        while len(_DELIVERED) > _DELIVERED_MAX:
+            _DELIVERED.popitem(last=False)
+
+
+def forget_delivered(base_url: str) -> None:
+    """Drop what is known about ``base_url``, e.g. after a failed send."""
+
+    with _LOCK:
+        for pair in [pair for pair in _DELIVERED if pair[0] == base_url]:
+            del _DELIVERED[pair]
+
+
+def cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        return {"entries": len(_ENTRIES), "bytes": _BYTES, "delivered": len(_DELIVERED)}
+
+
+def clear() -> None:
+    global _BYTES
+    with _LOCK:
+        _ENTRIES.clear()
+        _DELIVERED.clear()
+        _BYTES = 0
+        _publish_locked()
+
+
+async def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive client for downloads from the app's internal API."""
+
+    global _client
+    async with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.AsyncClient(timeout=httpx.Timeout(20.0, connect=5.0))
+    return _client
+
+
+async def aclose() -> None:
+    global _client
+    async with _client_lock:
+        client, _client = _client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+
+__all__ = [
+    "PreparedAttachment",
+    "aclose",
+    "cache_key",
+    "cache_stats",
+    "clear",
+    "confirm",
+    "delivered",
+    "discard",
+    "forget_delivered",
+    "get_client",
+    "lookup",
+    "mark_delivered",
+    "mark_hit",
+    "needs_revalidation",
+    "response_validator",
+    "store",
+]
@@ -0,0 +1,150 @@
+"""Pooled HTTP transport from the worker to waweb.
+
+One ``httpx.AsyncClient`` is kept per waweb base URL, so sends and their
+retries reuse keep-alive connections instead of opening a socket (and
+holding an executor thread) per attempt. ``request_json`` keeps the
+``(status, body)`` contract of the worker's old ``_http_json``: transport
+errors come back as status ``0`` with the error text.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, Mapping
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.metrics import (
+    WAWEB_HTTP_IN_FLIGHT,
+    WAWEB_HTTP_POOL_CONNECTIONS,
+    WAWEB_HTTP_POOLS,
+    WAWEB_HTTP_REQUEST_SECONDS,
+)
+
+logger = logging.getLogger("app.transport.waweb")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        return default
+
+
+MAX_CONNECTIONS = _env_int("WAWEB_HTTP_MAX_CONNECTIONS", 32)
+MAX_KEEPALIVE_CONNECTIONS = _env_int("WAWEB_HTTP_MAX_KEEPALIVE", 16)
+try:
+    KEEPALIVE_EXPIRY = float(os.getenv("WAWEB_HTTP_KEEPALIVE_EXPIRY", "30"))
+except ValueError:
+    KEEPALIVE_EXPIRY = 30.0
+
+_clients_lock = asyncio.Lock()
+_clients: Dict[str, httpx.AsyncClient] = {}
+_in_flight: Dict[str, int] = {}
+
+
+def _base_of(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _new_client(base_url: str) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(limits=limits)
+
+
+async def get_client(base_url: str) -> httpx.AsyncClient:
+    async with _clients_lock:
+        client = _clients.get(base_url)
+        if client is None or client.is_closed:
+            client = _clients[base_url] = _new_client(base_url)
+            WAWEB_HTTP_POOLS.set(len(_clients))
+    return client
+
+
+def _pool_connections(client: httpx.AsyncClient) -> tuple[int, int]:
+    # httpx does not expose its connection pool; read httpcore's if present.
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", None) or ())
+    idle = 0
+    for connection in connections:
+        try:
+            idle += 1 if connection.is_idle() else 0
+        except Exception:
+            continue
+    return len(connections) - idle, idle
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Open/idle connections and in-flight requests per waweb base URL."""
+
+    stats: Dict[str, Dict[str, int]] = {}
+    for base_url, client in list(_clients.items()):
+        active, idle = _pool_connections(client)
+        stats[base_url] = {"active": active, "idle": idle, "in_flight": _in_flight.get(base_url, 0)}
+    return stats
+
+
+def _update_pool_gauges(base_url: str, client: httpx.AsyncClient) -> None:
+    active, idle = _pool_connections(client)
+    WAWEB_HTTP_POOL_CONNECTIONS.labels(base_url=base_url, state="active").set(active)
+    WAWEB_HTTP_POOL_CONNECTIONS.labels(base_url=base_url, state="idle").set(idle)
+
+
+async def request_json(
+    method: str,
+    url: str,
+    data: Mapping[str, Any] | None = None,
+    timeout: float = 10.0,
+    headers: Mapping[str, str] | None = None,
+) -> tuple[int, str]:
+    base_url = _base_of(url)
+    client = await get_client(base_url)
+    request_headers = {"Content-Type": "application/json; charset=utf-8"}
+    request_headers.update(headers or {})
+    content = json.dumps(data, ensure_ascii=False).encode("utf-8") if data is not None else None
+
+    _in_flight[base_url] = _in_flight.get(base_url, 0) + 1
+    WAWEB_HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = await client.request(
+            method,
+            url,
+            content=content,
+            headers=request_headers,
+            timeout=httpx.Timeout(timeout),
+        )
+        outcome = "ok" if response.status_code < 500 else "server_error"
+        return response.status_code, response.text
+    except httpx.HTTPError as exc:
+        logger.warning("event=waweb_http_error url=%s error=%s", url, exc)
+        return 0, str(exc) or exc.__class__.__name__
+    finally:
+        _in_flight[base_url] -= 1
+        WAWEB_HTTP_IN_FLIGHT.dec()
+        WAWEB_HTTP_REQUEST_SECONDS.labels(outcome=outcome).observe(time.perf_counter() - started)
+        _update_pool_gauges(base_url, client)
+
+
+async def aclose() -> None:
+    async with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+        WAWEB_HTTP_POOLS.set(0)
+    for client in clients:
+        if not client.is_closed:
+            await client.aclose()
+
+
+__all__ = ["aclose", "get_client", "pool_stats", "request_json"]
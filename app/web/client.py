@@ -1,3 +1,4 @@
+import asyncio
 import csv
 import importlib
 import io
@@ -9,7 +10,7 @@ import re
 import sys
 import time
 import uuid
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, Optional
 from urllib.parse import quote, quote_plus
 
 import logging
@@ -688,15 +689,7 @@ async def catalog_upload(tenant: int, request: Request, file: UploadFile = File(
     if ext not in allowed:
         return {"ok": False, "error": "unsupported_type"}
 
-    raw = await file.read()
-    if not raw:
-        return {"ok": False, "error": "empty_file"}
-    if len(raw) > MAX_UPLOAD_SIZE_BYTES:
-        return {
-            "ok": False,
-            "error": "file_too_large",
-            "max_size_bytes": MAX_UPLOAD_SIZE_BYTES,
-        }
+    from . import public as _pub
 
     # Persist original upload under tenant/uploads
     C.ensure_tenant_files(tenant)
@@ -706,37 +699,63 @@ async def catalog_upload(tenant: int, request: Request, file: UploadFile = File(
 
     safe_name = f"catalog_{uuid.uuid4().hex}{ext}"
     dest_path = uploads_dir / safe_name
-    dest_path.write_bytes(raw)
+    size = await _pub._spool_upload(file, dest_path, max_bytes=MAX_UPLOAD_SIZE_BYTES)
+    if not size:
+        return {"ok": False, "error": "empty_file"}
+    if size > MAX_UPLOAD_SIZE_BYTES:
+        return {
+            "ok": False,
+            "error": "file_too_large",
+            "max_size_bytes": MAX_UPLOAD_SIZE_BYTES,
+        }
     relative_path = str(pathlib.Path("uploads") / safe_name)
 
-    # Parse/normalize rows using the same helpers as the public route
-    try:
-        from . import public as _pub
-        if ext == ".csv":
-            normalized_rows, meta = _pub._read_csv_bytes(raw)
-        elif ext in {".xlsx", ".xls"}:
-            normalized_rows, meta = _pub._read_excel_bytes(raw)
-        else:
-            saved_rel = dest_path.relative_to(tenant_root)
-            normalized_rows, meta, manifest_rel = _pub._process_pdf(
-                tenant=int(tenant),
-                saved_path=dest_path,
-                tenant_root=tenant_root,
-                saved_rel_path=saved_rel,
-                original_name=filename,
-            )
-    except CatalogIndexError as exc:
-        return {"ok": False, "error": "catalog_index_failed", "detail": str(exc)}
-    except Exception as exc:
-        return {"ok": False, "error": "processing_failed", "detail": str(exc)}
-
     # Write canonical CSV under tenant/catalogs for consistent discovery
     from app.catalog.io import write_catalog_csv  # local import to avoid cyclical aliasing
-    try:
-        # Persist under a stable name to avoid UI path churn
-        csv_rel_path, ordered_columns = write_catalog_csv(int(tenant), normalized_rows, "catalog", meta)
-    except Exception as exc:
-        return {"ok": False, "error": "csv_write_failed", "detail": str(exc)}
+
+    def _parse_and_write() -> tuple[dict[str, Any] | None, Any, Any]:
+        """Parse the upload and write the canonical CSV; runs off the event loop."""
+
+        # Parse/normalize rows using the same helpers as the public route
+        try:
+            if ext == ".csv":
+                normalized_rows, meta = _pub._read_csv_stream(lambda: dest_path.open("rb"))
+            elif ext in {".xlsx", ".xls"}:
+                normalized_rows, meta = _pub._read_excel_stream(dest_path)
+            else:
+                saved_rel = dest_path.relative_to(tenant_root)
+                normalized_rows, meta, manifest_rel = _pub._process_pdf(
+                    tenant=int(tenant),
+                    saved_path=dest_path,
+                    tenant_root=tenant_root,
+                    saved_rel_path=saved_rel,
+                    original_name=filename,
+                )
+        except CatalogIndexError as exc:
+            return {"ok": False, "error": "catalog_index_failed", "detail": str(exc)}, None, None
+        except Exception as exc:
+            return {"ok": False, "error": "processing_failed", "detail": str(exc)}, None, None
+
+        # CSV/XLSX rows are streamed, so they are counted as they are written.
+        def _counted(rows: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+            for row in rows:
+                parsed[0] += 1
+                yield row
+
+        try:
+            # Persist under a stable name to avoid UI path churn
+            csv_rel_path, ordered_columns = write_catalog_csv(int(tenant), _counted(normalized_rows), "catalog", meta)
+        except _pub.CatalogReadError as exc:
+            return {"ok": False, "error": "processing_failed", "detail": str(exc)}, None, None
+        except Exception as exc:
+            return {"ok": False, "error": "csv_write_failed", "detail": str(exc)}, None, None
+        return None, meta, (csv_rel_path, ordered_columns)
+
+    parsed = [0]
+    failure, meta, written = await asyncio.to_thread(_parse_and_write)
+    if failure is not None:
+        return failure
+    csv_rel_path, ordered_columns = written
 
     # Update tenant config: newest first, preserve prior entries with different path
     cfg = C.read_tenant_config(tenant)
@@ -763,7 +782,7 @@ async def catalog_upload(tenant: int, request: Request, file: UploadFile = File(
         "original": filename,
         "uploaded_at": int(time.time()),
         "type": catalog_type,
-        "size": len(raw),
+        "size": size,
         "mime": (mimetypes.guess_type(filename)[0] or "application/octet-stream"),
         "csv_path": csv_rel_path,
     }
@@ -788,6 +807,7 @@ async def catalog_upload(tenant: int, request: Request, file: UploadFile = File(
                 uploaded_meta["index"] = idx
     integrations["uploaded_catalog"] = uploaded_meta
     C.write_tenant_config(tenant, cfg)
+    await asyncio.to_thread(C.prebuild_catalog_search_index, tenant)
 
     accept_header = (request.headers.get("accept") or "").lower()
     sec_fetch_mode = (request.headers.get("sec-fetch-mode") or "").lower()
@@ -810,7 +830,7 @@ async def catalog_upload(tenant: int, request: Request, file: UploadFile = File(
         "stored_as": safe_name,
         "csv_path": csv_rel_path,
         "path": csv_rel_path,
-        "items_total": len(normalized_rows),
+        "items_total": parsed[0],
         "columns": ordered_columns,
     }
 
@@ -1615,6 +1635,7 @@ async def catalog_csv_save(tenant: int, request: Request):
         detail = str(exc) or "invalid_rows"
         return JSONResponse({"detail": detail}, status_code=400)
 
+    await asyncio.to_thread(C.prebuild_catalog_search_index, tenant)
     return {"ok": True, "rows": written}
 
 
@@ -34,6 +34,7 @@ try:
         ensure_tenant_files,
         read_tenant_config,
         write_tenant_config,
+        prebuild_catalog_search_index,
         read_persona,
         write_persona,
         tenant_waweb_url,
@@ -50,6 +51,7 @@ except ImportError:  # pragma: no cover - fallback when alias not yet registered
         ensure_tenant_files,
         read_tenant_config,
         write_tenant_config,
+        prebuild_catalog_search_index,
         read_persona,
         write_persona,
         tenant_waweb_url,
@@ -779,6 +781,7 @@ __all__ = [
     "ensure_tenant_files",
     "read_tenant_config",
     "write_tenant_config",
+    "prebuild_catalog_search_index",
     "read_persona",
     "write_persona",
     "webhook_url",
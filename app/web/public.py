@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import codecs
 import csv
 import importlib
 import io
@@ -19,7 +20,7 @@ import base64
 import random
 import secrets
 import html
-from typing import Any, Iterable, Mapping, Optional
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Mapping, Optional
 
 import qrcode
 from qrcode.image.svg import SvgImage
@@ -58,15 +59,16 @@ except Exception:  # pragma: no cover - openpyxl is optional in some environment
     load_workbook = None  # type: ignore[assignment]
 
 try:
-    from app.core import _normalize_catalog_items, settings  # type: ignore[attr-defined]
+    from app.core import _iter_normalized_catalog_items, _normalize_catalog_items, settings  # type: ignore[attr-defined]
     import app.core as core_module  # type: ignore[attr-defined]
 except ImportError:  # pragma: no cover - fallback for legacy layout
     try:
-        from core import _normalize_catalog_items, settings  # type: ignore[attr-defined]
+        from core import _iter_normalized_catalog_items, _normalize_catalog_items, settings  # type: ignore[attr-defined]
         core_module = _import_alias("core")
     except ImportError:
         core_module = _import_alias("core")
         _normalize_catalog_items = core_module._normalize_catalog_items
+        _iter_normalized_catalog_items = core_module._iter_normalized_catalog_items
         settings = core_module.settings
 
 from urllib.parse import quote, quote_plus, urlencode
@@ -75,6 +77,8 @@ from redis import exceptions as redis_ex
 
 from app.web import client as C
 from app.metrics import MESSAGE_IN_COUNTER, DB_ERRORS_COUNTER
+from app.catalog import jobs as catalog_jobs
+from app.catalog import profiling as catalog_profiling
 from app.db import insert_message_in, upsert_lead
 from app.integrations import avito
 from . import common as common
@@ -888,125 +892,207 @@ def _detect_csv_delimiter(text: str) -> str:
     if not isinstance(text, str) or not text:
         return ","
 
-    first_line = ""
+    # The first line that holds any candidate decides, so a title row above
+    # the header does not force the default.
     for raw_line in io.StringIO(text):
-        candidate = raw_line.strip("\r\n")
-        if candidate:
-            first_line = _strip_bom(candidate)
-            break
+        line = _strip_bom(raw_line.strip("\r\n"))
+        if not line:
+            continue
+        best = ","
+        best_count = 0
+        for delimiter in _DELIMITER_CANDIDATES:
+            count = line.count(delimiter)
+            if count > best_count:
+                best = delimiter
+                best_count = count
+        if best_count > 0:
+            return best
+    return ","
 
-    if not first_line:
-        return ","
 
-    best = ","
-    best_count = -1
-    best_idx = len(_DELIMITER_CANDIDATES)
-    for idx, delimiter in enumerate(_DELIMITER_CANDIDATES):
-        count = first_line.count(delimiter)
-        if count > best_count or (count == best_count and count > 0 and idx < best_idx):
-            best = delimiter
-            best_count = count
-            best_idx = idx
-
-    if best_count <= 0:
-        return ","
-    return best
+_READ_CHUNK_BYTES = 1024 * 1024
+# Encoding and delimiter are picked from this much of an upload.
+_SNIFF_BYTES = 64 * 1024
 
 
-def _read_csv_bytes(raw: bytes) -> tuple[list[dict[str, str]], dict[str, Any]]:
-    encoding_used: str | None = None
-    text: str | None = None
+class CatalogReadError(ValueError):
+    """Raised while streaming rows out of an uploaded CSV/Excel file."""
+
+
+def _detect_stream_encoding(opener: Callable[[], BinaryIO]) -> str:
+    # Only a prefix is probed; a late decode error is handled by _read_csv_stream.
+    with opener() as handle:
+        prefix = handle.read(_SNIFF_BYTES)
+    complete = len(prefix) < _SNIFF_BYTES
     for encoding in CSV_ENCODING_CANDIDATES:
         try:
-            text = raw.decode(encoding)
-            encoding_used = encoding
-            break
+            codecs.getincrementaldecoder(encoding)().decode(prefix, final=complete)
         except UnicodeDecodeError:
             continue
-    if text is None or encoding_used is None:
-        raise ValueError("encoding_detection_failed")
+        return encoding
+    raise ValueError("encoding_detection_failed")
 
-    delimiter = _detect_csv_delimiter(text)
 
-    stream = io.StringIO(text)
-    reader = csv.reader(stream, delimiter=delimiter)
-    header: list[str] | None = None
-    for row in reader:
-        if not row:
-            continue
-        meaningful = [(_stringify(cell)) for cell in row if _stringify(cell)]
-        if not meaningful:
-            continue
-        header = _normalize_headers(row)
-        break
-    records: list[dict[str, str]] = []
-    if header is None:
-        header = ["title"]
-    for row in reader:
-        if not row:
-            continue
-        cleaned = [_stringify(value) for value in row]
-        non_empty = [cell for cell in cleaned if cell]
-        if not non_empty:
-            continue
-        if len(non_empty) == 1 and non_empty[0] == ".":
-            continue
-        while len(header) < len(row):
-            header.append(f"column_{len(header) + 1}")
-        record: dict[str, str] = {}
-        for idx, value in enumerate(row):
-            key = header[idx]
-            record[key] = _stringify(value)
-        if any(record.values()):
-            records.append(record)
-
-    meta = {
+def _text_stream(opener: Callable[[], BinaryIO], encoding: str, newline: str) -> io.TextIOWrapper:
+    return io.TextIOWrapper(opener(), encoding=encoding, newline=newline)
+
+
+def _read_csv_stream(opener: Callable[[], BinaryIO]) -> tuple[Iterator[dict[str, Any]], dict[str, Any]]:
+    """Normalized rows of a CSV upload, decoded and parsed as they are consumed.
+
+    ``meta["columns"]`` is complete once the rows are exhausted.
+    """
+
+    encoding_used = _detect_stream_encoding(opener)
+    with opener() as handle:
+        sample = handle.read(_SNIFF_BYTES).decode(encoding_used, errors="replace")
+    delimiter = _detect_csv_delimiter(sample)
+    header: list[str] = ["title"]
+    meta: dict[str, Any] = {
         "type": "csv",
         "encoding": encoding_used,
         "delimiter": delimiter,
         "columns": header,
     }
-    normalized = _normalize_catalog_items(records, meta)
-    return normalized, meta
 
+    def decoded_records(encoding: str) -> Iterator[dict[str, str]]:
+        with _text_stream(opener, encoding, "") as stream:
+            reader = csv.reader(stream, delimiter=delimiter)
+            try:
+                for row in reader:
+                    if not row:
+                        continue
+                    meaningful = [(_stringify(cell)) for cell in row if _stringify(cell)]
+                    if not meaningful:
+                        continue
+                    header[:] = _normalize_headers(row)
+                    break
+                for row in reader:
+                    if not row:
+                        continue
+                    cleaned = [_stringify(value) for value in row]
+                    non_empty = [cell for cell in cleaned if cell]
+                    if not non_empty:
+                        continue
+                    if len(non_empty) == 1 and non_empty[0] == ".":
+                        continue
+                    while len(header) < len(row):
+                        header.append(f"column_{len(header) + 1}")
+                    record: dict[str, str] = {}
+                    for idx, value in enumerate(row):
+                        key = header[idx]
+                        record[key] = _stringify(value)
+                    if any(record.values()):
+                        yield record
+            except csv.Error as exc:
+                raise CatalogReadError(str(exc)) from exc
+
+    def records() -> Iterator[dict[str, str]]:
+        # The encoding was picked from a prefix. If the rest of the file does
+        # not decode, re-read it with the next candidate and skip the rows
+        # already handed out.
+        fallbacks = CSV_ENCODING_CANDIDATES[CSV_ENCODING_CANDIDATES.index(encoding_used):]
+        emitted = 0
+        for encoding in fallbacks:
+            meta["encoding"] = encoding
+            skip = emitted
+            try:
+                for record in decoded_records(encoding):
+                    if skip:
+                        skip -= 1
+                        continue
+                    emitted += 1
+                    yield record
+            except UnicodeDecodeError:
+                continue
+            return
+        raise CatalogReadError("encoding_detection_failed")
+
+    return _iter_normalized_catalog_items(records(), meta), meta
+
+
+def _read_excel_stream(source: Any) -> tuple[Iterator[dict[str, Any]], dict[str, Any]]:
+    """Normalized rows of the active sheet, read with openpyxl ``read_only``.
+
+    ``source`` is a path or a binary file object; the workbook stays open
+    until the rows are exhausted.
+    """
 
-def _read_excel_bytes(raw: bytes) -> tuple[list[dict[str, str]], dict[str, Any]]:
     if load_workbook is None:
         raise RuntimeError("excel_support_unavailable")
 
-    workbook = load_workbook(filename=io.BytesIO(raw), read_only=True, data_only=True)
+    workbook = load_workbook(filename=source, read_only=True, data_only=True)
     try:
         sheet = workbook.active
         header_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), None)
-        if not header_row:
-            header = ["title"]
-        else:
-            header = _normalize_headers(header_row)
-        records: list[dict[str, str]] = []
-        for row in sheet.iter_rows(min_row=2, values_only=True):
-            if row is None:
-                continue
-            record: dict[str, str] = {}
-            values = list(row)
-            while len(header) < len(values):
-                header.append(f"column_{len(header) + 1}")
-            for idx, value in enumerate(values):
-                key = header[idx]
-                record[key] = _stringify(value)
-            if any(record.values()):
-                records.append(record)
-    finally:
+    except Exception:
         workbook.close()
-
-    meta = {
+        raise
+    header = ["title"] if not header_row else _normalize_headers(header_row)
+    meta: dict[str, Any] = {
         "type": "excel",
         "columns": header,
         "sheet": sheet.title if sheet is not None else "Sheet1",
         "encoding": "utf-8-sig",
         "delimiter": ";",
     }
-    normalized = _normalize_catalog_items(records, meta)
-    return normalized, meta
+
+    def records() -> Iterator[dict[str, str]]:
+        try:
+            for row in sheet.iter_rows(min_row=2, values_only=True):
+                if row is None:
+                    continue
+                record: dict[str, str] = {}
+                values = list(row)
+                while len(header) < len(values):
+                    header.append(f"column_{len(header) + 1}")
+                for idx, value in enumerate(values):
+                    key = header[idx]
+                    record[key] = _stringify(value)
+                if any(record.values()):
+                    yield record
+        except Exception as exc:
+            raise CatalogReadError(str(exc)) from exc
+        finally:
+            workbook.close()
+
+    return _iter_normalized_catalog_items(records(), meta), meta
+
+
+def _read_csv_bytes(raw: bytes) -> tuple[list[dict[str, str]], dict[str, Any]]:
+    rows, meta = _read_csv_stream(lambda: io.BytesIO(raw))
+    return list(rows), meta
+
+
+def _read_excel_bytes(raw: bytes) -> tuple[list[dict[str, str]], dict[str, Any]]:
+    rows, meta = _read_excel_stream(io.BytesIO(raw))
+    return list(rows), meta
+
+
+async def _spool_upload(upload: Any, dest: pathlib.Path, *, max_bytes: int) -> int:
+    """Copy an upload to ``dest`` chunk by chunk; returns its size.
+
+    Nothing is left at ``dest`` when the upload is empty or larger than
+    ``max_bytes`` (the returned size is then 0 or ``max_bytes + 1``).
+    """
+
+    tmp_path = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.part")
+    size = 0
+    try:
+        with tmp_path.open("wb") as handle:
+            while True:
+                chunk = await upload.read(_READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    return max_bytes + 1
+                handle.write(chunk)
+        if size:
+            os.replace(tmp_path, dest)
+        return size
+    finally:
+        tmp_path.unlink(missing_ok=True)
 
 
 def _collapse_items_one_per_page(index, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
@@ -1101,6 +1187,7 @@ def _process_pdf(
     tenant_root: pathlib.Path,
     saved_rel_path: pathlib.Path,
     original_name: str,
+    profile: catalog_profiling.StageProfile | None = None,
 ) -> tuple[list[dict[str, Any]], dict[str, Any], str | None]:
     index_dir = tenant_root / "indexes"
     index = build_pdf_index(
@@ -1108,8 +1195,9 @@ def _process_pdf(
         output_dir=index_dir,
         source_relpath=str(saved_rel_path),
         original_name=original_name,
+        profile=profile,
     )
-    items = index_to_catalog_items(index)
+    items = index_to_catalog_items(index, profile=profile)
     # Optional: collapse to exactly one item per page if enabled in tenant behavior
     try:
         cfg = common.read_tenant_config(tenant)
@@ -3456,9 +3544,199 @@ async def public_catalog_csv_save(
         detail = str(exc) or "invalid_rows"
         return JSONResponse({"detail": detail}, status_code=400)
 
+    await asyncio.to_thread(common.prebuild_catalog_search_index, tenant_id)
     return {"ok": True, "rows": written}
 
 
+def run_catalog_job(job: Mapping[str, Any], *, export_metrics: bool = True) -> dict[str, Any] | None:
+    """Parse an uploaded catalog and switch the tenant to it.
+
+    ``job`` is the spec built by ``catalog_upload``; progress goes to the
+    job's status.json, so this runs the same in a background task of the
+    web worker and in ``app.catalog_worker``. Returns the per-stage profile
+    of a finished job (also stored as ``stages`` in status.json); with
+    ``export_metrics`` it is observed into this process's Prometheus
+    histograms as well.
+    """
+
+    tenant_id = int(job["tenant_id"])
+    job_id = str(job["job_id"])
+    filename = str(job.get("filename") or "")
+    ext = str(job.get("ext") or pathlib.Path(filename).suffix.lower())
+    relative_path = str(job["source_path"])
+    size = int(job.get("size") or 0)
+    mime_type = job.get("mime")
+    tenant_source = job.get("tenant_source")
+    file_field_name = job.get("file_field")
+    tenant_root = pathlib.Path(common.tenant_dir(tenant_id))
+    saved_upload_rel = pathlib.Path(relative_path)
+    saved_upload_path = tenant_root / saved_upload_rel
+    status = catalog_jobs.CatalogJobStatus.load(tenant_root / "catalog_jobs" / job_id / "status.json")
+    catalog_type = "pdf" if ext == ".pdf" else ("excel" if ext in {".xlsx", ".xls"} else "csv")
+    profile = catalog_profiling.StageProfile()
+
+    try:
+        status.write("processing")
+        status.log("info", "job_started", source=tenant_source, field=file_field_name)
+        base_name = pathlib.Path(filename).stem or f"catalog_{job_id}"
+        normalized_rows: Iterable[dict[str, Any]]
+        meta: dict[str, Any]
+        manifest_rel: str | None = None
+
+        # Stream rows from the spooled upload; only the pipeline holds them all
+        try:
+            if ext == ".csv":
+                normalized_rows, meta = _read_csv_stream(lambda: saved_upload_path.open("rb"))
+            elif ext in {".xlsx", ".xls"}:
+                normalized_rows, meta = _read_excel_stream(saved_upload_path)
+            else:
+                normalized_rows, meta, manifest_rel = _process_pdf(
+                    tenant=tenant_id,
+                    saved_path=saved_upload_path,
+                    tenant_root=tenant_root,
+                    saved_rel_path=saved_upload_rel,
+                    original_name=filename,
+                    profile=profile,
+                )
+        except CatalogIndexError as exc:
+            logger.warning("PDF indexing failed", exc_info=exc)
+            status.fail("pdf_index_failed", detail=str(exc))
+            return None
+        except Exception as exc:  # pragma: no cover - defensive
+            logger.exception("catalog processing failed", exc_info=exc)
+            status.fail("processing_failed", detail=str(exc))
+            return None
+
+        parsed = [0]
+
+        def _counted(rows: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+            for row in rows:
+                parsed[0] += 1
+                yield row
+
+        try:
+            result = write_catalog_csv(tenant_id, _counted(normalized_rows), base_name, meta, profile=profile)
+        except CatalogReadError as exc:
+            logger.warning("catalog rows unreadable", exc_info=exc)
+            status.fail("processing_failed", detail=str(exc))
+            return None
+        except Exception as exc:  # pragma: no cover - disk errors
+            logger.exception("write_catalog_csv raised", exc_info=exc)
+            status.fail("csv_write_failed", detail=str(exc))
+            return None
+        parsed_count = parsed[0]
+        status.log("info", "rows_parsed", items=parsed_count)
+
+        if not isinstance(result, tuple) or len(result) != 2:
+            logger.error("write_catalog_csv returned unexpected result", extra={"result": result})
+            status.fail("csv_write_failed")
+            return None
+
+        csv_rel_path, ordered_columns = result
+        pipeline_info = meta.get("pipeline") if isinstance(meta, dict) else None
+        items = int(meta.get("items", parsed_count)) if isinstance(meta, dict) else parsed_count
+        if manifest_rel:
+            meta = dict(meta)
+            meta["manifest_path"] = manifest_rel
+
+        stages = profile.to_dict()
+        status.write(
+            "done",
+            csv_path=csv_rel_path,
+            items=items,
+            columns=ordered_columns,
+            metadata=meta,
+            source_path=relative_path,
+            message="completed",
+            stages=stages,
+        )
+        if manifest_rel:
+            status.write(None, manifest_path=manifest_rel)
+        status.log(
+            "info",
+            "csv_written",
+            items=items,
+            columns=len(ordered_columns),
+            pipeline=pipeline_info,
+        )
+
+        # Persist config updates
+        cfg = common.read_tenant_config(tenant_id)
+        if not isinstance(cfg, dict):
+            cfg = {}
+        catalogs = cfg.get("catalogs") if isinstance(cfg.get("catalogs"), list) else []
+        catalog_entry: dict[str, Any] = {
+            "name": "uploaded",
+            "path": relative_path,
+            "type": catalog_type,
+        }
+        detected_encoding = _stringify(meta.get("encoding")) if isinstance(meta, dict) else ""
+        if isinstance(meta, dict):
+            raw_delimiter = meta.get("delimiter")
+            if isinstance(raw_delimiter, str):
+                detected_delimiter = raw_delimiter
+            else:
+                detected_delimiter = _stringify(raw_delimiter)
+        else:
+            detected_delimiter = ""
+        if detected_encoding:
+            catalog_entry["encoding"] = detected_encoding
+        if detected_delimiter:
+            catalog_entry["delimiter"] = detected_delimiter
+        if catalog_type == "pdf":
+            if isinstance(meta, dict):
+                for key in ("index_path", "indexed_at", "chunk_count", "sha1"):
+                    if meta.get(key) is not None:
+                        catalog_entry[key] = meta.get(key)
+
+        if csv_rel_path:
+            catalog_entry["csv_path"] = csv_rel_path
+
+        cfg["catalogs"] = [catalog_entry] + [entry for entry in catalogs if entry.get("path") != relative_path]
+
+        integrations = cfg.setdefault("integrations", {})
+        uploaded_meta: dict[str, Any] = {
+            "path": relative_path,
+            "original": filename,
+            "uploaded_at": int(time.time()),
+            "type": catalog_type,
+            "size": size,
+            "mime": mime_type or "application/octet-stream",
+            "csv_path": csv_rel_path,
+        }
+        if pipeline_info:
+            uploaded_meta["pipeline"] = pipeline_info
+        if detected_encoding:
+            uploaded_meta["encoding"] = detected_encoding
+        if detected_delimiter:
+            uploaded_meta["delimiter"] = detected_delimiter
+        if catalog_type == "pdf" and isinstance(meta, dict):
+            index_meta = {
+                "path": meta.get("index_path"),
+                "generated_at": meta.get("indexed_at"),
+                "chunks": meta.get("chunk_count"),
+                "pages": meta.get("page_count"),
+                "sha1": meta.get("sha1"),
+            }
+            index_meta = {k: v for k, v in index_meta.items() if v is not None}
+            if index_meta:
+                uploaded_meta["index"] = index_meta
+        uploaded_meta = {k: v for k, v in uploaded_meta.items() if v is not None}
+        integrations["uploaded_catalog"] = uploaded_meta
+
+        common.write_tenant_config(tenant_id, cfg)
+        status.log("info", "config_updated", catalog_type=catalog_type)
+        if common.prebuild_catalog_search_index(tenant_id) is not None:
+            status.log("info", "search_index_built")
+        if export_metrics:
+            catalog_profiling.observe_stage_profile(stages, catalog_type)
+        return stages
+    except Exception as exc:  # final safety net
+        logger.exception("catalog job crashed", exc_info=exc)
+        status.fail("job_crashed", detail=str(exc))
+    return None
+
+
 # Move public catalog upload off the client namespace to avoid route collisions
 # with the client router. The tenant is accepted as a query parameter.
 
@@ -3567,13 +3845,21 @@ async def catalog_upload(
     if ext not in ALLOWED_EXTENSIONS:
         return JSONResponse({"ok": False, "error": "unsupported_type"}, status_code=400)
 
-    raw = await upload_file.read()
-    if not raw:
+    common.ensure_tenant_files(tenant_id)
+    tenant_root = pathlib.Path(common.tenant_dir(tenant_id))
+    uploads_dir = tenant_root / "uploads"
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+
+    safe_name = _make_safe_filename(filename, ext, fallback=f"catalog_{uuid.uuid4().hex}")
+    saved_upload_path = uploads_dir / safe_name
+    # Stream the upload to disk instead of holding it in the web worker.
+    size = await _spool_upload(upload_file, saved_upload_path, max_bytes=MAX_UPLOAD_SIZE_BYTES)
+    if not size:
         return JSONResponse(
             {"ok": False, "error": "empty_file", "message": "Файл не содержит данных"},
             status_code=400,
         )
-    if len(raw) > MAX_UPLOAD_SIZE_BYTES:
+    if size > MAX_UPLOAD_SIZE_BYTES:
         return JSONResponse(
             {
                 "ok": False,
@@ -3582,221 +3868,66 @@ async def catalog_upload(
             },
             status_code=400,
         )
-
-    common.ensure_tenant_files(tenant_id)
-    tenant_root = pathlib.Path(common.tenant_dir(tenant_id))
-    uploads_dir = tenant_root / "uploads"
-    uploads_dir.mkdir(parents=True, exist_ok=True)
-
-    safe_name = _make_safe_filename(filename, ext, fallback=f"catalog_{uuid.uuid4().hex}")
-    saved_upload_path = uploads_dir / safe_name
-    saved_upload_path.write_bytes(raw)
     saved_upload_rel = pathlib.Path(_relative_to(saved_upload_path, tenant_root))
     relative_path = str(saved_upload_rel)
 
     job_id = uuid.uuid4().hex
     job_root = tenant_root / "catalog_jobs" / job_id
     job_root.mkdir(parents=True, exist_ok=True)
-    status_path = job_root / "status.json"
 
-    status_state: dict[str, Any] = {
+    status = catalog_jobs.CatalogJobStatus(
+        job_root / "status.json",
+        {
+            "job_id": job_id,
+            "state": "pending",
+            "error": None,
+            "log": [],
+            "filename": filename,
+            "message": "",
+            "tenant_source": tenant_source,
+            "file_field": file_field_name,
+        },
+    )
+    status.write(None, tenant_source=tenant_source, file_field=file_field_name)
+    status.log("info", "tenant_resolved", source=tenant_source, tenant=tenant_id)
+    status.log("info", "upload_field_detected", field=file_field_name)
+
+    mime_type, _ = mimetypes.guess_type(filename)
+    status.write("received", size=size, mime=mime_type, source_path=relative_path)
+    status.log("info", "file_received", size=size, mime=mime_type, field=file_field_name)
+
+    job: dict[str, Any] = {
         "job_id": job_id,
-        "state": "pending",
-        "error": None,
-        "log": [],
+        "tenant_id": tenant_id,
         "filename": filename,
-        "message": "",
+        "ext": ext,
+        "source_path": relative_path,
+        "size": size,
+        "mime": mime_type,
         "tenant_source": tenant_source,
         "file_field": file_field_name,
     }
-
-    def write_status(status: str | None = None, **fields: Any) -> None:
-        if status is not None:
-            status_state["state"] = status
-        status_state["updated_at"] = int(time.time())
-        for key, value in fields.items():
-            status_state[key] = value
-        status_path.write_text(json.dumps(status_state, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    def append_log(level: str, message: str, **extra: Any) -> None:
-        entry = {"ts": int(time.time()), "level": level, "message": message}
-        if extra:
-            entry.update({k: v for k, v in extra.items() if v is not None})
-        status_state.setdefault("log", []).append(entry)
-        write_status(None, log=status_state["log"])
-
-    def fail(error_key: str, *, http_status: int = 400, **details: Any):
-        append_log("error", error_key, **details)
-        write_status("failed", error=error_key, message=error_key, **details)
-        return JSONResponse({"ok": False, "error": error_key, "job_id": job_id, **details}, status_code=http_status)
-
-    write_status(None, tenant_source=tenant_source, file_field=file_field_name)
-    append_log("info", "tenant_resolved", source=tenant_source, tenant=tenant_id)
-    append_log("info", "upload_field_detected", field=file_field_name)
-
-    mime_type, _ = mimetypes.guess_type(filename)
-    write_status("received", size=len(raw), mime=mime_type, source_path=relative_path)
-    append_log("info", "file_received", size=len(raw), mime=mime_type, field=file_field_name)
-
-    # Build background job that performs heavy processing to avoid request timeouts
-    def process_job() -> None:
-        try:
-            write_status("processing")
-            append_log("info", "job_started", source=tenant_source, field=file_field_name)
-            base_name = pathlib.Path(filename).stem or f"catalog_{job_id}"
-            normalized_rows: list[dict[str, Any]]
-            meta: dict[str, Any]
-            manifest_rel: str | None = None
-
-            # Read back from disk to keep memory footprint small
-            try:
-                if ext == ".csv":
-                    file_bytes = saved_upload_path.read_bytes()
-                    normalized_rows, meta = _read_csv_bytes(file_bytes)
-                elif ext in {".xlsx", ".xls"}:
-                    file_bytes = saved_upload_path.read_bytes()
-                    normalized_rows, meta = _read_excel_bytes(file_bytes)
-                else:
-                    normalized_rows, meta, manifest_rel = _process_pdf(
-                        tenant=tenant_id,
-                        saved_path=saved_upload_path,
-                        tenant_root=tenant_root,
-                        saved_rel_path=saved_upload_rel,
-                        original_name=filename,
-                    )
-            except CatalogIndexError as exc:
-                logger.warning("PDF indexing failed", exc_info=exc)
-                fail("pdf_index_failed", detail=str(exc))
-                return
-            except Exception as exc:  # pragma: no cover - defensive
-                logger.exception("catalog processing failed", exc_info=exc)
-                fail("processing_failed", detail=str(exc))
-                return
-
+    # Heavy parsing never runs in the request: hand it to the ingestion
+    # runner when the queue is enabled, otherwise to a background task.
+    enqueued = False
+    if catalog_jobs.queue_enabled():
+        # Written before the push: once a runner has the job, status.json is
+        # its to update and this process's copy is stale.
+        status.write("queued")
+        status.log("info", "job_enqueued", queue=catalog_jobs.INGEST_QUEUE_KEY)
+        enqueued = catalog_jobs.enqueue_catalog_job(common.redis_client(), job)
+        if not enqueued:
+            status.log("warning", "job_enqueue_failed")
+    if not enqueued:
+        if background_tasks is not None:
+            background_tasks.add_task(run_catalog_job, job)
+        else:
+            # Fallback: run inline (tests) but still return fast behavior below;
+            # off the event loop, the job parses and builds the search index.
             try:
-                parsed_count = len(normalized_rows)
+                await asyncio.to_thread(run_catalog_job, job)
             except Exception:
-                parsed_count = 0
-            append_log("info", "rows_parsed", items=parsed_count)
-
-            try:
-                result = write_catalog_csv(tenant_id, normalized_rows, base_name, meta)
-            except Exception as exc:  # pragma: no cover - disk errors
-                logger.exception("write_catalog_csv raised", exc_info=exc)
-                fail("csv_write_failed", detail=str(exc))
-                return
-
-            if not isinstance(result, tuple) or len(result) != 2:
-                logger.error("write_catalog_csv returned unexpected result", extra={"result": result})
-                fail("csv_write_failed")
-                return
-
-            csv_rel_path, ordered_columns = result
-            pipeline_info = meta.get("pipeline") if isinstance(meta, dict) else None
-            items = int(meta.get("items", parsed_count)) if isinstance(meta, dict) else parsed_count
-            if manifest_rel:
-                meta = dict(meta)
-                meta["manifest_path"] = manifest_rel
-
-            write_status(
-                "done",
-                csv_path=csv_rel_path,
-                items=items,
-                columns=ordered_columns,
-                metadata=meta,
-                source_path=relative_path,
-                message="completed",
-            )
-            if manifest_rel:
-                write_status(None, manifest_path=manifest_rel)
-            append_log(
-                "info",
-                "csv_written",
-                items=items,
-                columns=len(ordered_columns),
-                pipeline=pipeline_info,
-            )
-
-            # Persist config updates
-            cfg = common.read_tenant_config(tenant_id)
-            if not isinstance(cfg, dict):
-                cfg = {}
-            catalogs = cfg.get("catalogs") if isinstance(cfg.get("catalogs"), list) else []
-            catalog_type = "pdf" if ext == ".pdf" else ("excel" if ext in {".xlsx", ".xls"} else "csv")
-            catalog_entry: dict[str, Any] = {
-                "name": "uploaded",
-                "path": relative_path,
-                "type": catalog_type,
-            }
-            detected_encoding = _stringify(meta.get("encoding")) if isinstance(meta, dict) else ""
-            if isinstance(meta, dict):
-                raw_delimiter = meta.get("delimiter")
-                if isinstance(raw_delimiter, str):
-                    detected_delimiter = raw_delimiter
-                else:
-                    detected_delimiter = _stringify(raw_delimiter)
-            else:
-                detected_delimiter = ""
-            if detected_encoding:
-                catalog_entry["encoding"] = detected_encoding
-            if detected_delimiter:
-                catalog_entry["delimiter"] = detected_delimiter
-            if catalog_type == "pdf":
-                if isinstance(meta, dict):
-                    for key in ("index_path", "indexed_at", "chunk_count", "sha1"):
-                        if meta.get(key) is not None:
-                            catalog_entry[key] = meta.get(key)
-
-            if csv_rel_path:
-                catalog_entry["csv_path"] = csv_rel_path
-
-            cfg["catalogs"] = [catalog_entry] + [entry for entry in catalogs if entry.get("path") != relative_path]
-
-            integrations = cfg.setdefault("integrations", {})
-            uploaded_meta: dict[str, Any] = {
-                "path": relative_path,
-                "original": filename,
-                "uploaded_at": int(time.time()),
-                "type": catalog_type,
-                "size": len(raw),
-                "mime": mime_type or "application/octet-stream",
-                "csv_path": csv_rel_path,
-            }
-            if pipeline_info:
-                uploaded_meta["pipeline"] = pipeline_info
-            if detected_encoding:
-                uploaded_meta["encoding"] = detected_encoding
-            if detected_delimiter:
-                uploaded_meta["delimiter"] = detected_delimiter
-            if catalog_type == "pdf" and isinstance(meta, dict):
-                index_meta = {
-                    "path": meta.get("index_path"),
-                    "generated_at": meta.get("indexed_at"),
-                    "chunks": meta.get("chunk_count"),
-                    "pages": meta.get("page_count"),
-                    "sha1": meta.get("sha1"),
-                }
-                index_meta = {k: v for k, v in index_meta.items() if v is not None}
-                if index_meta:
-                    uploaded_meta["index"] = index_meta
-            uploaded_meta = {k: v for k, v in uploaded_meta.items() if v is not None}
-            integrations["uploaded_catalog"] = uploaded_meta
-
-            common.write_tenant_config(tenant_id, cfg)
-            append_log("info", "config_updated", catalog_type=catalog_type)
-        except Exception as exc:  # final safety net
-            logger.exception("catalog job crashed", exc_info=exc)
-            fail("job_crashed", detail=str(exc))
-
-    # Enqueue the job and return immediately to avoid Cloudflare 524 timeouts
-    if background_tasks is not None:
-        background_tasks.add_task(process_job)
-    else:
-        # Fallback: run inline (tests) but still return fast behavior below
-        try:
-            process_job()
-        except Exception:
-            pass
+                pass
 
     # HTML form fallback: redirect back to settings quickly
     accept_header = (request.headers.get("accept") or "").lower()
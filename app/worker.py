@@ -1,16 +1,18 @@
 from __future__ import annotations
 import os
-import base64
 import re
 import json
 import time
 import asyncio
+import functools
+import signal
 import urllib.request
 import urllib.error
 from typing import Any, Awaitable, Callable, Dict, Iterable, Mapping, Optional
 from urllib.parse import urljoin, urlparse, urlsplit, urlunsplit, unquote, quote
 
 import httpx
+from prometheus_client import start_http_server
 
 import redis.asyncio as redis
 from redis import exceptions as redis_ex
@@ -42,7 +44,7 @@ from app.db import (
     link_lead_contact,
 )
 from app.dao import get_or_create_by_peer
-from app.metrics import MESSAGE_OUT_COUNTER, DB_ERRORS_COUNTER
+from app.metrics import MESSAGE_OUT_COUNTER, DB_ERRORS_COUNTER, WORKER_QUEUE_DEPTH
 from app.common import (
     OUTBOX_QUEUE_KEY,
     OUTBOX_DLQ_KEY,
@@ -55,11 +57,17 @@ from app.core import build_llm_messages, ask_llm
 from app.integrations import avito as avito_integration
 from app.transport import (
     WhatsAppAddressError,
+    close_waweb,
     normalize_e164_digits,
     normalize_whatsapp_recipient,
+    waweb_request_json,
 )
+from app.transport import attachments as attachment_cache
 from app.transport import telegram as telegram_transport
 from app.web.common import WA_INTERNAL_TOKEN as COMMON_WA_INTERNAL_TOKEN
+from app.rate_limit import OutboundRateLimiter
+from app.reliable_queue import ReliableQueue, default_consumer_id, pop_any
+from app.worker_dispatch import KeyedDispatcher
 
 # Guard against attribute absence when the worker boots before settings load
 _default_version = getattr(core_settings, "APP_VERSION", "v21.0")
@@ -104,9 +112,68 @@ try:
 except Exception:
     INBOX_BLOCK_TIMEOUT = 5
 TENANT_ID  = int(os.getenv("TENANT_ID","1"))
+# Serve this process's Prometheus metrics (send counters, waweb pool) when set.
+try:
+    WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0") or 0)
+except ValueError:
+    WORKER_METRICS_PORT = 0
 QUEUES = [OUTBOX_QUEUE_KEY]
+# Outbox sends in flight at once; items of one chat are still sent in order.
+try:
+    OUTBOX_CONCURRENCY = max(1, int(os.getenv("WORKER_OUTBOX_CONCURRENCY", "8")))
+except ValueError:
+    OUTBOX_CONCURRENCY = 8
+# At most this many of them for one tenant, so a tenant whose sends sleep on
+# its rate limit cannot hold every lane.
+try:
+    OUTBOX_TENANT_CONCURRENCY = max(
+        1, int(os.getenv("WORKER_OUTBOX_TENANT_CONCURRENCY", str(max(1, OUTBOX_CONCURRENCY // 2))))
+    )
+except ValueError:
+    OUTBOX_TENANT_CONCURRENCY = max(1, OUTBOX_CONCURRENCY // 2)
+# Popped-but-unfinished items (running or queued behind their chat) before
+# the loop stops popping.
+try:
+    OUTBOX_MAX_PENDING = max(OUTBOX_CONCURRENCY, int(os.getenv("WORKER_OUTBOX_MAX_PENDING", str(OUTBOX_CONCURRENCY * 4))))
+except ValueError:
+    OUTBOX_MAX_PENDING = OUTBOX_CONCURRENCY * 4
+# Inbox events handled at once (each may wait on the LLM), and at most this
+# many of them for one tenant; one contact's events always run in order.
+try:
+    INBOX_CONCURRENCY = max(1, int(os.getenv("WORKER_INBOX_CONCURRENCY", "8")))
+except ValueError:
+    INBOX_CONCURRENCY = 8
+try:
+    INBOX_TENANT_CONCURRENCY = max(
+        1, int(os.getenv("WORKER_INBOX_TENANT_CONCURRENCY", str(max(1, INBOX_CONCURRENCY // 2))))
+    )
+except ValueError:
+    INBOX_TENANT_CONCURRENCY = max(1, INBOX_CONCURRENCY // 2)
+try:
+    INBOX_MAX_PENDING = max(INBOX_CONCURRENCY, int(os.getenv("WORKER_INBOX_MAX_PENDING", str(INBOX_CONCURRENCY * 4))))
+except ValueError:
+    INBOX_MAX_PENDING = INBOX_CONCURRENCY * 4
+# "reliable": BLMOVE into a per-consumer processing list, ack when handled,
+# reclaim lists of dead consumers (safe across crashes and replicas);
+# "brpop": the old pop-and-forget behaviour.
+QUEUE_MODE = (os.getenv("WORKER_QUEUE_MODE") or "reliable").strip().lower()
+RELIABLE_QUEUES = QUEUE_MODE != "brpop"
+WORKER_CONSUMER_ID = default_consumer_id()
+try:
+    QUEUE_VISIBILITY_TIMEOUT = max(5.0, float(os.getenv("WORKER_QUEUE_VISIBILITY_TIMEOUT", "60")))
+except ValueError:
+    QUEUE_VISIBILITY_TIMEOUT = 60.0
+try:
+    QUEUE_MAX_DELIVERIES = max(1, int(os.getenv("WORKER_QUEUE_MAX_DELIVERIES", "3")))
+except ValueError:
+    QUEUE_MAX_DELIVERIES = 3
+INBOX_DLQ_KEY = f"{INCOMING_QUEUE_KEY}:dlq"
+DISPATCH_DRAIN_TIMEOUT = 10.0
+QUEUE_DEPTH_INTERVAL = 5.0
 
 r = redis.from_url(REDIS_URL, decode_responses=True)
+# Shared with the app's DB outbox: buckets are keyed by tenant, channel, recipient.
+rate_limiter = OutboundRateLimiter(r)
 
 # ==== Utils ====
 def _waweb_base_url(tenant: Optional[int]) -> str:
@@ -452,38 +519,38 @@ async def _download_internal_attachment(
     else:
         header_attempts.append(("", None))
 
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        for attempt_index, (header_label, headers) in enumerate(header_attempts, start=1):
+    client = await attachment_cache.get_client()
+    for attempt_index, (header_label, headers) in enumerate(header_attempts, start=1):
+        log(
+            "event=internal_download level=info action=request "
+            f"attempt={attempt_index} url={normalized_relative} header={header_label or 'none'}"
+        )
+        try:
+            response = await client.get(absolute_url, headers=headers, timeout=timeout)
+        except httpx.HTTPError as exc:
+            error_label = exc.__class__.__name__
             log(
-                "event=internal_download level=info action=request "
-                f"attempt={attempt_index} url={normalized_relative} header={header_label or 'none'}"
+                "event=internal_download level=info action=error "
+                f"attempt={attempt_index} url={normalized_relative} error={error_label}"
             )
-            try:
-                response = await client.get(absolute_url, headers=headers)
-            except httpx.HTTPError as exc:
-                error_label = exc.__class__.__name__
-                log(
-                    "event=internal_download level=info action=error "
-                    f"attempt={attempt_index} url={normalized_relative} error={error_label}"
-                )
-                continue
+            continue
 
-            final_status = response.status_code
-            final_headers = response.headers
-            log(
-                "event=internal_download level=info action=response "
-                f"attempt={attempt_index} url={normalized_relative} status={final_status}"
-            )
+        final_status = response.status_code
+        final_headers = response.headers
+        log(
+            "event=internal_download level=info action=response "
+            f"attempt={attempt_index} url={normalized_relative} status={final_status}"
+        )
 
-            if 200 <= response.status_code < 300:
-                return response.content, response.headers, absolute_url
+        if 200 <= response.status_code < 300:
+            return response.content, response.headers, absolute_url
 
-            if not (
-                token_value
-                and response.status_code in {401, 403}
-                and header_label == "X-Auth-Token"
-            ):
-                break
+        if not (
+            token_value
+            and response.status_code in {401, 403}
+            and header_label == "X-Auth-Token"
+        ):
+            break
 
     if final_status is not None or error_label:
         status_hint = error_label or final_status or "error"
@@ -495,6 +562,30 @@ async def _download_internal_attachment(
     return None, final_headers, absolute_url
 
 
+async def _head_internal_attachment(relative_url: str) -> Mapping[str, str] | None:
+    """Headers of a ``HEAD`` on the internal file, used to revalidate a
+    cached attachment; ``None`` if the app did not answer 2xx."""
+
+    normalized_relative, absolute_url = _normalize_internal_urls(relative_url)
+    headers = {"X-Auth-Token": WA_INTERNAL_TOKEN} if WA_INTERNAL_TOKEN else None
+    client = await attachment_cache.get_client()
+    try:
+        response = await client.head(absolute_url, headers=headers, timeout=httpx.Timeout(5.0))
+    except httpx.HTTPError as exc:
+        log(
+            "event=internal_download level=info action=revalidate "
+            f"url={normalized_relative} error={exc.__class__.__name__}"
+        )
+        return None
+    if not 200 <= response.status_code < 300:
+        log(
+            "event=internal_download level=info action=revalidate "
+            f"url={normalized_relative} status={response.status_code}"
+        )
+        return None
+    return response.headers
+
+
 def _prepare_whatsapp_attachment_url(url: str) -> str:
     cleaned = (url or "").strip()
     if not cleaned:
@@ -533,13 +624,33 @@ async def _prepare_internal_attachment(
     if not _is_internal_path(trimmed):
         return _tokenize_attachment_mapping(attachment)
 
-    data, headers, absolute_url = await _download_internal_attachment(trimmed)
+    key = attachment_cache.cache_key(trimmed)
+    cached = attachment_cache.lookup(key)
+    if cached is not None and attachment_cache.needs_revalidation(cached):
+        head_headers = await _head_internal_attachment(trimmed)
+        if not attachment_cache.confirm(key, cached, head_headers):
+            cached = None
+
+    if cached is not None:
+        attachment_cache.mark_hit()
+        headers: Mapping[str, str] | None = cached.headers
+        _, absolute_url = _normalize_internal_urls(trimmed)
+    else:
+        data, headers, absolute_url = await _download_internal_attachment(trimmed)
+        if data is None:
+            prepared = dict(attachment)
+            prepared["url"] = absolute_url
+            return _tokenize_attachment_mapping(prepared)
+        cached = attachment_cache.store(
+            key,
+            attachment_cache.PreparedAttachment.from_response(
+                data, headers, attachment_cache.response_validator(headers)
+            ),
+        )
+
     prepared = dict(attachment)
     prepared["url"] = absolute_url
 
-    if data is None:
-        return _tokenize_attachment_mapping(prepared)
-
     filename = _resolve_attachment_filename(prepared, headers, absolute_url)
     if filename:
         prepared["filename"] = filename
@@ -552,9 +663,10 @@ async def _prepare_internal_attachment(
         prepared["mimetype"] = mime
 
     prepared["type"] = str(prepared.get("type") or "document")
-    prepared["b64"] = base64.b64encode(data).decode("ascii")
+    prepared["b64"] = cached.b64
+    prepared["media_id"] = cached.media_id
     prepared["sendMediaAsDocument"] = True
-    prepared.setdefault("size", len(data))
+    prepared.setdefault("size", cached.size)
     return _tokenize_attachment_mapping(prepared)
 
 
@@ -590,6 +702,9 @@ def _build_wa_document_payload(
         document_block["mime"] = mime
     if caption:
         document_block["caption"] = caption
+    media_id = _first_text("media_id")
+    if media_id:
+        document_block["media_id"] = media_id
 
     wa_attachment: dict[str, Any] = {
         "type": "document",
@@ -609,6 +724,8 @@ def _build_wa_document_payload(
 
     if attachment.get("b64"):
         wa_attachment["b64"] = attachment.get("b64")
+    if media_id:
+        wa_attachment["media_id"] = media_id
     if attachment.get("sendMediaAsDocument") is not None:
         wa_attachment["sendMediaAsDocument"] = attachment.get("sendMediaAsDocument")
     if attachment.get("source"):
@@ -1367,14 +1484,28 @@ async def send_whatsapp(
     if WA_INTERNAL_TOKEN:
         headers.setdefault("X-Internal-Token", WA_INTERNAL_TOKEN)
 
+    # waweb caches documents by media_id: bytes it already holds are not
+    # re-sent, the URL in the same entry covers a waweb restart.
+    omitted_b64: list[tuple[dict[str, Any], Any]] = []
+    for wa_attachment in attachments_payload:
+        media_id = wa_attachment.get("media_id")
+        if media_id and wa_attachment.get("b64") and attachment_cache.delivered(base_url, str(media_id)):
+            omitted_b64.append((wa_attachment, wa_attachment.pop("b64")))
+
     last_status, last_body = 0, ""
     retry_delays = (0.5, 1.0, 2.0)
     for attempt in range(len(retry_delays)):
-        last_status, last_body = await asyncio.to_thread(
-            _http_json, "POST", url, payload, 12.0, headers
-        )
+        last_status, last_body = await waweb_request_json("POST", url, payload, 12.0, headers)
         if 200 <= last_status < 300:
+            for wa_attachment in attachments_payload:
+                if wa_attachment.get("media_id") and wa_attachment.get("b64"):
+                    attachment_cache.mark_delivered(base_url, str(wa_attachment["media_id"]))
             break
+        if omitted_b64:
+            attachment_cache.forget_delivered(base_url)
+            for wa_attachment, b64_value in omitted_b64:
+                wa_attachment["b64"] = b64_value
+            omitted_b64.clear()
         if last_status == 0 or last_status >= 500:
             if attempt < len(retry_delays) - 1:
                 delay = retry_delays[attempt]
@@ -1906,6 +2037,9 @@ async def do_send(item: dict) -> tuple[str, str, str, int]:
             prepared_blob = await _prepare_internal_attachment(blob)
             prepared_attachments.append(prepared_blob)
         recipient_value = raw_to if isinstance(raw_to, str) and raw_to.strip() else phone
+        await rate_limiter.acquire(
+            tenant, "whatsapp", recipient_value or actual_lead_id, cost=max(1, len(prepared_attachments))
+        )
         st, body = await send_whatsapp(
             tenant,
             recipient_value or "",
@@ -1946,6 +2080,7 @@ async def do_send(item: dict) -> tuple[str, str, str, int]:
         chat_hint = avito_chat_id_hint
         if chat_hint is not None:
             chat_hint = str(chat_hint).strip() or None
+        await rate_limiter.acquire(tenant, "avito", chat_hint or lead_id)
         st, body = await send_avito(
             tenant,
             lead_id,
@@ -1965,6 +2100,7 @@ async def do_send(item: dict) -> tuple[str, str, str, int]:
                 peer_id = int(peer_raw)
             except Exception:
                 peer_id = None
+        await rate_limiter.acquire(tenant, "telegram", chat_id, cost=max(1, len(attachments)))
         st, body = await send_telegram(
             tenant,
             chat_id=int(chat_id),
@@ -1979,6 +2115,7 @@ async def do_send(item: dict) -> tuple[str, str, str, int]:
         )
     else:
         recipient_value = raw_to if isinstance(raw_to, str) and raw_to.strip() else phone
+        await rate_limiter.acquire(tenant, "whatsapp", recipient_value or lead_id, cost=max(1, len(attachments)))
         st, body = await send_whatsapp(
             tenant,
             recipient_value or "",
@@ -2144,145 +2281,354 @@ async def write_result(item: dict, status: str, status_code: int, reason: str):
 
 
 # ==== Loop ====
+def _item_tenant(item: Mapping[str, Any]) -> int:
+    tenant_raw = item.get("tenant_id") or item.get("tenant") or os.getenv("TENANT_ID", "1")
+    try:
+        return int(tenant_raw)
+    except Exception:
+        return int(os.getenv("TENANT_ID", "1"))
+
+
+def _incoming_shard(event: Mapping[str, Any]) -> tuple[Any, ...]:
+    """Ordering key of an inbox event: its tenant, channel and sender."""
+
+    tenant_id = _item_tenant(event)
+    channel_raw = event.get("channel") or event.get("ch") or event.get("provider")
+    channel = str(channel_raw or "").strip().lower()
+    if channel == "whatsapp":
+        for field in ("from", "from_jid", "from_raw", "sender"):
+            peer = _normalize_whatsapp_peer(event.get(field))
+            if peer:
+                return (tenant_id, channel, peer)
+    fields = {
+        "telegram": ("telegram_user_id", "peer_id", "peer", "username"),
+        "avito": ("chat_id", "peer", "peer_id"),
+    }.get(channel, ())
+    for field in (*fields, "lead_id"):
+        value = event.get(field)
+        if value is not None and str(value).strip():
+            return (tenant_id, channel, field, str(value).strip())
+    return (tenant_id, channel, None)
+
+
+def _reliable_queues(keys: Iterable[str], *, dlq_key: str) -> list[ReliableQueue]:
+    if not RELIABLE_QUEUES:
+        return []
+    return [
+        ReliableQueue(
+            r,
+            key,
+            consumer=WORKER_CONSUMER_ID,
+            visibility_timeout=QUEUE_VISIBILITY_TIMEOUT,
+            max_deliveries=QUEUE_MAX_DELIVERIES,
+            dlq_key=dlq_key,
+        )
+        for key in keys
+    ]
+
+
+async def _pop_raw(
+    queues: list[ReliableQueue], keys: list[str], timeout: float
+) -> tuple[ReliableQueue | None, str | None]:
+    if queues:
+        return await pop_any(queues, timeout)
+    popped = await r.brpop(keys, timeout=timeout)
+    return None, (popped[1] if popped else None)
+
+
+async def _ack(source: ReliableQueue | None, raw_item: str | None) -> None:
+    if source is None or raw_item is None:
+        return
+    try:
+        await source.ack(raw_item)
+    except Exception as exc:
+        log(f"event=queue_ack_error queue={source.key} error={exc}")
+
+
+async def _maintain_queues(queues: list[ReliableQueue]) -> None:
+    """Heartbeat this consumer and requeue what dead consumers left behind."""
+
+    interval = max(1.0, QUEUE_VISIBILITY_TIMEOUT / 3)
+    while True:
+        for queue in queues:
+            try:
+                await queue.heartbeat()
+                reclaimed = await queue.reclaim()
+                if reclaimed:
+                    log(f"event=queue_reclaimed queue={queue.key} items={reclaimed}")
+            except Exception as exc:
+                log(f"event=queue_maintenance_error queue={queue.key} error={exc}")
+        await asyncio.sleep(interval)
+
+
+async def _release_queues(queues: list[ReliableQueue], maintenance: asyncio.Task | None) -> None:
+    if maintenance is not None:
+        maintenance.cancel()
+        await asyncio.gather(maintenance, return_exceptions=True)
+    for queue in queues:
+        try:
+            released = await queue.release()
+        except Exception as exc:
+            log(f"event=queue_release_error queue={queue.key} error={exc}")
+            continue
+        if released:
+            log(f"event=queue_released queue={queue.key} items={released}")
+
+
+async def _start_queue_maintenance(queues: list[ReliableQueue]) -> asyncio.Task | None:
+    if not queues:
+        return None
+    for queue in queues:
+        # Register before the first pop so a crash right after it is
+        # reclaimable, and take back what a previous run under this id left.
+        recovered = await queue.recover()
+        if recovered:
+            log(f"event=queue_recovered queue={queue.key} items={recovered}")
+    return asyncio.create_task(_maintain_queues(queues), name="queue-maintenance")
+
+
+async def _handle_incoming_job(
+    event: Dict[str, Any], source: ReliableQueue | None = None, raw_item: str | None = None
+) -> None:
+    try:
+        await _handle_incoming_event(event)
+    except Exception as exc:
+        channel_hint = event.get("channel") or event.get("ch") or event.get("provider") or "-"
+        log(
+            "event=incoming_unhandled channel=%s error=%s"
+            % (channel_hint, exc)
+        )
+    await _ack(source, raw_item)
+
+
 async def process_incoming_queue() -> None:
     log(
-        f"[worker] inbox loop start enabled={int(INBOX_ENABLED)} queue={INCOMING_QUEUE_KEY}"
+        f"[worker] inbox loop start enabled={int(INBOX_ENABLED)} queue={INCOMING_QUEUE_KEY} "
+        f"concurrency={INBOX_CONCURRENCY} per_tenant={INBOX_TENANT_CONCURRENCY}"
     )
     if not INBOX_ENABLED:
         return
-    while True:
-        try:
+    dispatcher = KeyedDispatcher(
+        "inbox",
+        concurrency=INBOX_CONCURRENCY,
+        max_pending=INBOX_MAX_PENDING,
+        max_per_group=INBOX_TENANT_CONCURRENCY,
+    )
+    queues = _reliable_queues([INCOMING_QUEUE_KEY], dlq_key=INBOX_DLQ_KEY)
+    maintenance = await _start_queue_maintenance(queues)
+    dispatcher.start()
+    depth_sampled_at = 0.0
+    try:
+        while True:
+            source: ReliableQueue | None = None
+            raw_item: str | None = None
             try:
-                popped = await r.brpop(INCOMING_QUEUE_KEY, timeout=INBOX_BLOCK_TIMEOUT)
-            except redis_ex.ConnectionError:
-                await asyncio.sleep(1.0)
-                continue
+                await dispatcher.wait_for_capacity()
+                if time.monotonic() - depth_sampled_at >= QUEUE_DEPTH_INTERVAL:
+                    depth_sampled_at = time.monotonic()
+                    await _observe_queue_depth(INCOMING_QUEUE_KEY)
+                try:
+                    source, raw_item = await _pop_raw(queues, [INCOMING_QUEUE_KEY], INBOX_BLOCK_TIMEOUT)
+                except redis_ex.ConnectionError:
+                    await asyncio.sleep(1.0)
+                    continue
 
-            if not popped:
-                continue
+                if raw_item is None:
+                    continue
 
-            _, raw_item = popped
-            try:
-                event = json.loads(raw_item)
-            except json.JSONDecodeError:
-                preview = raw_item[:160] if isinstance(raw_item, str) else str(raw_item)[:160]
-                log(
-                    f"event=incoming_parse_error queue={INCOMING_QUEUE_KEY} preview={preview}"
-                )
-                continue
+                try:
+                    event = json.loads(raw_item)
+                except json.JSONDecodeError:
+                    preview = raw_item[:160] if isinstance(raw_item, str) else str(raw_item)[:160]
+                    log(
+                        f"event=incoming_parse_error queue={INCOMING_QUEUE_KEY} preview={preview}"
+                    )
+                    await _ack(source, raw_item)
+                    continue
 
-            if not isinstance(event, dict):
-                log(
-                    f"event=incoming_skip reason=invalid_payload queue={INCOMING_QUEUE_KEY}"
+                if not isinstance(event, dict):
+                    log(
+                        f"event=incoming_skip reason=invalid_payload queue={INCOMING_QUEUE_KEY}"
+                    )
+                    await _ack(source, raw_item)
+                    continue
+
+                shard = _incoming_shard(event)
+                await dispatcher.submit(
+                    shard,
+                    functools.partial(_handle_incoming_job, event, source, raw_item),
+                    group=shard[0],
                 )
-                continue
 
-            try:
-                await _handle_incoming_event(event)
             except Exception as exc:
-                channel_hint = event.get("channel") or event.get("ch") or event.get("provider") or "-"
-                log(
-                    "event=incoming_unhandled channel=%s error=%s"
-                    % (channel_hint, exc)
-                )
-                await asyncio.sleep(0)
+                log(f"event=incoming_loop_error error={exc}")
+                await _ack(source, raw_item)
+                await asyncio.sleep(0.5)
+    finally:
+        await dispatcher.aclose(timeout=DISPATCH_DRAIN_TIMEOUT)
+        await _release_queues(queues, maintenance)
 
-        except Exception as exc:
-            log(f"event=incoming_loop_error error={exc}")
-            await asyncio.sleep(0.5)
 
+def _outbox_shard(item: Mapping[str, Any]) -> tuple[Any, ...]:
+    """Ordering key of an outbox item: its tenant and chat.
 
-async def process_queue():
-    log(f"[worker] loop start, queues={QUEUES}")
-    while True:
-        item: Dict[str, Any] | None = None
-        try:
-            try:
-                popped = await r.brpop(QUEUES, timeout=5)
-            except redis_ex.ConnectionError:
-                await asyncio.sleep(1.0)
-                continue
+    Items without a lead are keyed by whichever recipient field they carry;
+    items with none share one key per tenant and channel.
+    """
 
-            if not popped:
-                continue
+    tenant_id = _item_tenant(item)
+    lead_id = _coerce_int(item.get("lead_id"))
+    if lead_id is not None and lead_id > 0:
+        return (tenant_id, "lead", lead_id)
+    channel = _resolve_channel(item)
+    for field in ("to", "telegram_user_id", "to_peer", "peer", "peer_id", "username", "chat_id"):
+        value = item.get(field)
+        if value is not None and str(value).strip():
+            return (tenant_id, channel, str(value).strip())
+    return (tenant_id, channel, None)
 
-            _, raw_item = popped
-            try:
-                item = json.loads(raw_item)
-            except json.JSONDecodeError:
-                log(f"[worker] json decode err: {raw_item[:200]}")
-                continue
 
-            if _is_status_echo(item):
-                channel_hint = _resolve_channel(item)
-                tenant_raw = item.get("tenant_id") or item.get("tenant") or os.getenv("TENANT_ID", "1")
-                try:
-                    tenant_id = int(tenant_raw)
-                except Exception:
-                    tenant_id = int(os.getenv("TENANT_ID", "1"))
-                status = str(item.get("status") or "").strip() or "-"
-                log(
-                    f"event=outbox_status_echo_skip channel={channel_hint or '-'} tenant={tenant_id} status={status}"
-                )
-                continue
+async def _observe_queue_depth(key: str) -> None:
+    try:
+        WORKER_QUEUE_DEPTH.labels(queue=key).set(await r.llen(key))
+    except Exception:
+        pass
 
-            raw_channel = item.get("provider") or item.get("ch") or item.get("channel")
-            channel = ""
-            if isinstance(raw_channel, str):
-                channel = raw_channel.strip().lower()
-            elif raw_channel is not None:
-                channel = str(raw_channel).strip().lower()
-            if not channel:
-                channel = _resolve_channel(item)
-            tenant_raw = item.get("tenant_id") or item.get("tenant") or os.getenv("TENANT_ID", "1")
-            try:
-                tenant_id = int(tenant_raw)
-            except Exception:
-                tenant_id = int(os.getenv("TENANT_ID", "1"))
-            lead_candidate = _coerce_int(item.get("lead_id"))
-            lead_for_log = lead_candidate if lead_candidate is not None else 0
+
+async def _send_outbox_item(
+    item: Dict[str, Any], source: ReliableQueue | None = None, raw_item: str | None = None
+) -> None:
+    try:
+        raw_channel = item.get("provider") or item.get("ch") or item.get("channel")
+        channel = ""
+        if isinstance(raw_channel, str):
+            channel = raw_channel.strip().lower()
+        elif raw_channel is not None:
+            channel = str(raw_channel).strip().lower()
+        if not channel:
+            channel = _resolve_channel(item)
+        tenant_id = _item_tenant(item)
+        lead_candidate = _coerce_int(item.get("lead_id"))
+        lead_for_log = lead_candidate if lead_candidate is not None else 0
+        log(
+            f"event=send_attempt channel={channel or '-'} tenant={tenant_id} lead_id={lead_for_log}"
+        )
+
+        status, reason, body, code = await do_send(item)
+        status_str = str(status)
+        reason_str = str(reason)
+        log(
+            f"[worker] send ch={channel or '-'} status={status_str} reason={reason_str} code={code} body={body[:200]}"
+        )
+        resolved_lead_for_log = item.get("_resolved_lead_id")
+        if isinstance(resolved_lead_for_log, int) and resolved_lead_for_log > 0:
+            lead_for_status = resolved_lead_for_log
+        else:
+            lead_for_status = lead_for_log
+        if status_str == "sent":
             log(
-                f"event=send_attempt channel={channel or '-'} tenant={tenant_id} lead_id={lead_for_log}"
+                f"event=send_success channel={channel or '-'} tenant={tenant_id} lead_id={lead_for_status} reason={reason_str} code={code}"
             )
-
-            status, reason, body, code = await do_send(item)
-            status_str = str(status)
-            reason_str = str(reason)
+        else:
             log(
-                f"[worker] send ch={channel or '-'} status={status_str} reason={reason_str} code={code} body={body[:200]}"
+                "event=send_failed "
+                f"channel={channel or '-'} tenant={tenant_id} lead_id={lead_for_status} reason={reason_str or status_str} code={code}"
             )
-            resolved_lead_for_log = item.get("_resolved_lead_id")
-            if isinstance(resolved_lead_for_log, int) and resolved_lead_for_log > 0:
-                lead_for_status = resolved_lead_for_log
-            else:
-                lead_for_status = lead_for_log
-            if status_str == "sent":
-                log(
-                    f"event=send_success channel={channel or '-'} tenant={tenant_id} lead_id={lead_for_status} reason={reason_str} code={code}"
-                )
-            else:
-                log(
-                    "event=send_failed "
-                    f"channel={channel or '-'} tenant={tenant_id} lead_id={lead_for_status} reason={reason_str or status_str} code={code}"
+        if channel == "telegram":
+            try:
+                await r.incrby("metrics:telegram:outgoing", 1)
+            except Exception:
+                pass
+        if status_str == "sent":
+            await write_result(item, status_str, code, reason_str)
+
+    except Exception as e:
+        try:
+            await r.lpush(OUTBOX_DLQ_KEY, json.dumps(item or {}, ensure_ascii=False))
+        except Exception:
+            pass
+        log(f"[worker] err: {e}")
+        await asyncio.sleep(0.5)
+    # Sent, skipped or dead-lettered: the item is done either way.
+    await _ack(source, raw_item)
+
+
+async def process_queue():
+    log(
+        f"[worker] loop start, queues={QUEUES} concurrency={OUTBOX_CONCURRENCY} per_tenant={OUTBOX_TENANT_CONCURRENCY} "
+        f"max_pending={OUTBOX_MAX_PENDING} mode={QUEUE_MODE} consumer={WORKER_CONSUMER_ID}"
+    )
+    dispatcher = KeyedDispatcher(
+        "outbox",
+        concurrency=OUTBOX_CONCURRENCY,
+        max_pending=OUTBOX_MAX_PENDING,
+        max_per_group=OUTBOX_TENANT_CONCURRENCY,
+    )
+    queues = _reliable_queues(QUEUES, dlq_key=OUTBOX_DLQ_KEY)
+    maintenance = await _start_queue_maintenance(queues)
+    dispatcher.start()
+    depth_sampled_at = 0.0
+    try:
+        while True:
+            item: Dict[str, Any] | None = None
+            source: ReliableQueue | None = None
+            raw_item: str | None = None
+            try:
+                # Backpressure: leave items in Redis while every slot is taken.
+                await dispatcher.wait_for_capacity()
+                if time.monotonic() - depth_sampled_at >= QUEUE_DEPTH_INTERVAL:
+                    depth_sampled_at = time.monotonic()
+                    for queue_key in QUEUES:
+                        await _observe_queue_depth(queue_key)
+                try:
+                    source, raw_item = await _pop_raw(queues, QUEUES, 5)
+                except redis_ex.ConnectionError:
+                    await asyncio.sleep(1.0)
+                    continue
+
+                if raw_item is None:
+                    continue
+
+                try:
+                    item = json.loads(raw_item)
+                except json.JSONDecodeError:
+                    log(f"[worker] json decode err: {raw_item[:200]}")
+                    await _ack(source, raw_item)
+                    continue
+
+                if _is_status_echo(item):
+                    channel_hint = _resolve_channel(item)
+                    tenant_id = _item_tenant(item)
+                    status = str(item.get("status") or "").strip() or "-"
+                    log(
+                        f"event=outbox_status_echo_skip channel={channel_hint or '-'} tenant={tenant_id} status={status}"
+                    )
+                    await _ack(source, raw_item)
+                    continue
+
+                shard = _outbox_shard(item)
+                await dispatcher.submit(
+                    shard,
+                    functools.partial(_send_outbox_item, item, source, raw_item),
+                    group=shard[0],
                 )
-            if channel == "telegram":
+
+            except Exception as e:
                 try:
-                    await r.incrby("metrics:telegram:outgoing", 1)
+                    await r.lpush(OUTBOX_DLQ_KEY, json.dumps(item or {}, ensure_ascii=False))
                 except Exception:
                     pass
-            if status_str == "sent":
-                await write_result(item, status_str, code, reason_str)
-
-        except Exception as e:
-            try:
-                await r.lpush(OUTBOX_DLQ_KEY, json.dumps(item or {}, ensure_ascii=False))
-            except Exception:
-                pass
-            log(f"[worker] err: {e}")
-            await asyncio.sleep(0.5)
+                log(f"[worker] err: {e}")
+                await _ack(source, raw_item)
+                await asyncio.sleep(0.5)
+    finally:
+        await dispatcher.aclose(timeout=DISPATCH_DRAIN_TIMEOUT)
+        await _release_queues(queues, maintenance)
 
 async def main():
     log(f"[worker] boot {APP_VERSION}")
+    if WORKER_METRICS_PORT:
+        start_http_server(WORKER_METRICS_PORT)
     await init_db()
     tasks = [
         asyncio.create_task(process_queue(), name="outbox-loop"),
@@ -2291,12 +2637,22 @@ async def main():
         tasks.append(
             asyncio.create_task(process_incoming_queue(), name="inbox-loop")
         )
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        try:
+            # Cancel the loops so they hand unacknowledged items back.
+            loop.add_signal_handler(signum, lambda: [task.cancel() for task in tasks])
+        except (NotImplementedError, RuntimeError):
+            pass
     try:
         await asyncio.gather(*tasks)
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         for task in tasks:
             task.cancel()
         await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await close_waweb()
+        await attachment_cache.aclose()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,155 @@
+"""Bounded-concurrency dispatch for the worker's Redis queues.
+
+A :class:`KeyedDispatcher` runs up to ``concurrency`` jobs at once while
+keeping jobs that share a key (one chat) strictly in submission order: a key
+is handed to at most one lane at a time, and after each job it goes to the
+back of the ready line so a busy chat cannot hold a lane while others wait.
+
+Keys may belong to a group (a tenant). Free lanes take ready keys round-robin
+across groups, and ``max_per_group`` caps the lanes one group can hold, so a
+tenant with many busy chats cannot starve the others.
+
+Consumers call :meth:`wait_for_capacity` before popping from Redis, so
+once ``max_pending`` jobs are accepted, new items stay in Redis.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from app.metrics import WORKER_DISPATCH_IN_FLIGHT, WORKER_DISPATCH_PENDING
+
+logger = logging.getLogger("app.worker_dispatch")
+
+Job = Callable[[], Awaitable[None]]
+
+
+class KeyedDispatcher:
+    """Run jobs with bounded concurrency, one at a time per key."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        concurrency: int,
+        max_pending: int,
+        max_per_group: Optional[int] = None,
+    ) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_pending = max(self.concurrency, max_pending)
+        self.max_per_group = max(1, max_per_group) if max_per_group else None
+        self._jobs: Dict[Hashable, Deque[Job]] = {}
+        self._groups: Dict[Hashable, Hashable] = {}
+        # group -> keys with work and no lane, in round-robin order
+        self._ready: "OrderedDict[Hashable, Deque[Hashable]]" = OrderedDict()
+        self._group_running: Dict[Hashable, int] = {}
+        self._changed = asyncio.Condition()
+        self._lanes: List[asyncio.Task] = []
+        self.pending = 0
+        self.in_flight = 0
+
+    def start(self) -> None:
+        if not self._lanes:
+            self._lanes = [
+                asyncio.create_task(self._lane(), name=f"{self.name}-lane-{index}")
+                for index in range(self.concurrency)
+            ]
+
+    def _publish(self) -> None:
+        WORKER_DISPATCH_PENDING.labels(queue=self.name).set(self.pending)
+        WORKER_DISPATCH_IN_FLIGHT.labels(queue=self.name).set(self.in_flight)
+
+    async def wait_for_capacity(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.pending < self.max_pending)
+
+    async def drain(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.pending == 0)
+
+    def _mark_ready(self, key: Hashable) -> None:
+        group = self._groups[key]
+        keys = self._ready.get(group)
+        if keys is None:
+            self._ready[group] = deque([key])
+        else:
+            keys.append(key)
+
+    def _take_ready(self) -> Optional[Tuple[Hashable, Hashable]]:
+        for group, keys in self._ready.items():
+            if self.max_per_group and self._group_running.get(group, 0) >= self.max_per_group:
+                continue
+            key = keys.popleft()
+            if keys:
+                self._ready.move_to_end(group)
+            else:
+                del self._ready[group]
+            return group, key
+        return None
+
+    async def submit(self, key: Hashable, job: Job, *, group: Hashable = None) -> None:
+        """Accept ``job``; it runs after every earlier job of ``key``."""
+
+        async with self._changed:
+            self.pending += 1
+            queued = self._jobs.get(key)
+            if queued is None:
+                self._jobs[key] = deque([job])
+                self._groups[key] = group
+                self._mark_ready(key)
+            else:
+                queued.append(job)
+            self._publish()
+            self._changed.notify_all()
+
+    async def _lane(self) -> None:
+        while True:
+            async with self._changed:
+                picked = self._take_ready()
+                while picked is None:
+                    await self._changed.wait()
+                    picked = self._take_ready()
+                group, key = picked
+                queued = self._jobs[key]
+                job = queued.popleft()
+                self._group_running[group] = self._group_running.get(group, 0) + 1
+                self.in_flight += 1
+                self._publish()
+            try:
+                await job()
+            except Exception:
+                logger.exception("event=dispatch_job_error queue=%s key=%s", self.name, key)
+            finally:
+                async with self._changed:
+                    self.in_flight -= 1
+                    self.pending -= 1
+                    self._group_running[group] -= 1
+                    if not self._group_running[group]:
+                        del self._group_running[group]
+                    if queued:
+                        self._mark_ready(key)
+                    else:
+                        del self._jobs[key]
+                        del self._groups[key]
+                    self._publish()
+                    self._changed.notify_all()
+
+    async def aclose(self, timeout: Optional[float] = None) -> None:
+        """Let accepted jobs finish (up to ``timeout``), then stop the lanes."""
+
+        if timeout:
+            try:
+                await asyncio.wait_for(self.drain(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("event=dispatch_drain_timeout queue=%s pending=%s", self.name, self.pending)
+        for lane in self._lanes:
+            lane.cancel()
+        await asyncio.gather(*self._lanes, return_exceptions=True)
+        self._lanes = []
+
+
+__all__ = ["KeyedDispatcher"]
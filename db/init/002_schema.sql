@@ -66,6 +66,8 @@ CREATE INDEX IF NOT EXISTS idx_outbox_status_created
   ON outbox(status, created_at);
 CREATE INDEX IF NOT EXISTS idx_outbox_status_updated
   ON outbox(status, updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_outbox_status_scheduled
+  ON outbox(status, scheduled_at);
 
 -- Кэш источников (realId) поверх Redis
 CREATE TABLE IF NOT EXISTS source_cache (
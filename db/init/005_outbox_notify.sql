@@ -0,0 +1,21 @@
+-- Будим outbox worker сразу после вставки вместо ожидания следующего опроса.
+-- Создаём только недостающее: повторный запуск не берёт блокировку outbox.
+CREATE OR REPLACE FUNCTION outbox_notify() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('outbox_ready', NEW.lead_id::text);
+  RETURN NEW;
+END $$ LANGUAGE plpgsql;
+
+DO $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_trigger
+    WHERE tgrelid = 'outbox'::regclass AND tgname = 'trg_outbox_notify'
+  ) THEN
+    CREATE TRIGGER trg_outbox_notify
+      AFTER INSERT ON outbox
+      FOR EACH ROW EXECUTE FUNCTION outbox_notify();
+  END IF;
+EXCEPTION WHEN duplicate_object THEN
+  NULL;
+END $$;
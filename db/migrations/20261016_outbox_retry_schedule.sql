@@ -0,0 +1,3 @@
+-- Повторы outbox ждут scheduled_at (экспоненциальная задержка / FloodWait)
+CREATE INDEX IF NOT EXISTS idx_outbox_status_scheduled
+  ON outbox(status, scheduled_at);
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for catalog search.
+
+Generates synthetic Russian-language catalogs and measures:
+
+* retrieval end to end per backend (shim, sklearn, memory-mapped index):
+  ``ensure_catalog_index`` build time, peak RSS, p50/p99 latency and
+  throughput of ``retrieve_context``, ``_legacy_rank_catalog`` and
+  ``format_items_for_prompt``; each scenario runs in a fresh process so
+  peak RSS is not shared between them;
+* the built-in TF-IDF shim alone: postings-based top-k queries against the
+  dense linear kernel, and the memory held by dict-based vs compact CSR
+  vectors;
+* PDF catalog index files (``--index-files``, real ``catalog_*.json``
+  indexes): size, open time and full chunk iteration time of each on-disk
+  format.
+
+The JSON report is meant to be kept per release and diffed:
+
+    python scripts/bench_catalog.py --sizes 1000,10000,100000 --output bench.json
+"""
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import datetime
+import json
+import multiprocessing
+import pathlib
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from app.sklearn.feature_extraction.text import TfidfVectorizer as ShimVectorizer
+from app.sklearn.metrics.pairwise import linear_kernel as shim_linear_kernel
+from app.sklearn.metrics.pairwise import top_k_linear_kernel
+
+_KINDS = ("диван", "кресло", "стол", "стул", "шкаф", "кровать", "комод", "полка", "тумба", "пуф")
+_MODIFIERS = ("угловой", "раскладной", "компактный", "офисный", "детский", "барный", "мягкий", "modular")
+_COLORS = ("белый", "серый", "чёрный", "бежевый", "венге", "дуб", "синий", "зелёный")
+_MATERIALS = ("массив дуба", "ЛДСП", "металл", "велюр", "рогожка", "экокожа", "стекло", "шпон")
+_BRANDS = ("Verda", "Nord", "Milano", "Sirius", "Loftly", "Ergo", "Volga", "Ultra")
+_FEATURES = (
+    "ящик для белья",
+    "механизм еврокнижка",
+    "съёмные чехлы",
+    "усиленный каркас",
+    "регулировка высоты",
+    "доставка и сборка",
+    "гарантия 24 месяца",
+    "влагостойкое покрытие",
+)
+_QUERIES = (
+    "диван угловой",
+    "серый диван до 50 тысяч",
+    "каталог",
+    "цена на кресло",
+    "стол из массива дуба",
+    "шкаф белый с зеркалом",
+    "детская кровать с ящиком",
+    "барный стул металл",
+)
+
+
+def synthetic_catalog(size: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Return ``size`` furniture-like items with realistic attribute columns."""
+
+    rng = random.Random(seed)
+    items: List[Dict[str, Any]] = []
+    for idx in range(size):
+        kind = rng.choice(_KINDS)
+        brand = rng.choice(_BRANDS)
+        items.append(
+            {
+                "sku": f"SKU-{idx:06d}",
+                "title": f"{kind.capitalize()} {rng.choice(_MODIFIERS)} {brand} {rng.randint(10, 999)}",
+                "brand": brand,
+                "category": kind,
+                "color": rng.choice(_COLORS),
+                "material": rng.choice(_MATERIALS),
+                "price": str(rng.randrange(1500, 250000, 100)),
+                "size": f"{rng.randint(40, 320)} см",
+                "description": ", ".join(rng.sample(_FEATURES, 3)),
+                "tags": rng.sample(["хит", "новинка", "склад", "акция"], rng.randint(0, 2)),
+            }
+        )
+    return items
+
+
+def _item_text(item: Dict[str, Any]) -> str:
+    parts: List[str] = []
+    for value in item.values():
+        if isinstance(value, (list, tuple)):
+            parts.extend(str(v) for v in value)
+        else:
+            parts.append(str(value))
+    return " ".join(parts)
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    pos = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[pos]
+
+
+def _time_queries(run: Callable[[str], Any], queries: List[str]) -> Dict[str, float]:
+    samples: List[float] = []
+    started = time.perf_counter()
+    for text in queries:
+        t0 = time.perf_counter()
+        run(text)
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": round(_percentile(samples, 50), 3),
+        "p99_ms": round(_percentile(samples, 99), 3),
+        "mean_ms": round(statistics.fmean(samples), 3) if samples else 0.0,
+        "qps": round(len(queries) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1_048_576 if sys.platform == "darwin" else 1024), 1)
+
+
+BACKENDS = ("shim", "sklearn", "mapped")
+
+
+def _use_backend(backend: str) -> Any:
+    """Point the catalog indexer/retriever at ``backend``; return the indexer module."""
+
+    from app.catalog import indexer, retriever
+    from app.sklearn.feature_extraction.text import TfidfVectorizer as shim_vectorizer
+    from app.sklearn.metrics.pairwise import linear_kernel as shim_kernel
+
+    if backend == "sklearn":
+        from sklearn.feature_extraction.text import TfidfVectorizer as sk_vectorizer
+        from sklearn.metrics.pairwise import linear_kernel as sk_kernel
+
+        indexer.TfidfVectorizer, retriever.linear_kernel = sk_vectorizer, sk_kernel
+    else:
+        indexer.TfidfVectorizer, retriever.linear_kernel = shim_vectorizer, shim_kernel
+    indexer.DISK_INDEX_ENABLED = backend == "mapped"
+    indexer.clear_catalog_cache()
+    return indexer
+
+
+def bench_retrieval(size: int, backend: str, query_count: int, limit: int) -> Dict[str, Any]:
+    """One synthetic tenant searched through the production code paths."""
+
+    from app import core
+    from app.catalog import retrieve_context
+
+    indexer = _use_backend(backend)
+    tenant = 900_000 + size
+    rss_start = _peak_rss_mb()
+    with tempfile.TemporaryDirectory(prefix="bench_catalog_") as workdir:
+        version = f"bench{size}"
+        items = indexer.CatalogItems(
+            synthetic_catalog(size),
+            tenant=tenant,
+            version=version,
+            index_path=pathlib.Path(workdir) / f"search_{version}.idx",
+        )
+        queries = [_QUERIES[idx % len(_QUERIES)] for idx in range(query_count)]
+
+        t0 = time.perf_counter()
+        if backend == "mapped":
+            indexer.prebuild_catalog_index(items)
+        index = indexer.ensure_catalog_index(tenant, items)
+        build_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        core._legacy_rank_index(items)
+        legacy_build_s = time.perf_counter() - t0
+
+        def retrieve(text: str) -> Any:
+            return retrieve_context(items=items, needs=core.infer_user_needs(text), query=text, tenant=tenant, limit=limit)
+
+        def legacy(text: str) -> Any:
+            return core._legacy_rank_catalog(items, core.infer_user_needs(text), limit, text)
+
+        hits = retrieve(queries[0])
+
+        def format_prompt(_text: str) -> Any:
+            return core.format_items_for_prompt(hits)
+
+        report = {
+            "items": size,
+            "backend": backend,
+            "build_s": round(build_s, 3),
+            "legacy_index_build_s": round(legacy_build_s, 3),
+            "index_mb": round(index.size_bytes / 1_048_576, 2) if index else None,
+            "retrieve_context": _time_queries(retrieve, queries),
+            "legacy_rank": _time_queries(legacy, queries),
+            "format_items_for_prompt": _time_queries(format_prompt, queries),
+        }
+    report["rss_start_mb"] = rss_start
+    report["peak_rss_mb"] = _peak_rss_mb()
+    return report
+
+
+def _run_isolated(fn: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _environment() -> Dict[str, Any]:
+    try:
+        import sklearn
+
+        sklearn_version: Optional[str] = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+    return {
+        "generated_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sklearn": sklearn_version,
+    }
+
+
+def bench_shim_query(size: int, query_count: int, limit: int) -> Dict[str, Any]:
+    texts = [_item_text(item) for item in synthetic_catalog(size)]
+    vectorizer = ShimVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1)
+    t0 = time.perf_counter()
+    matrix = vectorizer.fit_transform(texts)
+    build_s = time.perf_counter() - t0
+
+    queries = [_QUERIES[idx % len(_QUERIES)] for idx in range(query_count)]
+
+    def dense(text: str) -> Any:
+        row = shim_linear_kernel(vectorizer.transform([text]), matrix)[0]
+        return sorted(range(len(row)), key=row.__getitem__, reverse=True)[:limit]
+
+    def postings(text: str) -> Any:
+        return top_k_linear_kernel(vectorizer.transform([text]), matrix, limit)[0]
+
+    compact_vectorizer = ShimVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1, compact=True)
+    t0 = time.perf_counter()
+    compact_matrix = compact_vectorizer.fit_transform(texts)
+    compact_matrix.postings
+    compact_build_s = time.perf_counter() - t0
+
+    def compact(text: str) -> Any:
+        return top_k_linear_kernel(compact_vectorizer.transform([text]), compact_matrix, limit)[0]
+
+    return {
+        "items": size,
+        "build_s": round(build_s, 3),
+        "compact_build_s": round(compact_build_s, 3),
+        "dense": _time_queries(dense, queries),
+        "postings": _time_queries(postings, queries),
+        "compact_postings": _time_queries(compact, queries),
+    }
+
+
+def bench_shim_memory(size: int) -> Dict[str, Any]:
+    """Bytes retained by a fitted vectorizer + matrix, per representation."""
+
+    texts = [_item_text(item) for item in synthetic_catalog(size)]
+    report: Dict[str, Any] = {"items": size, "text_bytes": sum(len(t.encode("utf-8")) for t in texts)}
+    for label, compact in (("dict", False), ("compact", True)):
+        tracemalloc.start()
+        vectorizer = ShimVectorizer(analyzer="word", ngram_range=(1, 2), min_df=1, compact=compact)
+        matrix = vectorizer.fit_transform(texts)
+        if compact:
+            matrix.postings  # the query path builds it lazily; count it too
+        retained, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report[label] = {"retained_mb": round(retained / 1_048_576, 2)}
+        del vectorizer, matrix
+    return report
+
+
+def _rewrite_index(index: Any, path: pathlib.Path, fmt: int) -> None:
+    from app import catalog_index
+
+    header = {
+        "catalog_id": index.catalog_id,
+        "source_path": index.source_path,
+        "original_name": index.original_name,
+        "generated_at": index.generated_at,
+        "sha1": index.sha1,
+        "page_count": index.page_count,
+        "chunk_count": index.chunk_count,
+    }
+    if fmt == 1:
+        payload = {**header, "chunks": [chunk.to_dict() for chunk in index.chunks]}
+        path.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        return
+    spool = path.with_name(f"{path.name}.chunks")
+    with spool.open("w", encoding="utf-8") as handle:
+        for chunk in index.chunks:
+            if fmt == 2:
+                handle.write(json.dumps(chunk.to_dict(), ensure_ascii=False) + "\n")
+            else:
+                handle.write(json.dumps(chunk.to_row(), ensure_ascii=False, separators=(",", ":")) + "\n")
+    header = {"format": fmt, **header}
+    if fmt == 3:
+        header["chunk_fields"] = list(catalog_index._CHUNK_FIELDS)
+    catalog_index._write_index_file(path, header, spool)
+    spool.unlink()
+
+
+def bench_index_formats(source: pathlib.Path, repeats: int = 5) -> Dict[str, Any]:
+    """One real catalog index rewritten in every on-disk format."""
+
+    from app.catalog_index import load_index
+
+    index = load_index(source)
+    report: Dict[str, Any] = {"source": str(source), "chunks": index.chunk_count, "pages": index.page_count}
+    with tempfile.TemporaryDirectory(prefix="bench_index_") as workdir:
+        for fmt in (1, 2, 3):
+            path = pathlib.Path(workdir) / f"catalog_format{fmt}.json"
+            _rewrite_index(index, path, fmt)
+            open_s: List[float] = []
+            iterate_s: List[float] = []
+            for _ in range(repeats):
+                t0 = time.perf_counter()
+                loaded = load_index(path)
+                open_s.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                sum(1 for _chunk in loaded.chunks)
+                iterate_s.append(time.perf_counter() - t0)
+            report[f"format_{fmt}"] = {
+                "size_kb": round(path.stat().st_size / 1024, 1),
+                "open_ms": round(statistics.median(open_s) * 1000, 3),
+                "iterate_ms": round(statistics.median(iterate_s) * 1000, 3),
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска по каталогу (офлайн).")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Размеры каталогов через запятую")
+    parser.add_argument("--queries", type=int, default=100, help="Количество запросов на каталог")
+    parser.add_argument("--limit", type=int, default=5, help="Сколько позиций возвращать")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Бэкенды поиска через запятую")
+    parser.add_argument("--skip-shim", action="store_true", help="Не запускать микробенчмарки шима")
+    parser.add_argument(
+        "--index-files",
+        type=pathlib.Path,
+        nargs="*",
+        default=(),
+        help="Индексы PDF-каталогов (catalog_*.json) для сравнения форматов",
+    )
+    parser.add_argument("--output", type=pathlib.Path, default=None, help="Путь для JSON-отчёта")
+    args = parser.parse_args()
+
+    sizes = [int(part) for part in str(args.sizes).split(",") if part.strip()]
+    backends = [part.strip() for part in str(args.backends).split(",") if part.strip()]
+    unknown = sorted(set(backends) - set(BACKENDS))
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+
+    report: Dict[str, Any] = {
+        "environment": _environment(),
+        "params": {"sizes": sizes, "queries": args.queries, "limit": args.limit},
+        "retrieval": [
+            _run_isolated(bench_retrieval, size, backend, args.queries, args.limit)
+            for size in sizes
+            for backend in backends
+        ],
+    }
+    if not args.skip_shim:
+        report["shim_query"] = [bench_shim_query(size, args.queries, args.limit) for size in sizes]
+        report["shim_memory"] = [bench_shim_memory(size) for size in sizes]
+    if args.index_files:
+        report["index_formats"] = [bench_index_formats(path) for path in args.index_files]
+
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(payload, encoding="utf-8")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Worker → waweb send throughput against a local stand-in waweb.
+
+Starts a keep-alive HTTP/1.1 server on 127.0.0.1 that answers ``POST /send``
+like waweb (optionally after ``--latency-ms``) and pushes the same payloads
+through both worker transports:
+
+* ``urllib``: the old ``_http_json`` wrapped in ``asyncio.to_thread`` (new
+  TCP connection and a default-executor thread per send);
+* ``pooled``: ``app.transport.waweb.request_json`` (keep-alive pool per base
+  URL).
+
+    python scripts/bench_waweb_send.py --sends 2000 --concurrency 1,16,64
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import http.server
+import json
+import pathlib
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+_PAYLOAD = {
+    "channel": "whatsapp",
+    "tenant": 1,
+    "tenant_id": 1,
+    "to": "79991234567@c.us",
+    "text": "Здравствуйте! Отправляю каталог и цены на диваны.",
+}
+
+
+class _WawebStandIn(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_s = 0.0
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        type(self).connections += 1
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server API
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        body = b'{"ok":true,"id":"stand-in"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_args: Any) -> None:
+        return
+
+
+def _start_server(latency_s: float) -> http.server.ThreadingHTTPServer:
+    _WawebStandIn.latency_s = latency_s
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _WawebStandIn)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def _drive(send: Callable[[], Awaitable[tuple[int, str]]], sends: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    failures = 0
+    remaining = iter(range(sends))
+
+    async def lane() -> None:
+        nonlocal failures
+        for _ in remaining:
+            t0 = time.perf_counter()
+            status, _body = await send()
+            latencies.append(time.perf_counter() - t0)
+            if not 200 <= status < 300:
+                failures += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(lane() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "sends_per_s": round(sends / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2),
+        "failures": failures,
+    }
+
+
+async def _bench(url: str, sends: int, concurrency: int, transport: str) -> Dict[str, Any]:
+    headers = {"X-Auth-Token": "bench"}
+    if transport == "urllib":
+        from app.worker import _http_json
+
+        async def send() -> tuple[int, str]:
+            return await asyncio.to_thread(_http_json, "POST", url, _PAYLOAD, 12.0, headers)
+
+    else:
+        from app.transport import waweb
+
+        async def send() -> tuple[int, str]:
+            return await waweb.request_json("POST", url, _PAYLOAD, 12.0, headers)
+
+    connections_before = _WawebStandIn.connections
+    report = await _drive(send, sends, concurrency)
+    if transport == "pooled":
+        from app.transport import waweb
+
+        await waweb.aclose()
+    report.update(
+        transport=transport,
+        concurrency=concurrency,
+        tcp_connections=_WawebStandIn.connections - connections_before,
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Пропускная способность отправки worker → waweb.")
+    parser.add_argument("--sends", type=int, default=2000, help="Сколько отправок на прогон")
+    parser.add_argument("--concurrency", default="1,16,64", help="Параллельность через запятую")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Задержка ответа заглушки waweb")
+    parser.add_argument("--output", type=pathlib.Path, default=None, help="Путь для JSON-отчёта")
+    args = parser.parse_args()
+
+    server = _start_server(args.latency_ms / 1000.0)
+    url = f"http://127.0.0.1:{server.server_address[1]}/send?tenant=1"
+    levels = [int(part) for part in str(args.concurrency).split(",") if part.strip()]
+    try:
+        results = [
+            asyncio.run(_bench(url, args.sends, level, transport))
+            for level in levels
+            for transport in ("urllib", "pooled")
+        ]
+    finally:
+        server.shutdown()
+
+    payload = json.dumps(
+        {"params": {"sends": args.sends, "latency_ms": args.latency_ms}, "results": results},
+        ensure_ascii=False,
+        indent=2,
+    )
+    if args.output:
+        args.output.write_text(payload, encoding="utf-8")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,7 @@ from fastapi import Body, Depends, FastAPI, HTTPException, Query, Request, Respo
 from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel, Field, SecretStr, ValidationError
 from telethon.errors import RPCError
-from telethon.errors.rpcerrorlist import ChatAdminRequiredError
+from telethon.errors.rpcerrorlist import ChatAdminRequiredError, FloodWaitError
 try:  # pragma: no cover - pydantic v1/v2 compatibility
     from pydantic import ConfigDict
 except ImportError:  # pragma: no cover - pydantic v1
@@ -1105,6 +1105,18 @@ def create_app() -> FastAPI:
             message = str(exc).strip()
             if message:
                 detail["message"] = message
+            if isinstance(exc, FloodWaitError):
+                retry_after = max(1, int(getattr(exc, "seconds", 0) or 0))
+                logger.warning(
+                    "event=send_message_flood_wait route=/send tenant=%s retry_after=%s",
+                    payload.tenant,
+                    retry_after,
+                )
+                return JSONResponse(
+                    {"error": "flood_wait", "retry_after": retry_after, "details": detail},
+                    status_code=429,
+                    headers={**headers, "Retry-After": str(retry_after)},
+                )
             if isinstance(exc, ChatAdminRequiredError):
                 logger.warning(
                     "event=send_message_forbidden_peer route=/send tenant=%s peer=%s",
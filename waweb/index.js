@@ -67,6 +67,13 @@ const MAX_MEDIA_MB = (() => {
   return 25;
 })();
 const MAX_MEDIA_BYTES = Math.max(1, Math.floor(MAX_MEDIA_MB * 1024 * 1024));
+const MEDIA_CACHE_MB = (() => {
+  const raw = Number(process.env.WAWEB_MEDIA_CACHE_MB);
+  if (Number.isFinite(raw) && raw >= 0) return raw;
+  return 64;
+})();
+const MEDIA_CACHE_MAX_BYTES = Math.floor(MEDIA_CACHE_MB * 1024 * 1024);
+const MEDIA_ID_RE = /^[A-Za-z0-9:_-]{8,160}$/;
 const PROVIDER_TOKEN_REFRESH_INTERVAL_MS = Math.max(
   60,
   Number(process.env.PROVIDER_TOKEN_REFRESH_INTERVAL || '300') || 300,
@@ -195,6 +202,12 @@ function renderMetrics() {
       lines.push(`send_fail_total{channel="whatsapp",reason="${sanitizeReason(reason)}"} ${value}`);
     }
   }
+  lines.push('# TYPE wa_media_cache_total counter');
+  for (const result of Object.keys(mediaCacheTotals)) {
+    lines.push(`wa_media_cache_total{result="${result}"} ${mediaCacheTotals[result]}`);
+  }
+  lines.push('# TYPE wa_media_cache_bytes gauge');
+  lines.push(`wa_media_cache_bytes ${mediaCacheBytes}`);
   lines.push('# TYPE wa_to_app_total counter');
   const toAppEvents = Object.keys(waToAppTotals);
   if (!toAppEvents.length) {
@@ -874,6 +887,46 @@ class DocumentPayloadError extends Error {
   }
 }
 
+// Documents prepared for sending, keyed by the worker's content-addressed
+// media_id (Map order is LRU order). Sized by base64 length.
+const mediaCache = new Map();
+let mediaCacheBytes = 0;
+const mediaCacheTotals = { hit: 0, miss: 0, evict: 0 };
+
+function normalizeMediaId(value){
+  if (typeof value !== 'string') return null;
+  const trimmed = value.trim();
+  return MEDIA_ID_RE.test(trimmed) ? trimmed : null;
+}
+
+function getCachedMedia(mediaId){
+  if (!mediaId) return null;
+  const cached = mediaCache.get(mediaId);
+  if (!cached) return null;
+  mediaCache.delete(mediaId);
+  mediaCache.set(mediaId, cached);
+  return cached;
+}
+
+function storeCachedMedia(mediaId, doc){
+  if (!mediaId || !doc || !doc.b64 || MEDIA_CACHE_MAX_BYTES <= 0) return;
+  const size = doc.b64.length;
+  if (size > MEDIA_CACHE_MAX_BYTES) return;
+  const previous = mediaCache.get(mediaId);
+  if (previous) {
+    mediaCacheBytes -= previous.b64.length;
+    mediaCache.delete(mediaId);
+  }
+  mediaCache.set(mediaId, { b64: doc.b64, filename: doc.filename, mimetype: doc.mimetype, size: doc.size });
+  mediaCacheBytes += size;
+  while (mediaCacheBytes > MEDIA_CACHE_MAX_BYTES && mediaCache.size) {
+    const [oldestId, oldest] = mediaCache.entries().next().value;
+    mediaCache.delete(oldestId);
+    mediaCacheBytes -= oldest.b64.length;
+    mediaCacheTotals.evict += 1;
+  }
+}
+
 async function normalizeDocumentEntry(entry, context){
   const descriptor = extractDocumentDescriptor(entry, context);
   if (!descriptor) return null;
@@ -960,7 +1013,11 @@ function extractDocumentDescriptor(entry, context){
     documentNode ? documentNode.mime_type : null,
     documentNode ? documentNode.mime : null,
   ]);
-  const hasData = Boolean(docPathRaw || urlRaw || b64Raw);
+  const mediaId = normalizeMediaId(
+    pickFirstText([entry.media_id, documentNode ? documentNode.media_id : null])
+  );
+  const hasCachedMedia = Boolean(mediaId && mediaCache.has(mediaId));
+  const hasData = Boolean(docPathRaw || urlRaw || b64Raw || hasCachedMedia);
 
   if (ctx === 'payload' && !hasDocType) return null;
   if (ctx === 'attachments' && !hasDocType && !docPathRaw && !b64Raw) return null;
@@ -973,7 +1030,12 @@ function extractDocumentDescriptor(entry, context){
     return null;
   }
 
-  const rawValue = docPathRaw || urlRaw || b64Raw;
+  // Bytes already in hand (cache, inline base64) win over a URL download.
+  let source = 'url';
+  if (docPathRaw) source = 'path';
+  else if (hasCachedMedia) source = 'cache';
+  else if (b64Raw) source = 'b64';
+  const rawValue = { path: docPathRaw, cache: mediaId, b64: b64Raw, url: urlRaw }[source];
   if (typeof rawValue !== 'string') {
     throw new DocumentPayloadError('invalid_document');
   }
@@ -982,11 +1044,10 @@ function extractDocumentDescriptor(entry, context){
     throw new DocumentPayloadError('invalid_document');
   }
 
-  const source = docPathRaw ? 'path' : urlRaw ? 'url' : 'b64';
-
   return {
     source,
     value: trimmedValue,
+    mediaId,
     filename: filenameRaw !== undefined && filenameRaw !== null ? String(filenameRaw) : null,
     mimetype: mimetypeRaw !== undefined && mimetypeRaw !== null ? String(mimetypeRaw) : null,
     caption: captionRaw !== undefined && captionRaw !== null ? String(captionRaw) : null,
@@ -995,11 +1056,39 @@ function extractDocumentDescriptor(entry, context){
 
 async function buildDocumentAttachmentFromDescriptor(descriptor){
   if (!descriptor) return null;
-  const { source } = descriptor;
-  if (source === 'path') return buildDocumentFromPath(descriptor);
-  if (source === 'url') return buildDocumentFromUrl(descriptor);
-  if (source === 'b64') return buildDocumentFromBase64(descriptor);
-  throw new DocumentPayloadError('invalid_document');
+  const { source, mediaId } = descriptor;
+  if (source === 'cache') {
+    const cached = getCachedMedia(mediaId);
+    if (cached) {
+      mediaCacheTotals.hit += 1;
+      return buildDocumentFromCache(descriptor, cached);
+    }
+    throw new DocumentPayloadError('invalid_document');
+  }
+  let doc;
+  if (source === 'path') doc = await buildDocumentFromPath(descriptor);
+  else if (source === 'url') doc = await buildDocumentFromUrl(descriptor);
+  else if (source === 'b64') doc = buildDocumentFromBase64(descriptor);
+  else throw new DocumentPayloadError('invalid_document');
+  if (mediaId) {
+    mediaCacheTotals.miss += 1;
+    storeCachedMedia(mediaId, doc);
+  }
+  return doc;
+}
+
+function buildDocumentFromCache(descriptor, cached){
+  const mimetype = descriptor.mimetype || cached.mimetype || 'application/octet-stream';
+  return {
+    type: 'document',
+    source: 'cache',
+    b64: cached.b64,
+    filename: ensureDocumentFilename(descriptor.filename || cached.filename, mimetype),
+    mimetype,
+    caption: descriptor.caption || null,
+    size: cached.size,
+    sendMediaAsDocument: true,
+  };
 }
 
 async function buildDocumentFromPath(descriptor){